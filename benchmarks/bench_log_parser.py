@@ -0,0 +1,96 @@
+"""
+Benchmark of the parsing of the logs
+
+Compare the legacy `LogParser.load` (uncompiled patterns, lists of lists)
+with the streaming parser of `LogParser` (without cache), a reload from the cache of `LogParser` (keep_raw=False)
+and the parallel loader (`load_parallel`) on an increasing number of processes.
+
+Usage : python benchmarks/bench_log_parser.py [--nbr-lines 500000] [--max-workers 4] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+import pandas as pd
+
+from dcevaluator.analyze.log_parser import LogParser, load_parallel
+from dcevaluator.utils.utils import build_log_tag
+
+def write_log(log_path, nbr_lines):
+    """
+    Write a log like the DEBUG logs of an evaluation (one line per telemetry frame)
+
+    :param log_path: the path of the generated log
+    :param nbr_lines: number of lines of telemetry
+    """
+    line_format = "2021-08-10 12:{:02d}:{:06.3f} | {:<8} | {} - {}\n"
+    with open(log_path, "w") as f:
+        f.write(line_format.format(0, 0.0, "INFO", "dcevaluator.launch:run:79", build_log_tag("Donkey Car Evaluator", "BEGIN")))
+        for i in range(nbr_lines):
+            minute, second = divmod(i * 0.05, 60)
+            if i % 1000 == 999:
+                f.write(line_format.format(int(minute) % 60, second, "SUCCESS", "dcevaluator.communication.dc_client:each_turn:229",
+                                           build_log_tag("NEW TURN", turn=i // 1000, deltatime=random.uniform(20, 30))))
+            else:
+                f.write(line_format.format(int(minute) % 60, second, "DEBUG", "dcevaluator.communication.dc_client:on_telemetry:150",
+                                           build_log_tag(turn=i // 1000, active_node=i % 100, last_node=i % 100 - 1, distance_center=random.uniform(-2, 2))))
+        f.write(line_format.format(59, 59.0, "INFO", "dcevaluator.launch:run:135", build_log_tag("Donkey Car Evaluator", "END")))
+
+def legacy_load(log_path):
+    """
+    Implementation of `LogParser.load` before the streaming parser (without the progress bar)
+    """
+    log_line_regex = r"^[^|\n]+\| *[A-Z]+ *\|[^|]+$"
+    arg_regex = r"\[([^\[=\"'\]]+)\]"
+    kwarg_regex = r"\[([^\[=\"'\]]+)=\"([^\"]*)\"\]"
+    rows = []
+    with open(log_path, "r") as f:
+        for line in f:
+            if re.match(log_line_regex, line):
+                cleaned_splited_line = [s.strip() for s in line.split("|")]
+                position, message = cleaned_splited_line.pop(2).split(" - ")
+                cleaned_splited_line.append(position)
+                cleaned_splited_line.append(re.findall(arg_regex, message))
+                kwarg = dict()
+                for match in re.finditer(kwarg_regex, message, re.S):
+                    kwarg[match.group(1)] = match.group(2)
+                cleaned_splited_line.append(kwarg)
+                rows.append(cleaned_splited_line)
+    return pd.DataFrame(rows, columns = ["datetime", "level", "position", "args", "kwargs"])
+
+def measure(name, load, nbr_lines, repeat):
+    durations = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        data = load()
+        durations.append(time.perf_counter() - start_time)
+    duration = min(durations)
+    print("    {:<42} {:>8.2f} s {:>12.0f} lines/s {:>10.1f} MB".format(name, duration, nbr_lines / duration, data.memory_usage(deep=True).sum() / 1e6))
+    return data
+
+def run(nbr_lines, max_workers, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "bench.log")
+        write_log(log_path, nbr_lines)
+        print("Log : " + str(nbr_lines) + " lines (" + str(os.path.getsize(log_path) // 1024) + " KB), " + str(os.cpu_count()) + " cores")
+        expected = measure("legacy", lambda: legacy_load(log_path), nbr_lines, repeat)
+        measure("streaming", lambda: LogParser(log_path, use_cache=False).data, nbr_lines, repeat)
+        measure("streaming (keep_raw=False)", lambda: LogParser(log_path, keep_raw=False, use_cache=False).data, nbr_lines, repeat)
+        # The first load writes the cache, the measured ones only read it
+        LogParser(log_path, keep_raw=False)
+        measure("cached reload (keep_raw=False)", lambda: LogParser(log_path, keep_raw=False).data, nbr_lines, repeat)
+        nbr_workers = 2
+        while nbr_workers <= max_workers:
+            data = measure("parallel (" + str(nbr_workers) + " workers)", lambda: load_parallel(log_path, nbr_workers), nbr_lines, repeat)
+            assert data.args.tolist() == expected.args.tolist()
+            nbr_workers *= 2
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nbr-lines", type=int, default=500000, help="number of lines of the generated log")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="maximum number of processes of the parallel loader")
+    parser.add_argument("--repeat", type=int, default=3, help="number of measures (the best one is displayed)")
+    args = parser.parse_args()
+    run(args.nbr_lines, args.max_workers, args.repeat)
@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of the decoding of the telemetry requests
+
+Compare the legacy path (`replace_float_notation` then `json.loads`)
+with the `RequestDecoder` (detection of the comma notation, single-pass fix, optional `orjson`).
+
+Usage : python benchmarks/bench_request_decoding.py [--number 2000]
+"""
+import argparse
+import base64
+import json
+import os
+import timeit
+
+from dcevaluator.communication.decoder import RequestDecoder
+from dcevaluator.utils.utils import replace_float_notation
+
+def build_telemetry_request(comma_notation, image_size = 16 * 1024):
+    """
+    Build a telemetry request like the ones sent by the simulator
+
+    :param comma_notation: write the floats with a comma as decimal separator
+    :param image_size: number of random bytes of the image (before base64 encoding)
+    :return: the request as bytes
+    """
+    request = {
+        "msg_type": "telemetry",
+        "steering_angle": -0.123456,
+        "throttle": 0.3,
+        "speed": 4.56789,
+        "image": base64.b64encode(os.urandom(image_size)).decode("ascii"),
+        "hit": "none",
+        "time": 12.345678,
+        "pos_x": 48.123456,
+        "pos_y": 0.5678,
+        "pos_z": -12.98765,
+        "cte": -0.456789,
+        "activeNode": 42,
+        "totalNodes": 112,
+    }
+    request_string = json.dumps(request, separators=(",", ":"))
+    if comma_notation:
+        for key in ["steering_angle", "throttle", "speed", "time", "pos_x", "pos_y", "pos_z", "cte"]:
+            value = json.dumps(request[key])
+            request_string = request_string.replace('"' + key + '":' + value, '"' + key + '":' + value.replace(".", ","))
+    return request_string.encode("utf-8")
+
+def legacy_decode(request_bytes):
+    return json.loads(replace_float_notation(request_bytes.decode("utf-8")))
+
+def run(number):
+    decoders = [
+        ("legacy (replace_float_notation + json)", legacy_decode),
+        ("RequestDecoder (json)", RequestDecoder(use_fast_json=False).decode),
+        ("RequestDecoder (fast json)", RequestDecoder(use_fast_json=True).decode),
+    ]
+    for comma_notation in [False, True]:
+        request_bytes = build_telemetry_request(comma_notation)
+        expected = legacy_decode(request_bytes)
+        print("Comma notation : " + str(comma_notation) + " (" + str(len(request_bytes)) + " bytes)")
+        for name, decode in decoders:
+            assert decode(request_bytes) == expected, name
+            duration = timeit.timeit(lambda: decode(request_bytes), number=number)
+            print("    {:<42} {:>9.2f} us/request".format(name, duration / number * 1e6))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="number of decodings per measure")
+    run(parser.parse_args().number)
@@ -0,0 +1,131 @@
+import math
+import pandas as pd
+
+def parse_number(value, default = None):
+    """
+    Convert a value of a kwarg to a float
+
+    :param value: string written by `build_log_tag` (e.g. "12.5" or "None"), number or None
+    :param default: returned if the value is not a number
+    :return: float or `default`
+    """
+    if value is None:
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return default if math.isnan(number) else number
+
+def parse_integer(value, default = None):
+    """
+    Convert a value of a kwarg to an int
+
+    :param value: string written by `build_log_tag` (e.g. "12" or "None"), number or None
+    :param default: returned if the value is not a number
+    :return: int or `default`
+    """
+    number = parse_number(value)
+    return default if number is None else int(number)
+
+class EpochSummaries:
+    # Tags of the lines ending an epoch, with the reason of the end
+    END_REASON_TAGS = {
+        "ILLEGAL MOVE": "car_leaving_road",
+        "TIMEOUT": "timeout",
+        "LIMIT": "turns_limit",
+    }
+
+    def __init__(self):
+        """
+        Epoch Summaries
+
+        Running summary of each epoch of an evaluation log, updated line by line (e.g. while following a log, see `LogParser.follow`):
+        number of turns, lap times (from the "NEW TURN" lines), off-road events, timeouts and maximum distance to the center of the road.
+        """
+        self.summaries = []
+        self.current = None
+
+    def reset(self):
+        """
+        Forget all the epochs (e.g. when the log is rotated)
+        """
+        self.summaries = []
+        self.current = None
+
+    def observe(self, datetime, args, kwargs):
+        """
+        Update the summaries with a line of log
+
+        :param datetime: date of the line
+        :param args: args of the line (see `build_log_tag`)
+        :param kwargs: kwargs of the line, as strings or numbers
+        :return: the summary of the current epoch if this line is an event of the epoch (a tagged line), else None
+        """
+        tag = args[0] if len(args) > 0 else None
+        if tag == "EVALUATION" and "BEGIN" in args:
+            self.current = {
+                "epoch": parse_integer(kwargs.get("epoch")),
+                "begin": datetime,
+                "end": None,
+                "end_reason": None,
+                "turn": 0,
+                "turn_times": [],
+                "active_node": None,
+                "max_abs_distance_center": None,
+                "nbr_illegal_moves": 0,
+                "nbr_timeouts": 0,
+            }
+            self.summaries.append(self.current)
+            return self.current
+        if self.current is None:
+            return None
+
+        if tag is None:
+            # Telemetry line
+            distance_center = parse_number(kwargs.get("distance_center"))
+            if distance_center is not None:
+                max_abs_distance_center = self.current["max_abs_distance_center"]
+                self.current["max_abs_distance_center"] = abs(distance_center) if max_abs_distance_center is None else max(max_abs_distance_center, abs(distance_center))
+                self.current["active_node"] = parse_integer(kwargs.get("active_node"), self.current["active_node"])
+            return None
+
+        if tag == "EVALUATION" and "END" in args:
+            self.current["end"] = datetime
+        elif tag == "NEW TURN":
+            self.current["turn"] = parse_integer(kwargs.get("turn"), self.current["turn"] + 1)
+            # The "deltatime" is the time since the beginning of the first turn, so it is the end of the lap
+            turn_time = parse_number(kwargs.get("deltatime"))
+            if turn_time is not None:
+                self.current["turn_times"].append(turn_time)
+        elif tag in self.END_REASON_TAGS:
+            self.current["end_reason"] = self.END_REASON_TAGS[tag]
+            if tag == "ILLEGAL MOVE":
+                self.current["nbr_illegal_moves"] += 1
+            elif tag == "TIMEOUT":
+                self.current["nbr_timeouts"] += 1
+        else:
+            return None
+        return self.current
+
+    def frame(self):
+        """
+        :return: DataFrame with one row per epoch, with the lap times, the mean and the best lap time
+        """
+        rows = []
+        for summary in self.summaries:
+            turn_times = summary["turn_times"]
+            lap_times = [end - start for start, end in zip([0.0] + turn_times[:-1], turn_times)]
+            row = { key: value for key, value in summary.items() if key != "turn_times" }
+            row["lap_times"] = lap_times
+            row["mean_lap_time"] = sum(lap_times) / len(lap_times) if len(lap_times) > 0 else None
+            row["best_lap_time"] = min(lap_times) if len(lap_times) > 0 else None
+            rows.append(row)
+        columns = ["epoch", "begin", "end", "end_reason", "turn", "active_node", "max_abs_distance_center",
+                   "nbr_illegal_moves", "nbr_timeouts", "lap_times", "mean_lap_time", "best_lap_time"]
+        frame = pd.DataFrame(rows, columns=columns)
+        for column in ["epoch", "turn", "active_node"]:
+            frame[column] = frame[column].astype("Int64")
+        frame["begin"] = pd.to_datetime(frame["begin"])
+        frame["end"] = pd.to_datetime(frame["end"])
+        return frame
@@ -0,0 +1,229 @@
+from hashlib import blake2b
+from loguru import logger
+import numpy as np
+import os
+import pandas as pd
+import struct
+import zipfile
+from dcevaluator.utils.utils import build_log_tag
+
+def complete_lines_end(log_path, size, start = 0, block_size = 64 * 1024):
+    """
+    Offset of the end of the last complete line of a log (the last line may still be written)
+
+    :param log_path: the path of log
+    :param size: size of the log
+    :param start: offset from which the new line is searched
+    :param block_size: number of bytes read at once, from the end
+    :return: offset just after the last new line, `start` if there is no complete line after it
+    """
+    with open(log_path, "rb") as f:
+        end = size
+        while end > start:
+            block_start = max(start, end - block_size)
+            f.seek(block_start)
+            newline = f.read(end - block_start).rfind(b"\n")
+            if newline != -1:
+                return block_start + newline + 1
+            end = block_start
+    return start
+
+def frame_to_arrays(data):
+    """
+    Convert the typed columns of a DataFrame to NumPy arrays which can be saved without pickle
+
+    A categorical column is stored as its codes ("<column>.codes"), its categories ("<column>.categories")
+    and whether it is ordered ("<column>.ordered"), an Int64 column as its values ("<column>.values") and its mask ("<column>.mask").
+    The columns of objects (e.g. "args" and "kwargs") are not supported.
+
+    :param data: DataFrame
+    :return: dict name -> NumPy array, with the names of the columns in "columns"
+    """
+    arrays = { "columns": np.array(list(data.columns), dtype=str) }
+    for column in data.columns:
+        values = data[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[column + ".codes"] = values.cat.codes.to_numpy()
+            arrays[column + ".categories"] = values.cat.categories.to_numpy(dtype=str)
+            arrays[column + ".ordered"] = np.array(values.cat.ordered)
+        elif isinstance(values.dtype, pd.Int64Dtype):
+            arrays[column + ".values"] = values.to_numpy(dtype=np.int64, na_value=0)
+            arrays[column + ".mask"] = values.isna().to_numpy()
+        elif values.dtype == object:
+            raise TypeError("The column " + column + " cannot be stored without pickle")
+        else:
+            arrays[column] = values.to_numpy()
+    return arrays
+
+def arrays_to_frame(arrays):
+    """
+    Build the DataFrame converted by `frame_to_arrays`
+
+    :param arrays: dict name -> NumPy array (e.g. memory-mapped arrays)
+    :return: DataFrame
+    """
+    columns = dict()
+    for column in arrays["columns"].tolist():
+        if column + ".codes" in arrays:
+            categories = pd.Index(arrays[column + ".categories"].tolist())
+            if len(categories) == 0:
+                # Same (empty) categories as a column of missing values built by pandas
+                categories = pd.Categorical([None]).categories
+            columns[column] = pd.Categorical.from_codes(arrays[column + ".codes"], categories=categories,
+                                                        ordered=bool(arrays[column + ".ordered"]))
+        elif column + ".values" in arrays:
+            columns[column] = pd.arrays.IntegerArray(arrays[column + ".values"], arrays[column + ".mask"])
+        else:
+            columns[column] = arrays[column]
+    return pd.DataFrame(columns)
+
+def load_npz(path, mmap_mode = "r"):
+    """
+    Load the arrays of an uncompressed .npz file, memory-mapped
+
+    `np.load` ignores `mmap_mode` for the .npz files, so each array is mapped at its offset in the zip file.
+    The arrays of objects are refused (they would need pickle).
+
+    :param path: path of a .npz file written by `np.savez`
+    :param mmap_mode: mode of the memory maps (see `np.memmap`), None to read the arrays into memory
+    :return: dict name -> NumPy array
+    """
+    arrays = dict()
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError("Compressed array " + info.filename)
+            # Skip the local header of the file in the zip (its extra field may differ from the central directory)
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError("Array of objects " + info.filename)
+            name = info.filename[:-len(".npy")] if info.filename.endswith(".npy") else info.filename
+            order = "F" if fortran_order else "C"
+            if mmap_mode is None or int(np.prod(shape)) * dtype.itemsize == 0:
+                array = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape, order=order)
+            else:
+                array = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=f.tell(), shape=shape, order=order).view(np.ndarray)
+            arrays[name] = array
+    return arrays
+
+class LogCache:
+    # Version of the format of the cache, increased when the parsed columns change
+    VERSION = 3
+    # Number of bytes hashed at the beginning and at the end of the parsed part of the log
+    HASH_SIZE = 64 * 1024
+
+    def __init__(self, log_path, cache_path = None):
+        """
+        Log Cache
+
+        Keep the typed columns of a parsed log (without the "args" and "kwargs" columns) in a sidecar file next to the log ("<log_path>.cache.npz").
+        The file only holds NumPy arrays (see `frame_to_arrays`): no pickle is loaded, and the arrays are memory-mapped when the cache is read.
+        The cache is valid while the parsed part of the log is unchanged, which is checked with its size, its modification time
+        and a hash of its first and last bytes. When lines were appended to the log, only the appended lines have to be parsed.
+        The sidecar file can be deleted at any time: the log is then parsed again and the cache rewritten.
+
+        :param log_path: the path of log
+        :param cache_path: the path of the cache. None to store it next to the log.
+        """
+        self.log_path = log_path
+        self.cache_path = cache_path if cache_path is not None else log_path + ".cache.npz"
+        # Size and modification time of the log when `lookup` was called
+        self.size = None
+        self.mtime_ns = None
+
+    def fingerprint(self, size):
+        """
+        Hash the beginning and the end of the first `size` bytes of the log
+
+        :param size: number of bytes of the log to fingerprint
+        :return: hexadecimal string
+        """
+        digest = blake2b(digest_size=16)
+        with open(self.log_path, "rb") as f:
+            digest.update(f.read(min(self.HASH_SIZE, size)))
+            f.seek(max(0, size - self.HASH_SIZE))
+            digest.update(f.read(min(self.HASH_SIZE, size)))
+        return digest.hexdigest()
+
+    def read(self):
+        """
+        :return: dict with the "metadata" and the memory-mapped "arrays" of the cache, or None if there is no readable cache
+        """
+        try:
+            arrays = load_npz(self.cache_path)
+            metadata = { key[len("metadata."):]: arrays.pop(key).item() for key in list(arrays) if key.startswith("metadata.") }
+            return { "metadata": metadata, "arrays": arrays }
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning(build_log_tag("LOG CACHE", "UNREADABLE", cache_path=self.cache_path))
+            return None
+
+    def lookup(self):
+        """
+        Find what is already parsed in the cache and what remains to parse
+
+        :return: tuple (cached DataFrame or None, offset of the beginning of the lines to parse, offset of the end of the complete lines)
+        """
+        stat = os.stat(self.log_path)
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        end = complete_lines_end(self.log_path, self.size)
+
+        entry = self.read()
+        if entry is None:
+            return None, 0, end
+        metadata = entry["metadata"]
+        parsed_size = metadata.get("parsed_size")
+        if metadata.get("version") != self.VERSION:
+            reason = "format"
+        elif self.size < metadata["size"]:
+            # The log was truncated or rotated
+            reason = "truncated"
+        elif self.size == metadata["size"] and self.mtime_ns != metadata["mtime_ns"]:
+            # The log was rewritten
+            reason = "modified"
+        elif self.fingerprint(parsed_size) != metadata["fingerprint"]:
+            reason = "content"
+        else:
+            logger.debug(build_log_tag("LOG CACHE", "HIT", cache_path=self.cache_path, parsed_size=parsed_size, size=self.size))
+            return arrays_to_frame(entry["arrays"]), parsed_size, max(end, parsed_size)
+
+        logger.debug(build_log_tag("LOG CACHE", "INVALID", cache_path=self.cache_path, reason=reason))
+        return None, 0, end
+
+    def save(self, data, parsed_size):
+        """
+        Write the cache (atomically, so a concurrent reader never reads a partial cache)
+
+        :param data: DataFrame of the parsed lines, without the "args" and "kwargs" columns
+        :param parsed_size: offset of the end of the parsed lines
+        """
+        metadata = {
+            "version": self.VERSION,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "parsed_size": parsed_size,
+            "fingerprint": self.fingerprint(parsed_size),
+        }
+        arrays = frame_to_arrays(data)
+        for key, value in metadata.items():
+            arrays["metadata." + key] = np.array(value)
+        temporary_path = self.cache_path + "." + str(os.getpid()) + ".tmp"
+        try:
+            with open(temporary_path, "wb") as f:
+                # Not compressed, so the arrays can be memory-mapped (see `load_npz`)
+                np.savez(f, **arrays)
+            os.replace(temporary_path, self.cache_path)
+        except OSError:
+            logger.warning(build_log_tag("LOG CACHE", "NOT SAVED", cache_path=self.cache_path))
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
@@ -1,70 +1,658 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from loguru import logger
+from threading import Event
+import gc
+import mmap
+import numpy as np
+import os
 import pandas as pd
 import re
-from tqdm import tqdm
+from dcevaluator.analyze.epoch_summary import EpochSummaries
+from dcevaluator.analyze.log_cache import LogCache, complete_lines_end
+from dcevaluator.utils.utils import build_log_tag
+
+# "DATE | LEVEL | FILE:FUNC:LINE - MESSAGE"
+LOG_LINE_PATTERN = re.compile(r"^([^|\n]+)\| *([A-Z]+) *\|([^|]+)$")
+# "[TAG1][TAG2]" (see `build_log_tag`)
+ARG_PATTERN = re.compile(r"\[([^\[=\"'\]]+)\]")
+# '[NAME1="VAL1"][NAME2="VAL2"]' (see `build_log_tag`)
+KWARG_PATTERN = re.compile(r"\[([^\[=\"'\]]+)=\"([^\"]*)\"\]", re.S)
+
+# Format of the dates written by loguru
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# Levels of loguru, from the lowest to the highest
+LEVELS = ["TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL"]
+# Kwargs promoted to their own column, with their dtype
+PROMOTED_KWARGS = {
+    "epoch": "Int64",
+    "turn": "Int64",
+    "active_node": "Int64",
+    "last_node": "Int64",
+    "distance_center": "float64",
+    "deltatime": "float64",
+}
+# Categorical columns whose categories depend on the parsed lines
+CATEGORICAL_COLUMNS = ["position", "tag", "subtag"]
+# Files smaller than this size (in bytes) are always parsed in the current process
+MIN_PARALLEL_SIZE = 1024 * 1024
+
+@contextmanager
+def paused_gc():
+    """
+    Disable the garbage collector while the records are built
+
+    Parsing creates millions of lists and dicts which trigger full collections of the (large) heap,
+    but none of them is part of a reference cycle.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+def parse_line(line):
+    """
+    Parse a line of log
+
+    :param line: the line of log
+    :return: tuple (datetime, level, position, args, kwargs) or None if this line is not a log line (e.g. a traceback)
+    """
+    match = LOG_LINE_PATTERN.match(line)
+    if match is None:
+        return None
+    datetime, level, position_and_message = match.groups()
+    # Split "FILE:FUNC:LINE - MESSAGE" with the first " - " separator
+    position, _, message = position_and_message.partition(" - ")
+    # Parse args : "[TAG1][TAG2]" ==> `[ "TAG1", "TAG2" ]`
+    args = ARG_PATTERN.findall(message)
+    # Parse kwargs : '[NAME1="VAL1"][NAME2="VAL2"]' ==> `{ NAME1 :"VAL1", NAME2 :"VAL2" }`
+    kwargs = dict(KWARG_PATTERN.findall(message))
+    return datetime.strip(), level, position.strip(), args, kwargs
+
+def iter_records(lines):
+    """
+    Parse lines of log one by one
+
+    :param lines: iterable of lines (e.g. an opened log file)
+    :return: generator of the records (see `parse_line`) of the log lines
+    """
+    for line in lines:
+        record = parse_line(line)
+        if record is not None:
+            yield record
+
+def numeric_column(values, dtype):
+    """
+    Convert strings to a numeric column
+
+    :param values: list of strings ("nan" for the missing values)
+    :param dtype: dtype of the column
+    :return: Series, NA where a value is not a number (e.g. "None")
+    """
+    try:
+        # Converted by NumPy without creating Python floats
+        numbers = np.array(values, dtype=np.float64)
+    except ValueError:
+        numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+    return pd.Series(numbers).astype(dtype)
+
+def build_frame(records, keep_raw = True):
+    """
+    Materialise records into a DataFrame with typed columns
+
+    The columns are "datetime" (datetime64), "level", "position", "tag" (the first arg) and "subtag" (the second arg) as categoricals,
+    one numeric column per promoted kwarg (see `PROMOTED_KWARGS`, missing values are NA),
+    then "args" (lists) and "kwargs" (dicts) if `keep_raw` is True.
+
+    :param records: iterable of records (see `iter_records`)
+    :param keep_raw: keep the "args" and "kwargs" columns. False to save memory on large logs.
+    :return: DataFrame with one row per record
+    """
+    records = list(records)
+    if len(records) > 0:
+        datetimes, levels, positions, all_args, all_kwargs = zip(*records)
+    else:
+        datetimes, levels, positions, all_args, all_kwargs = (), (), (), (), ()
+    del records
+    tags = [args[0] if len(args) > 0 else None for args in all_args]
+    subtags = [args[1] if len(args) > 1 else None for args in all_args]
+
+    columns = {
+        "datetime": pd.to_datetime(pd.Series(datetimes, dtype=object), format=DATETIME_FORMAT, errors="coerce"),
+        "level": pd.Categorical(levels, categories=LEVELS, ordered=True),
+        "position": pd.Categorical(positions),
+        "tag": pd.Categorical(tags),
+        "subtag": pd.Categorical(subtags),
+    }
+    for key, dtype in PROMOTED_KWARGS.items():
+        columns[key] = numeric_column([kwargs.get(key, "nan") for kwargs in all_kwargs], dtype)
+    if keep_raw:
+        columns["args"] = pd.Series(all_args, dtype=object)
+        columns["kwargs"] = pd.Series(all_kwargs, dtype=object)
+    return pd.DataFrame(columns)
+
+def concat_frames(frames):
+    """
+    Concatenate DataFrames built by `build_frame`, in order, keeping the categorical columns
+
+    :param frames: list of DataFrames
+    :return: DataFrame
+    """
+    non_empty_frames = [frame for frame in frames if len(frame) > 0]
+    if len(non_empty_frames) == 0:
+        return frames[0] if len(frames) > 0 else build_frame([])
+    if len(non_empty_frames) == 1:
+        return non_empty_frames[0]
+    frames = non_empty_frames
+    data = pd.concat(frames, ignore_index=True)
+    # The categories differ between the frames, so pandas falls back on objects
+    for column in CATEGORICAL_COLUMNS:
+        data[column] = data[column].astype("category")
+    return data
+
+def categorical_index(column, offset = 0):
+    """
+    Rows of each category of a categorical column
+
+    :param column: categorical Series
+    :param offset: added to the row numbers
+    :return: dict category -> sorted NumPy array of the row numbers
+    """
+    codes = column.cat.codes.to_numpy()
+    rows = np.flatnonzero(codes >= 0)
+    # The stable sort keeps the rows of each category in order
+    sorted_rows = rows[np.argsort(codes[rows], kind="stable")] + offset
+    counts = np.bincount(codes[rows], minlength=len(column.cat.categories))
+    return { category: category_rows
+             for category, category_rows in zip(column.cat.categories, np.split(sorted_rows, np.cumsum(counts)[:-1]))
+             if len(category_rows) > 0 }
+
+def add_to_index(index, other):
+    """
+    Add the rows of an index to another one
+
+    :param index: dict key -> sorted NumPy array of row numbers, updated
+    :param other: dict key -> sorted NumPy array of row numbers
+    """
+    for key, rows in other.items():
+        if key in index:
+            index[key] = np.union1d(index[key], rows)
+        else:
+            index[key] = rows
+
+def build_index(data, offset = 0):
+    """
+    Build the inverted indexes of the lines of a log
+
+    The tag index gives the rows of each arg ("tag" and "subtag" columns, then the other args if the "args" column is kept),
+    the kwarg index gives the rows of each kwarg key ("kwargs" column, or the promoted kwargs if it is not kept).
+
+    :param data: DataFrame built by `build_frame`
+    :param offset: added to the row numbers (e.g. the number of rows already indexed)
+    :return: tuple (tag index, kwarg index), dicts key -> sorted NumPy array of the row numbers
+    """
+    tag_index = categorical_index(data["tag"], offset)
+    add_to_index(tag_index, categorical_index(data["subtag"], offset))
+    if "args" in data:
+        other_args = dict()
+        for row, args in enumerate(data["args"].to_numpy()):
+            for arg in args[2:]:
+                other_args.setdefault(arg, []).append(row + offset)
+        add_to_index(tag_index, { arg: np.array(rows) for arg, rows in other_args.items() })
+
+    kwarg_index = dict()
+    if "kwargs" in data:
+        # Most of the lines have the same keys (e.g. the telemetry), so the rows are grouped by set of keys first
+        rows_of_keys = dict()
+        for row, kwargs in enumerate(data["kwargs"].to_numpy()):
+            rows_of_keys.setdefault(tuple(kwargs), []).append(row + offset)
+        for keys, rows in rows_of_keys.items():
+            rows = np.array(rows)
+            add_to_index(kwarg_index, { key: rows for key in keys })
+    else:
+        for key in PROMOTED_KWARGS:
+            rows = np.flatnonzero(data[key].notna().to_numpy()) + offset
+            if len(rows) > 0:
+                kwarg_index[key] = rows
+    return tag_index, kwarg_index
+
+def split_byte_ranges(log_path, nbr_ranges, start = 0, end = None):
+    """
+    Split (a part of) a log file into byte ranges of about the same size, aligned on the lines
+
+    :param log_path: the path of log
+    :param nbr_ranges: number of ranges
+    :param start: offset of the beginning of the part to split (beginning of a line)
+    :param end: offset of the end of the part to split, excluded. None for the end of the file.
+    :return: list of (start, end) offsets, `end` excluded
+    """
+    if end is None:
+        end = os.path.getsize(log_path)
+    if end <= start:
+        return []
+    boundaries = [start]
+    with open(log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, nbr_ranges):
+            offset = max(start + (end - start) * i // nbr_ranges, boundaries[-1])
+            # Each range ends just after a new line
+            newline = mm.find(b"\n", offset, end)
+            boundaries.append(end if newline == -1 else newline + 1)
+    boundaries.append(end)
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+def iter_range_lines(mm, start, end):
+    """
+    Decode the lines of a byte range of a memory-mapped file one by one
+
+    :param mm: mmap of the log file
+    :param start: offset of the beginning of the range (beginning of a line)
+    :param end: offset of the end of the range, excluded
+    :return: generator of the lines
+    """
+    position = start
+    while position < end:
+        newline = mm.find(b"\n", position, end)
+        stop = end if newline == -1 else newline + 1
+        yield mm[position:stop].decode("utf-8", errors="replace")
+        position = stop
+
+def parse_byte_range(log_path, start, end, keep_raw = True):
+    """
+    Parse a byte range of a log file (run in the workers of `load_parallel`)
+
+    :param log_path: the path of log
+    :param start: offset of the beginning of the range (beginning of a line)
+    :param end: offset of the end of the range, excluded
+    :param keep_raw: keep the "args" and "kwargs" columns
+    :return: DataFrame (see `build_frame`)
+    """
+    if end <= start:
+        return build_frame([], keep_raw=keep_raw)
+    with open(log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, paused_gc():
+        return build_frame(iter_records(iter_range_lines(mm, start, end)), keep_raw=keep_raw)
+
+def load_parallel(log_path, nbr_workers = None, keep_raw = True, start = 0, end = None):
+    """
+    Parse (a part of) a log file on several cores
+
+    The file is split into byte ranges aligned on the lines (see `split_byte_ranges`),
+    each range is parsed from a memory map in a process of a pool,
+    then the partial DataFrames are concatenated in the order of the file.
+
+    :param log_path: the path of log
+    :param nbr_workers: number of processes. None to use all the cores.
+    :param keep_raw: keep the "args" and "kwargs" columns
+    :param start: offset of the beginning of the part to parse (beginning of a line)
+    :param end: offset of the end of the part to parse, excluded. None for the end of the file.
+    :return: DataFrame (see `build_frame`)
+    """
+    nbr_workers = nbr_workers or os.cpu_count() or 1
+    ranges = split_byte_ranges(log_path, nbr_workers, start, end)
+    if len(ranges) == 0:
+        return build_frame([], keep_raw=keep_raw)
+    if nbr_workers == 1 or len(ranges) <= 1 or ranges[-1][1] - ranges[0][0] < MIN_PARALLEL_SIZE:
+        return concat_frames([parse_byte_range(log_path, start, end, keep_raw) for start, end in ranges])
+
+    with ProcessPoolExecutor(max_workers=nbr_workers) as executor:
+        futures = [executor.submit(parse_byte_range, log_path, start, end, keep_raw) for start, end in ranges]
+        return concat_frames([future.result() for future in futures])
 
 class LogParser:
-    def __init__(self, log_path):
+    def __init__(self, log_path, keep_raw = True, progress = False, nbr_workers = 1, use_cache = True):
         """
         Log Parser
 
+        The log file is streamed line by line with precompiled patterns,
+        then the records are materialised into typed columns (see `build_frame`).
+        Without the raw columns, the typed columns are cached next to the log (see `LogCache`),
+        so reopening the log only parses the lines appended since the last load.
+        The rows of each tag and of each kwarg key are indexed (see `build_index`) to query the lines without scanning the DataFrame.
+        The log can then be followed while it is written (see `follow`): only the appended lines are parsed.
+
         :param log_path: the path of log
+        :param keep_raw: keep the "args" (lists) and "kwargs" (dicts) columns. False to save memory on large logs.
+        :param progress: display a progress bar (requires `tqdm`). Only when the log is parsed in the current process.
+        :param nbr_workers: number of processes parsing the log (see `load_parallel`). None to use all the cores.
+        :param use_cache: read and write the cache of the parsed log, in the sidecar file "<log_path>.cache.npz".
+                          Only used with `keep_raw` False: the "args" and "kwargs" columns cannot be stored in NumPy arrays.
         """
         # Regex
-        self.log_line_regex = r"^[^|\n]+\| *[A-Z]+ *\|[^|]+$"
-        self.arg_regex = r"\[([^\[=\"'\]]+)\]"
-        self.kwarg_regex = r"\[([^\[=\"'\]]+)=\"([^\"]*)\"\]"
+        self.log_line_regex = LOG_LINE_PATTERN
+        self.arg_regex = ARG_PATTERN
+        self.kwarg_regex = KWARG_PATTERN
+
+        self.keep_raw = keep_raw
+        self.progress = progress
+        self.nbr_workers = nbr_workers
+        self.use_cache = use_cache
+
+        # Inverted indexes: tag -> rows, kwarg key -> rows
+        self.tag_index = dict()
+        self.kwarg_index = dict()
+
+        # Follow mode
+        self.log_path = log_path
+        # Offset of the end of the parsed lines and inode of the parsed file
+        self.offset = 0
+        self.inode = None
+        # Frames of the lines parsed by `update`, appended to `data` when it is read
+        self.new_frames = []
+        self.nbr_rows = 0
+        self.epoch_summaries = None
+        self.follow_stopped = Event()
 
         self.data = self.load(log_path)
-    
+
+    @property
+    def data(self):
+        """
+        DataFrame containing the lines of log file
+        """
+        if len(self.new_frames) > 0:
+            self._data = concat_frames([self._data] + self.new_frames)
+            self.new_frames = []
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self.new_frames = []
+        self.nbr_rows = len(data)
+
+    def iter_records(self, log_path):
+        """
+        Stream the records of a log file
+
+        :param log_path: the path of log
+        :return: generator of the records (see `parse_line`)
+        """
+        with open(log_path, "r") as f:
+            lines = f
+            if self.progress:
+                from tqdm import tqdm
+                lines = tqdm(f)
+            yield from iter_records(lines)
+
+    def parse_range(self, log_path, start, end):
+        """
+        Parse a byte range of a log file
+
+        :param log_path: the path of log
+        :param start: offset of the beginning of the range (beginning of a line)
+        :param end: offset of the end of the range, excluded
+        :return: DataFrame (see `build_frame`)
+        """
+        if self.nbr_workers != 1:
+            return load_parallel(log_path, self.nbr_workers, self.keep_raw, start, end)
+        if end <= start:
+            return build_frame([], keep_raw=self.keep_raw)
+        with open(log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, paused_gc():
+            lines = iter_range_lines(mm, start, end)
+            if self.progress:
+                from tqdm import tqdm
+                lines = tqdm(lines)
+            return build_frame(iter_records(lines), keep_raw=self.keep_raw)
+
     def load(self, log_path):
         """
         Load log file
-        
+
         Store the result in `data` attribute
 
         :param log_path: the path of log
         :return: DataFrame containing the lines of log file
         """
-        rows = []
-        columns = ["datetime", "level", "position", "args", "kwargs"]
-        with open(log_path, "r") as f:
-            for line in tqdm(f):
-                # Check if this line is a log line or not
-                if re.match(self.log_line_regex, line):
-                    # Split "DATE | LEVEL | FILE:FUNC:LINE - MESSAGE" with "|" separator
-                    splited_line = line.split("|")
-
-                    # We remove space and `\n` before and after the string in each cell
-                    cleaned_splited_line = [s.strip() for s in splited_line]
-
-                    # Split "FILE:FUNC:LINE - MESSAGE" with " - " separator
-                    position_and_message = cleaned_splited_line.pop(2)
-                    # So, we have : `[ "DATE", "LEVEL" ]`
-                    
-                    position, message = position_and_message.split(" - ")
-
-                    # Append `position` into `cleaned_splited_line`
-                    # To get this : `[ "DATE", "LEVEL", "FILE:FUNC:LINE" ]`
-                    cleaned_splited_line.append(position)
-
-                    # Parse args : "[TAG1][TAG2]" ==> `[ "TAG1", "TAG2" ]`
-                    args = re.findall(self.arg_regex, message)
-                    cleaned_splited_line.append(args)
-
-                    # Parse kwargs : '[NAME1="VAL1"][NAME2="VAL2"]' ==> `{ NAME1 :"VAL1", NAME2 :"VAL2" }`
-                    kwarg = dict()
-                    for match in re.finditer(self.kwarg_regex, message, re.S):
-                        kwarg[match.group(1)] = match.group(2)
-                    cleaned_splited_line.append(kwarg)
-
-                    rows.append(cleaned_splited_line)
-        self.data = pd.DataFrame(rows, columns = columns)
+        stat = os.stat(log_path)
+        if not self.use_cache or self.keep_raw:
+            end = complete_lines_end(log_path, stat.st_size)
+            self.data = self.parse_range(log_path, 0, end)
+        else:
+            cache = LogCache(log_path)
+            cached_data, start, end = cache.lookup()
+            if cached_data is not None and start == end:
+                self.data = cached_data
+            else:
+                new_data = self.parse_range(log_path, start, end)
+                self.data = concat_frames([cached_data, new_data]) if cached_data is not None else new_data
+                cache.save(self.data, end)
+        self.log_path = log_path
+        self.offset = end
+        self.inode = stat.st_ino
+        self.epoch_summaries = None
+        self.tag_index, self.kwarg_index = build_index(self.data)
         return self.data
-    
+
+    def reset(self):
+        """
+        Forget all the parsed lines (e.g. when the log is rotated)
+        """
+        self.data = build_frame([], keep_raw=self.keep_raw)
+        self.tag_index, self.kwarg_index = dict(), dict()
+        self.offset = 0
+        if self.epoch_summaries is not None:
+            self.epoch_summaries.reset()
+
+    def replay_epoch_summaries(self):
+        """
+        Build the running summaries of the epochs (see `EpochSummaries`) from the lines already parsed
+        """
+        self.epoch_summaries = EpochSummaries()
+        data = self.data
+        if "kwargs" in data:
+            all_args = data["args"].to_numpy()
+            all_kwargs = data["kwargs"].to_numpy()
+        else:
+            all_args = [[arg for arg in args if isinstance(arg, str)] for args in zip(data["tag"].astype(object).to_numpy(), data["subtag"].astype(object).to_numpy())]
+            promoted = data[list(PROMOTED_KWARGS)].astype(object)
+            all_kwargs = promoted.where(promoted.notna(), None).to_dict("records")
+        for datetime, args, kwargs in zip(data["datetime"].to_numpy(), all_args, all_kwargs):
+            self.epoch_summaries.observe(datetime, args, kwargs)
+
+    def update(self, on_epoch = None):
+        """
+        Parse the lines appended to the log since the last load or update
+
+        The log is parsed again from the beginning if it was rotated (another file) or truncated.
+
+        :param on_epoch: function called with the summary of the current epoch (see `EpochSummaries.observe`) after each event of the epoch
+        :return: DataFrame containing the new lines
+        """
+        if self.epoch_summaries is None:
+            self.replay_epoch_summaries()
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            # The log is being rotated
+            return build_frame([], keep_raw=self.keep_raw)
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            logger.info(build_log_tag("LOG PARSER", "ROTATED", log_path=self.log_path, offset=self.offset, size=stat.st_size))
+            self.reset()
+            self.inode = stat.st_ino
+
+        end = complete_lines_end(self.log_path, stat.st_size, start=self.offset)
+        if end <= self.offset:
+            return build_frame([], keep_raw=self.keep_raw)
+        with open(self.log_path, "rb") as f:
+            f.seek(self.offset)
+            lines = f.read(end - self.offset).decode("utf-8", errors="replace").splitlines(keepends=True)
+        records = list(iter_records(lines))
+        for datetime, _, _, args, kwargs in records:
+            summary = self.epoch_summaries.observe(datetime, args, kwargs)
+            if summary is not None and on_epoch is not None:
+                on_epoch(summary)
+
+        new_data = build_frame(records, keep_raw=self.keep_raw)
+        tag_index, kwarg_index = build_index(new_data, offset=self.nbr_rows)
+        add_to_index(self.tag_index, tag_index)
+        add_to_index(self.kwarg_index, kwarg_index)
+        self.new_frames.append(new_data)
+        self.nbr_rows += len(new_data)
+        self.offset = end
+        # The new lines are numbered after the parsed ones
+        new_data.index = pd.RangeIndex(self.nbr_rows - len(new_data), self.nbr_rows)
+        return new_data
+
+    def follow(self, interval = 1.0, on_lines = None, on_epoch = None):
+        """
+        Follow the log while it is written, until `stop_following` is called
+
+        Every `interval` seconds, the appended lines are parsed (see `update`) and added to `data`,
+        the indexes and the running summaries of the epochs (`epoch_summaries`).
+
+        :param interval: delay between two reads of the log in seconds
+        :param on_lines: function called with the DataFrame of the new lines after each read
+        :param on_epoch: function called with the summary of the current epoch after each event of the epoch (new turn, off-road, ...)
+        """
+        self.follow_stopped.clear()
+        while True:
+            new_data = self.update(on_epoch)
+            if on_lines is not None and len(new_data) > 0:
+                on_lines(new_data)
+            if self.follow_stopped.wait(interval):
+                break
+
+    def stop_following(self):
+        """
+        Stop `follow`
+        """
+        self.follow_stopped.set()
+
+    def rows_with_tag(self, *tags):
+        """
+        Rows of the lines holding all the given tags
+
+        :param tags: tags (args of `build_log_tag`), e.g. "EVALUATION", "BEGIN"
+        :return: sorted NumPy array of the row numbers
+        """
+        rows = None
+        for tag in tags:
+            tag_rows = self.tag_index.get(tag, np.empty(0, dtype=np.int64))
+            rows = tag_rows if rows is None else np.intersect1d(rows, tag_rows, assume_unique=True)
+        return rows if rows is not None else np.arange(len(self.data))
+
+    def lines_with_tag(self, *tags):
+        """
+        Lines holding all the given tags
+
+        :param tags: tags (args of `build_log_tag`), e.g. "NEW TURN"
+        :return: DataFrame containing the lines
+        """
+        return self.data.iloc[self.rows_with_tag(*tags)]
+
+    def rows_with_kwarg(self, key):
+        """
+        :param key: kwarg key (kwargs of `build_log_tag`), e.g. "distance_center"
+        :return: sorted NumPy array of the row numbers of the lines holding this kwarg
+        """
+        return self.kwarg_index.get(key, np.empty(0, dtype=np.int64))
+
+    def lines_with_kwarg(self, key):
+        """
+        :param key: kwarg key (kwargs of `build_log_tag`), e.g. "distance_center"
+        :return: DataFrame containing the lines holding this kwarg
+        """
+        return self.data.iloc[self.rows_with_kwarg(key)]
+
+    def kwargs_frame(self, rows):
+        """
+        Kwargs of some lines as columns, converted to numbers when possible
+
+        :param rows: row numbers
+        :return: DataFrame with the datetime and one column per kwarg key (only the promoted kwargs if the "kwargs" column is not kept)
+        """
+        lines = self.data.iloc[rows]
+        if "kwargs" in self.data:
+            frame = pd.DataFrame.from_records(list(lines["kwargs"]), index=lines.index)
+            for column in frame.columns:
+                try:
+                    # `build_log_tag` writes "None" for the missing values
+                    frame[column] = pd.to_numeric(frame[column].replace("None", np.nan))
+                except (ValueError, TypeError):
+                    pass
+        else:
+            frame = lines[list(PROMOTED_KWARGS)].dropna(axis=1, how="all")
+        frame.insert(0, "datetime", lines["datetime"])
+        return frame
+
+    def epochs(self):
+        """
+        Beginning and end of each epoch ("EVALUATION" "BEGIN" and "END" lines)
+
+        :return: DataFrame with one row per epoch: epoch, begin_row, end_row, begin, end and duration (in seconds).
+                 The end is NA if the epoch is not ended.
+        """
+        begin_rows = self.rows_with_tag("EVALUATION", "BEGIN")
+        end_rows = self.rows_with_tag("EVALUATION", "END")
+        # The end of an epoch is the first end after its beginning, if it is before the next beginning
+        first_ends = np.searchsorted(end_rows, begin_rows)
+        end_candidates = end_rows[np.minimum(first_ends, len(end_rows) - 1)] if len(end_rows) > 0 else np.zeros(len(begin_rows), dtype=np.int64)
+        next_begin_rows = np.append(begin_rows[1:], len(self.data))
+        is_not_ended = (first_ends >= len(end_rows)) | (end_candidates >= next_begin_rows)
+        end_candidates[is_not_ended] = 0
+
+        datetimes = self.data["datetime"].to_numpy()
+        epochs = pd.DataFrame({
+            "epoch": self.data["epoch"].array[begin_rows],
+            "begin_row": begin_rows,
+            "end_row": pd.Series(end_candidates, dtype="Int64").mask(is_not_ended),
+            "begin": datetimes[begin_rows],
+            "end": pd.Series(datetimes[end_candidates]).mask(is_not_ended),
+        })
+        epochs["duration"] = (epochs["end"] - epochs["begin"]).dt.total_seconds()
+        return epochs
+
+    def epoch_of_rows(self, rows):
+        """
+        Epoch of some lines (the epoch of the last "EVALUATION" "BEGIN" line before each line)
+
+        :param rows: sorted row numbers
+        :return: Int64 array, NA for the lines before the first epoch
+        """
+        begin_rows = self.rows_with_tag("EVALUATION", "BEGIN")
+        positions = np.searchsorted(begin_rows, rows, side="right") - 1
+        if len(begin_rows) == 0:
+            return pd.array([pd.NA] * len(rows), dtype="Int64")
+        epochs = self.data["epoch"].array[begin_rows]
+        return pd.Series(epochs[np.maximum(positions, 0)]).mask(positions < 0).array
+
+    def events(self, *tags):
+        """
+        Lines holding all the given tags, with their epoch and their kwargs as columns
+
+        :param tags: tags (args of `build_log_tag`)
+        :return: DataFrame (see `kwargs_frame`)
+        """
+        rows = self.rows_with_tag(*tags)
+        frame = self.kwargs_frame(rows)
+        if "epoch" not in frame:
+            frame.insert(1, "epoch", self.epoch_of_rows(rows))
+        return frame
+
+    def summaries(self):
+        """
+        :return: DataFrame of the "SUMMARY" lines (one per ended epoch), with the kwargs as columns
+        """
+        return self.events("SUMMARY")
+
+    def illegal_moves(self):
+        """
+        :return: DataFrame of the "ILLEGAL MOVE" lines (car leaving the road), with their epoch and their kwargs as columns
+        """
+        return self.events("ILLEGAL MOVE")
+
+    def timeouts(self):
+        """
+        :return: DataFrame of the "TIMEOUT" lines, with their epoch and their kwargs as columns
+        """
+        return self.events("TIMEOUT")
+
     def find_evaluator_line(self):
         """
         Find begin/end lines of the evaluator
 
         :return: DataFrame containing the lines
         """
-        return self.data[self.data.apply(lambda r: "Donkey Car Evaluator" in r.args, axis = 1)]
\ No newline at end of file
+        return self.lines_with_tag("Donkey Car Evaluator")
@@ -0,0 +1,197 @@
+from loguru import logger
+import asyncio
+import collections
+import time
+from dcevaluator.communication.dc_client import DonkeyCarClient
+from dcevaluator.utils.utils import build_log_tag
+
+class AsyncDonkeyCarClient(DonkeyCarClient):
+
+    def __init__(self, event_handler,
+                       host = "127.0.0.1",
+                       port = 9091,
+                       telemetry_queue_size = 4,
+                       **kwargs
+                       ):
+        """
+        Donkey Car Client running on asyncio streams
+
+        It exposes the same `send_*_request` API and calls the same callbacks of the Event Handler as `DonkeyCarClient`,
+        but without any thread : the reading and the writing of the messages are coroutines of the running event loop.
+        So, a single process can drive many simulators at the same time.
+        The callbacks of the Event Handler are called from the event loop and must not block.
+
+        Ex:
+            client = AsyncDonkeyCarClient(event_handler, port=9091)
+            await client.connect()
+            client.send_load_scene_request("roboracingleague_1")
+            async for telemetry in client.telemetry():
+                ...
+
+        :param event_handler: Event Handler instance
+        :param host: host to connect to a server like ip address with string
+        :param port: port to connect to a server with int
+        :param telemetry_queue_size: number of telemetry requests kept for `telemetry` iterator. The oldest are dropped.
+        :param kwargs: the other parameters of `DonkeyCarClient`
+        """
+        super().__init__(event_handler, host, port, **kwargs)
+        self.telemetry_queue = collections.deque(maxlen = telemetry_queue_size)
+
+        self.reader = None
+        self.writer = None
+        self.event_loop = None
+        self.loop_task = None
+        self.writer_task = None
+        self.writable_event = None
+        self.telemetry_event = None
+
+    def create_sockets(self):
+        """
+        No socket to create : the streams are opened by `connect`
+        """
+        self.socket = None
+        self.wakeup_reader = None
+        self.wakeup_writer = None
+
+    async def connect(self):
+        """
+        Connect to the server and launch the processing loop as a task of the running event loop
+        """
+        try:
+            #Try to connect to a server
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            logger.success(build_log_tag("CLIENT", "CONNECTED", host=self.host, port=self.port))
+            self.connected = True
+        except ConnectionRefusedError as e:
+            self.connected = False
+            logger.critical("Could not connect to server. Is it running? If you specified 'remote', then you must start it manually.")
+            logger.critical(build_log_tag("CLIENT", "NOT CONNECTED", message="Could not connect to server. Is it running? If you specified 'remote', then you must start it manually."))
+            raise RuntimeError(e)
+
+        self.event_loop = asyncio.get_running_loop()
+        self.writable_event = asyncio.Event()
+        self.telemetry_event = asyncio.Event()
+
+        #Launch the processing loop to interpret in real time the message sent from the server
+        self.loop_task = asyncio.ensure_future(self.loop())
+
+    async def loop(self):
+        """
+        Read the messages sent by the server
+        Works until the connection to the server is lost
+        """
+        self.writer_task = asyncio.ensure_future(self.write_loop())
+        try:
+            while self.connected:
+                data = await self.reader.read(self.buffer_message_size_read)
+                if not data:
+                    # An empty message means that the server has closed the connection
+                    if self.connected:
+                        logger.warning("Socket connection closed by the server")
+                        logger.warning(build_log_tag("CLIENT", "CONNECTION CLOSED", message="Socket connection closed by the server"))
+                    break
+                self.readable_framer.feed(data, time.perf_counter())
+                self.process_readable_buffer()
+
+        except (ConnectionAbortedError, ConnectionResetError):
+            logger.warning("Socket connection aborted")
+            logger.warning(build_log_tag("CLIENT", "CONNECTION ABORTED", message="Socket connection aborted"))
+
+        finally:
+            self.connected = False
+            self.writable_event.set()
+            self.telemetry_event.set()
+            await self.writer_task
+
+    async def write_loop(self):
+        """
+        Send the waiting messages to the server each time a message is queued
+        """
+        while self.connected:
+            await self.writable_event.wait()
+            self.writable_event.clear()
+
+            payload, control_frame = self.pop_writable_payload()
+            if payload is not None and not self.writer.is_closing():
+                logger.trace("Sending : " + str(payload))
+                self.writer.write(payload)
+                await self.writer.drain()
+                logger.trace("Sent successfully : " + str(payload))
+                if control_frame is not None:
+                    self.on_control_sent(control_frame, time.perf_counter())
+
+    async def wait_closed(self):
+        """
+        Wait until the connection to the server is closed
+        """
+        if self.loop_task is not None:
+            await self.loop_task
+
+    async def telemetry(self):
+        """
+        Iterate over the telemetry requests received from the server
+
+        :return: asynchronous generator of Telemetry instances
+        """
+        while self.connected or len(self.telemetry_queue) > 0:
+            if len(self.telemetry_queue) == 0:
+                self.telemetry_event.clear()
+                await self.telemetry_event.wait()
+                continue
+            yield self.telemetry_queue.popleft()
+
+    def call_in_event_loop(self, func, *args):
+        """
+        Call a function in the event loop of the client
+        Useful when the `send_*_request` are called from another thread
+
+        :param func: the function to call
+        :param args: the arguments of the function
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self.event_loop:
+            func(*args)
+        else:
+            self.event_loop.call_soon_threadsafe(func, *args)
+
+    def wake_up(self):
+        """
+        Wake up the writing task when a message is queued
+        """
+        if self.writable_event is not None:
+            self.call_in_event_loop(self.writable_event.set)
+
+    def send_now(self, message):
+        """
+        Send the message now without waiting for the next buffer push
+
+        :param message: the message to send (str or already encoded bytes)
+        """
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        logger.trace("Sending NOW : " + str(message))
+        self.call_in_event_loop(self.writer.write, message)
+        logger.trace("Message sent NOW successfully : " + str(message))
+
+    def on_telemetry(self, request):
+        """
+        When a the telemetry request is received
+
+        :param request: Telemetry instance
+        """
+        super().on_telemetry(request)
+        self.telemetry_queue.append(request)
+        self.telemetry_event.set()
+
+    def stop(self):
+        """
+        Stop the loop in the client and close the connection
+        """
+        self.connected = False
+        if self.writer is not None:
+            self.call_in_event_loop(self.writer.close)
+        self.wake_up()
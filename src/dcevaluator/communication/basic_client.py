@@ -2,41 +2,84 @@ from loguru import logger
 
 import socket 
 import select
-from threading import Thread
+import selectors
+from threading import Thread, Lock
+import collections
 import time
 from dcevaluator.utils.utils import build_log_tag
+from dcevaluator.communication.framing import MessageFramer
 
 class BasicClient:
     def __init__(self, host = "127.0.0.1", 
                        port = 8080,
                        poll_socket_sleep_sec = 0.016,
                        buffer_message_size_read = 16 * 1024,
-                       deltatime_to_compute_fps = 5.0
+                       deltatime_to_compute_fps = 5.0,
+                       loop_mode = "selector",
+                       selector_timeout_sec = 0.5
                        ):
         """
         Basic Client on the network 
         
         :param host: host to connect to a server like ip address with string
         :param port: port to connect to a server with int
-        :param poll_socket_sleep_sec: time to sleep before polling socket
+        :param poll_socket_sleep_sec: time to sleep before polling socket (only used by the "poll" loop mode)
         :param buffer_message_size_read: number of bits to read into the socket
         :param delatime_to_compute_fps: deltatime between computation of the FPS
+        :param loop_mode: "selector" to block until the socket is readable or a message is queued, "poll" to sleep then poll the socket (legacy behavior)
+        :param selector_timeout_sec: maximum time to block in the "selector" loop mode before checking if the client is still connected
         """
+        if loop_mode not in ("selector", "poll"):
+            raise ValueError("Unknown loop mode : " + str(loop_mode))
+
         self.host = host
         self.port = port
 
         self.poll_socket_sleep_sec = poll_socket_sleep_sec
         self.buffer_message_size_read = buffer_message_size_read
         self.deltatime_to_compute_fps = deltatime_to_compute_fps
+        self.loop_mode = loop_mode
+        self.selector_timeout_sec = selector_timeout_sec
 
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.create_sockets()
         self.connected = False
 
-        self.readable_buffer = ""
-        self.writable_buffer = ""
+        # Reusable receive buffer and framer of the messages received from the server
+        self.receive_buffer = bytearray(self.buffer_message_size_read)
+        self.receive_view = memoryview(self.receive_buffer)
+        self.readable_framer = MessageFramer(b"\n")
+        # Messages to send in order (config, scene, ...) and the latest control message which overwrites the older ones not sent yet
+        self.write_lock = Lock()
+        self.writable_queue = collections.deque()
+        self.control_message = None
+        self.control_frame = None
+        self.nbr_control_messages_overwritten = 0
+        # Prevent the messages sent with `send_now` from being mixed with the ones sent by the loop
+        self.socket_lock = Lock()
 
         self.nbr_frame_for_fps = 0
         self.first_frame_time = time.time()
+        # Time (`time.perf_counter`) of the reception of the first bytes of the request being processed
+        self.request_received_at = None
+
+    def create_sockets(self):
+        """
+        Create the socket to talk with the server
+        and the pair of sockets used to wake up the "selector" loop when a message is queued from another thread
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+        self.wakeup_writer.setblocking(False)
+
+    def close_sockets(self):
+        """
+        Close the socket of the server and the wake-up sockets (when the loop exits or if the connection failed)
+        """
+        for opened_socket in (self.socket, self.wakeup_reader, self.wakeup_writer):
+            if opened_socket is not None:
+                opened_socket.close()
     
     def connect(self):
         """
@@ -51,16 +94,56 @@ class BasicClient:
             self.connected = False
             logger.critical("Could not connect to server. Is it running? If you specified 'remote', then you must start it manually.")
             logger.critical(build_log_tag("CLIENT", "NOT CONNECTED", message="Could not connect to server. Is it running? If you specified 'remote', then you must start it manually."))
+            self.close_sockets()
             raise RuntimeError(e)
         
         #Launch the processing loop to interpret in real time the message sent from the server
-        self.loop_thread = Thread(target=self.loop)
+        if self.loop_mode == "selector":
+            self.loop_thread = Thread(target=self.selector_loop)
+        else:
+            self.loop_thread = Thread(target=self.loop)
         self.loop_thread.start()
     
     def loop(self):
         """
         Process the message sending or receiving with the server
         Works until the connection to the server is lost
+
+        NOTE : Legacy loop which sleeps `poll_socket_sleep_sec` before each poll.
+        See `selector_loop` for the event-driven version.
+        """
+        # Check if the client is connected to a server
+        if not self.connected:
+            logger.error("Is not currently connected to a server !")
+            logger.error(build_log_tag("CLIENT", "NOT CONNECTED", message="Is not currently connected to a server !"))
+            return
+
+        self.socket.setblocking(False)
+
+        try:
+            while self.connected:
+                #sleep because of a error on Windows
+                time.sleep(self.poll_socket_sleep_sec)
+
+                socket_list_to_talk = [ self.socket ]
+                readable_sockets_list, writable_sockets_list, exceptional_sockets_list = select.select(socket_list_to_talk, socket_list_to_talk, socket_list_to_talk)
+                #We get a single socket in the list (or an empty list sometimes)
+                for readable_socket in readable_sockets_list:
+                    self.read_message_with_socket(readable_socket)
+                    self.process_readable_buffer()
+                    
+                for writable_socket in writable_sockets_list:
+                    self.write_message_with_socket(writable_socket)
+        finally:
+            self.close_sockets()
+
+    def selector_loop(self):
+        """
+        Process the message sending or receiving with the server
+        Works until the connection to the server is lost
+
+        The loop blocks until the server sends data or a message is queued with `send_message`.
+        The socket is only watched for writing when there is something to write.
         """
         # Check if the client is connected to a server
         if not self.connected:
@@ -70,30 +153,86 @@ class BasicClient:
 
         self.socket.setblocking(False)
 
-        while self.connected:
-            #sleep because of a error on Windows
-            time.sleep(self.poll_socket_sleep_sec)
-
-            socket_list_to_talk = [ self.socket ]
-            readable_sockets_list, writable_sockets_list, exceptional_sockets_list = select.select(socket_list_to_talk, socket_list_to_talk, socket_list_to_talk)
-            #We get a single socket in the list (or an empty list sometimes)
-            for readable_socket in readable_sockets_list:
-                self.read_message_with_socket(readable_socket)
-                self.process_readable_buffer()
-                
-            for writable_socket in writable_sockets_list:
-                self.write_message_with_socket(writable_socket)
+        selector = selectors.DefaultSelector()
+        selector.register(self.socket, selectors.EVENT_READ)
+        selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        socket_events = selectors.EVENT_READ
+
+        try:
+            while self.connected:
+                # Watch the socket for writing only if there is something to send
+                # Otherwise, a socket is almost always writable and the loop would spin
+                expected_socket_events = selectors.EVENT_READ
+                if self.has_message_to_write():
+                    expected_socket_events |= selectors.EVENT_WRITE
+                if expected_socket_events != socket_events:
+                    selector.modify(self.socket, expected_socket_events)
+                    socket_events = expected_socket_events
+
+                for key, events in selector.select(self.selector_timeout_sec):
+                    if key.fileobj is self.wakeup_reader:
+                        self.clear_wake_up()
+                        continue
+
+                    if events & selectors.EVENT_READ:
+                        self.read_message_with_socket(self.socket)
+                        self.process_readable_buffer()
+
+                    if events & selectors.EVENT_WRITE and self.connected:
+                        self.write_message_with_socket(self.socket)
+        finally:
+            selector.unregister(self.socket)
+            selector.unregister(self.wakeup_reader)
+            selector.close()
+            self.close_sockets()
+
+    def wake_up(self):
+        """
+        Wake up the loop blocked on the socket, e.g. when a message is queued
+        """
+        try:
+            self.wakeup_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            # The wake-up socket is full or closed : the loop will wake up anyway
+            pass
+
+    def clear_wake_up(self):
+        """
+        Empty the wake-up socket after the loop has been woken up
+        """
+        try:
+            while self.wakeup_reader.recv(1024):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def has_message_to_write(self):
+        """
+        Check if a message is waiting to be sent
+
+        :return: True if a message or a control message is waiting
+        """
+        return len(self.writable_queue) > 0 or self.control_message is not None
  
     def read_message_with_socket(self, readable_socket):
         """
-        Fill the readable buffer with the message received from the server
+        Fill the readable framer with the bytes received from the server
 
         :param readable_socket: The readable socket
         """
         try:
-            message = readable_socket.recv(self.buffer_message_size_read)
-            message = message.decode("utf-8")
-            self.readable_buffer += message
+            nbr_bytes = readable_socket.recv_into(self.receive_buffer)
+            if nbr_bytes == 0:
+                # An empty message means that the server has closed the connection
+                logger.warning("Socket connection closed by the server")
+                logger.warning(build_log_tag("CLIENT", "CONNECTION CLOSED", message="Socket connection closed by the server"))
+                self.connected = False
+                return
+            self.readable_framer.feed(self.receive_view[:nbr_bytes], time.perf_counter())
+
+        except BlockingIOError:
+            # Nothing to read yet (spurious wake-up)
+            pass
 
         except ConnectionAbortedError:
             logger.warn("Socket connection aborted")
@@ -102,61 +241,104 @@ class BasicClient:
 
     def write_message_with_socket(self, writable_socket):
         """
-        Send the writable buffer to the server
+        Send the waiting messages to the server
 
         :param writable_socket: The writable socket
         """
-        if self.writable_buffer != "":
-            logger.trace("Sending : " + self.writable_buffer)
-            writable_socket.sendall(self.writable_buffer.encode("utf-8"))
-            logger.trace("Sent successfully : " + self.writable_buffer)
-            self.writable_buffer = ""
+        payload, control_frame = self.pop_writable_payload()
+        if payload is not None:
+            logger.trace("Sending : " + str(payload))
+            with self.socket_lock:
+                writable_socket.sendall(payload)
+            logger.trace("Sent successfully : " + str(payload))
+            if control_frame is not None:
+                self.on_control_sent(control_frame, time.perf_counter())
 
-    def process_readable_buffer(self):
-        """
-        Process the readable buffer in catching the complete requests
-        i.e. select the message between two braces
+    def pop_writable_payload(self):
         """
-        first_brace_index = self.readable_buffer.find("{")
-        last_brace_index = self.readable_buffer.rfind("}")
+        Take the waiting messages and the latest control message, separated by `\n`
 
-        #If we catch a complete request
-        if first_brace_index >= 0 \
-            and last_brace_index >= 0 \
-            and first_brace_index < last_brace_index:
-
-            select_requests = self.readable_buffer[first_brace_index:last_brace_index + 1]
-            requests_list = select_requests.split("\n")
+        :return: (the bytes to send or None if there is nothing to send, the frame of the control message or None)
+        """
+        with self.write_lock:
+            if len(self.writable_queue) == 0 and self.control_message is None:
+                return None, None
+            messages = list(self.writable_queue)
+            self.writable_queue.clear()
+            control_frame = self.control_frame
+            if self.control_message is not None:
+                messages.append(self.control_message)
+                self.control_message = None
+                self.control_frame = None
+        return b"\n".join(messages), control_frame
 
-            #remove the selected resquests from the buffer
-            self.readable_buffer = self.readable_buffer[last_brace_index + 1:]
-            #Now, the current buffer contains the rest of the messages
-            #which will process when the message is received completely (with end brace)
+    def process_readable_buffer(self):
+        """
+        Process the readable buffer in catching the complete requests
+        i.e. the messages terminated by `\n`
 
-            for request in requests_list:
-                self.on_request_receive(request)
+        Each complete request is given as bytes to `on_request_receive`,
+        with the time of reception of its first bytes in `request_received_at`
+        """
+        for request, received_at in self.readable_framer.timed_messages():
+            self.request_received_at = received_at
+            self.on_request_receive(request)
             
     
     def send_message(self, message):
         """
         Send a message 
         
-        Add `\n` at the end of the message and add all to the writable buffer.
+        Add the message to the queue of the messages to send in order.
+        The messages are separated by `\n` when they are sent.
+
+        :param message: message to send (str or already encoded bytes)
+        """
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        with self.write_lock:
+            self.writable_queue.append(message)
+        self.wake_up()
+
+    def send_control_message(self, message, frame = None):
+        """
+        Send a control message
+
+        Only the latest control message is sent : it overwrites the previous one if it has not been sent yet.
+        So, the server never receives a burst of outdated controls.
+
+        :param message: control message to send (str or already encoded bytes)
+        :param frame: the frame (e.g. telemetry) from which the control has been computed, given to `on_control_sent`
+        """
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        with self.write_lock:
+            if self.control_message is not None:
+                self.nbr_control_messages_overwritten += 1
+            self.control_message = message
+            self.control_frame = frame
+        self.wake_up()
+
+    def on_control_sent(self, frame, sent_at):
+        """
+        When a control message has been sent to the server
 
-        :param message: message to send
+        :param frame: the frame given with the control message
+        :param sent_at: time (`time.perf_counter`) when the control message was sent
         """
-        if self.writable_buffer != "":
-            self.writable_buffer += "\n"
-        self.writable_buffer = self.writable_buffer + message
+        pass
     
     def send_now(self, message):
         """
         Send the message now without waiting for the next buffer push
 
-        :param message: the message to send
+        :param message: the message to send (str or already encoded bytes)
         """
+        if isinstance(message, str):
+            message = message.encode("utf-8")
         logger.trace("Sending NOW : " + str(message))
-        self.socket.send(message.encode("utf-8"))
+        with self.socket_lock:
+            self.socket.send(message)
         logger.trace("Message sent NOW successfully : " + str(message))
 
             
@@ -164,7 +346,7 @@ class BasicClient:
         """
         When the request is received
 
-        :param request_string: request like a string
+        :param request_string: request like bytes (UTF-8 encoded JSON)
         """
         logger.trace("New request : ", request_string)
 
@@ -181,7 +363,10 @@ class BasicClient:
         """
         Reset the readable and writable buffers to avoid their sending
 
-        NOTE : Thread is not lock
+        NOTE : Thread is not lock for the readable buffer
         """
-        self.readable_buffer = ""
-        self.writable_buffer = ""
\ No newline at end of file
+        self.readable_framer.reset()
+        with self.write_lock:
+            self.writable_queue.clear()
+            self.control_message = None
+            self.control_frame = None
\ No newline at end of file
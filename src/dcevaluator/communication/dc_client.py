@@ -1,10 +1,22 @@
 from loguru import logger
+from threading import Event
 import time
 from dcevaluator.communication.basic_client import BasicClient
 import json
-import re
-from dcevaluator.utils.utils import replace_float_notation
 from dcevaluator.utils.utils import build_log_tag
+from dcevaluator.communication.decoder import RequestDecoder
+from dcevaluator.communication.telemetry import Telemetry
+
+# Requests without any parameter, encoded once
+GET_PROTOCOL_VERSION_REQUEST = json.dumps({ "msg_type": "get_protocol_version" }).encode("utf-8")
+GET_SCENE_NAMES_REQUEST = json.dumps({ "msg_type": "get_scene_names" }).encode("utf-8")
+RESET_CAR_REQUEST = json.dumps({ "msg_type": "reset_car" }).encode("utf-8")
+EXIT_SCENE_REQUEST = json.dumps({ "msg_type": "exit_scene" }).encode("utf-8")
+QUIT_APP_REQUEST = json.dumps({ "msg_type": "quit_app" }).encode("utf-8")
+# Same JSON as `json.dumps` of the control request, without building a dict at each call
+CAR_CONTROL_REQUEST_TEMPLATE = '{"msg_type": "control", "steering": "%s", "throttle": "%s", "brake": "%s"}'
+# Shape (height, width, depth) of the camera images with the default camera config
+DEFAULT_CAMERA_SHAPE = (120, 160, 3)
 
 class DonkeyCarClient(BasicClient):
 
@@ -14,11 +26,14 @@ class DonkeyCarClient(BasicClient):
                        poll_socket_sleep_sec = 0.016,
                        buffer_message_size_read = 16 * 1024,
                        deltatime_to_compute_fps = 5.0,
+                       loop_mode = "selector",
+                       selector_timeout_sec = 0.5,
                        margin_before_car_leaving_road = 6.0,
                        deltatime_min_between_turns = 10.0,
                        node_after_start_detection_turn = 105,
                        deltatime_max_between_nodes = 5,
-                       deltatime_max_after_driving_to_reach_first_node = 10
+                       deltatime_max_after_driving_to_reach_first_node = 10,
+                       decoder = None
                        ):
         """
         Donkey Car Client
@@ -26,35 +41,44 @@ class DonkeyCarClient(BasicClient):
         :param event_handler: Event Handler instance
         :param host: host to connect to a server like ip address with string
         :param port: port to connect to a server with int
-        :param poll_socket_sleep_sec: time to sleep before polling socket
+        :param poll_socket_sleep_sec: time to sleep before polling socket (only used by the "poll" loop mode)
         :param buffer_message_size_read: number of bits to read into the socket
         :param delatime_to_compute_fps: deltatime between computation of the FPS
+        :param loop_mode: "selector" to block until the socket is readable or a message is queued, "poll" to sleep then poll the socket (legacy behavior)
+        :param selector_timeout_sec: maximum time to block in the "selector" loop mode before checking if the client is still connected
         :param margin_before_car_leaving_road: distance from the center of the road at the active node to the car. Maximum value from which it can be considered that the car has left the road
         :param deltatime_min_between_turns: minimum time interval between two turns from which we can count a turn (incrementation)
         :param node_after_start_detection_turn: node from which we can possibly count a turn. (To avoid false positives on the rest of the road)
         :param deltatime_max_between_nodes: Maximum time interval to travel the distance between two nodes. If the vehicle takes too long, it is probably stuck somewhere but not far enough off the road to be considered 'off road'.
         :param deltatime_max_after_driving_to_reach_first_node: Maximum time interval for the car to reach a node if its default settings have not been changed when the car is launched. This is the case when the car moves before the real start and the evaluator has not captured this departure because the simulator does not respond.
+        :param decoder: object with a `decode(request_bytes)` method returning the request as a dict. By default, a `RequestDecoder`.
         """
-        super().__init__(host, port, poll_socket_sleep_sec, buffer_message_size_read, deltatime_to_compute_fps)
+        super().__init__(host, port, poll_socket_sleep_sec, buffer_message_size_read, deltatime_to_compute_fps, loop_mode, selector_timeout_sec)
         self.event_handler = event_handler
         self.margin_before_car_leaving_road = margin_before_car_leaving_road
         self.deltatime_min_between_turns = deltatime_min_between_turns
         self.node_after_start_detection_turn = node_after_start_detection_turn
         self.deltatime_max_between_nodes = deltatime_max_between_nodes
         self.deltatime_max_after_driving_to_reach_first_node = deltatime_max_after_driving_to_reach_first_node
+        self.decoder = decoder if decoder is not None else RequestDecoder()
+        # Shape (height, width, depth) of the images sent by the simulator, known once a cam config is sent
+        # or a first image is received (see `wait_camera_shape`)
+        self.camera_shape = DEFAULT_CAMERA_SHAPE
+        self.camera_shape_is_known = Event()
 
-    def on_request_receive(self, request_string):
+    def on_request_receive(self, request_bytes):
         """
         When a request is received
 
-        :param request_string: The request as a string
+        :param request_bytes: The request as bytes (UTF-8 encoded JSON)
         """
-        super().on_request_receive(request_string)
+        super().on_request_receive(request_bytes)
 
-        request = json.loads(replace_float_notation(request_string))
+        request = self.decoder.decode(request_bytes)
 
         if "msg_type" in request:
             msg_type = request["msg_type"]
+            self.event_handler.readiness.observe_message(msg_type)
             if msg_type == "scene_selection_ready":
                 self.on_scene_selection_ready(request)
             elif msg_type == "scene_loaded":
@@ -62,9 +86,14 @@ class DonkeyCarClient(BasicClient):
             elif msg_type == "car_loaded":
                 self.on_car_loaded(request)
             elif request["msg_type"] == "telemetry":
-                self.on_telemetry(request)
+                telemetry = Telemetry(request)
+                telemetry.received_at = self.request_received_at
+                if not self.camera_shape_is_known.is_set():
+                    self.observe_camera_shape(telemetry)
+                self.event_handler.readiness.observe_telemetry(telemetry)
+                self.on_telemetry(telemetry)
             else:
-                logger.info(request_string)
+                logger.info(request_bytes.decode("utf-8"))
 
 
     #############
@@ -93,22 +122,28 @@ class DonkeyCarClient(BasicClient):
 
         :param request: a dict representing the request (telemetry)
         """
-        self.event_handler.on_car_loaded(request)
-        self.event_handler.car_is_ready = True
+        # Atomic with the change of `on_car_loaded`, so an Evaluator created at this moment either gets the event or sees the car ready
+        with self.event_handler.state_condition:
+            self.event_handler.car_is_ready = True
+            self.event_handler.on_car_loaded(request)
 
     def on_telemetry(self, request):
         """
         When a the telemetry request is received
 
-        :param request: a dict representing the request (telemetry)
+        :param request: Telemetry instance
         """
         self.event_handler.on_telemetry(request)
 
         # Distance from the center of the road at the active node to the car
-        distance_center = request["cte"]
-        active_node = request["activeNode"]
+        distance_center = request.cte
+        active_node = request.active_node
         current_turn = self.event_handler.turn
 
+        # Updated before the check of the road margin, so the frame where the car leaves the road is recorded in the result of the epoch
+        if not self.event_handler.car_is_leaving and self.event_handler.car_is_driving and distance_center is not None:
+            self.event_handler.max_abs_cte = max(self.event_handler.max_abs_cte, abs(distance_center))
+
         # If the car goes too far off the road (limit < distance from the car) then consider it a "run off the road"      
         # Weird bug : to be sure that it won't catch the same error twice, I check that it is not a false positive with this `self.event_handler.last_node != -1`
         # It is a default value when a car is not driving
@@ -119,7 +154,7 @@ class DonkeyCarClient(BasicClient):
             self.on_car_leaving_road(request)
     
         if not self.event_handler.car_is_leaving and self.event_handler.car_is_driving:
-            logger.debug(build_log_tag(turn=current_turn, active_node=active_node, last_node=self.event_handler.last_node, distance_center=distance_center))
+            logger.debug(build_log_tag(turn=current_turn, active_node=active_node, last_node=self.event_handler.last_node, distance_center=distance_center, **self.event_handler.log_tags))
 
             # When resetting a car, its first active node can be either node=0 or node=112
             # In the case of node=0 or maximum 1, we want to initialize the timers used for the turn counter statistics.
@@ -130,7 +165,7 @@ class DonkeyCarClient(BasicClient):
             
             # If the car passes the "finish" line (count a turn)
             if self.event_handler.last_node > self.node_after_start_detection_turn and active_node < self.event_handler.last_node:
-                logger.debug(build_log_tag(first_time_on_first_turn=self.event_handler.first_time_on_first_turn, last_time_on_last_turn=self.event_handler.last_time_on_last_turn))
+                logger.debug(build_log_tag(first_time_on_first_turn=self.event_handler.first_time_on_first_turn, last_time_on_last_turn=self.event_handler.last_time_on_last_turn, **self.event_handler.log_tags))
                 
                 # When resetting a car, its first active node can be either node=0 or node=112
                 # In the case of node=node_after_start_detection_turn or maximum MAX_NODE, we want to initialize the timers used for the turn counter statistics.
@@ -187,28 +222,30 @@ class DonkeyCarClient(BasicClient):
         """
         At each turn
 
-        :param request: a dict representing the request (telemetry)
+        :param request: Telemetry instance
         """
         self.event_handler.turn += 1
         
         # Some time, when car reachs the limite of turns, the last_node doesn't have enough time to be refreshed and keep its last value, i.e. 112 instead of 0
         self.event_handler.last_node = 0
 
+        self.event_handler.splits.record_lap(time.perf_counter())
         self.event_handler.last_time_on_last_turn = time.time()
         delta = self.event_handler.last_time_on_last_turn - self.event_handler.first_time_on_first_turn
 
-        logger.success(build_log_tag("NEW TURN", turn=self.event_handler.turn, deltatime=delta))
+        logger.success(build_log_tag("NEW TURN", turn=self.event_handler.turn, deltatime=delta, **self.event_handler.log_tags))
         self.event_handler.each_turn(request)
 
     def each_node(self, request):
         """
         At each node
 
-        :param request: a dict representing the request (telemetry)
+        :param request: Telemetry instance
         """
         # We update the statistics of the last node
-        self.event_handler.last_node = request["activeNode"]
+        self.event_handler.last_node = request.active_node
         self.event_handler.last_time_on_last_node = time.time()
+        self.event_handler.splits.record_node(request.active_node, time.perf_counter())
 
         self.event_handler.each_node(request)
 
@@ -216,10 +253,10 @@ class DonkeyCarClient(BasicClient):
         """
         When a car leaves the road
 
-        :param request: a dict representing the request (telemetry)
+        :param request: Telemetry instance
         """
         logger.error("Car is leaving the road !")
-        logger.error(build_log_tag("ILLEGAL MOVE", message="Car is leaving the road", active_node=request["activeNode"], distance_center=request["cte"]))
+        logger.error(build_log_tag("ILLEGAL MOVE", message="Car is leaving the road", active_node=request.active_node, distance_center=request.cte, **self.event_handler.log_tags))
 
         self.event_handler.on_car_leaving_road(request)
         self.event_handler.car_is_leaving = True
@@ -229,7 +266,7 @@ class DonkeyCarClient(BasicClient):
         At the timeout
         """
         logger.error("Timeout to reach the next node !")
-        logger.error(build_log_tag("TIMEOUT", message="Timeout to reach the next node", max_time = self.deltatime_max_between_nodes))
+        logger.error(build_log_tag("TIMEOUT", message="Timeout to reach the next node", max_time = self.deltatime_max_between_nodes, **self.event_handler.log_tags))
         self.event_handler.on_timeout()
         self.event_handler.car_is_leaving = True
         
@@ -242,17 +279,13 @@ class DonkeyCarClient(BasicClient):
         """
         Ask for the version of the protocol. Will help know when changes are made to these messages.
         """
-        request = dict()
-        request["msg_type"] = "get_protocol_version"
-        self.send_message(json.dumps(request))
+        self.send_message(GET_PROTOCOL_VERSION_REQUEST)
     
     def send_get_scene_names_request(self):
         """
         Ask names of the scene you can load. (Menu only)
         """
-        request = dict()
-        request["msg_type"] = "get_scene_names"
-        self.send_message(json.dumps(request))
+        self.send_message(GET_SCENE_NAMES_REQUEST)
 
     def send_load_scene_request(self, scene):
         """
@@ -316,22 +349,60 @@ class DonkeyCarClient(BasicClient):
         request["offset_z"] = str(offset_z)
         request["rot_x"] = str(rot_x)
         self.send_message(json.dumps(request))
+        # With a depth of 1, the simulator still sends 3 channels
+        self.camera_shape = (int(img_h), int(img_w), 3)
+        self.camera_shape_is_known.set()
+
+    def observe_camera_shape(self, telemetry):
+        """
+        Read the shape of the camera from the image of a telemetry
+        The image is decoded once and kept by the telemetry, so the Brain does not decode it again.
+
+        :param telemetry: Telemetry instance
+        """
+        try:
+            image = telemetry.image
+        except ValueError:
+            return
+        if image is None:
+            return
+        self.camera_shape = tuple(image.shape)
+        self.camera_shape_is_known.set()
+        logger.debug(build_log_tag("CAMERA", "SHAPE", camera_shape=self.camera_shape))
 
-    def send_car_control_request(self, angle, throttle, brake):
+    def wait_camera_shape(self, timeout = 60):
+        """
+        Wait until the shape of the camera is known (see `camera_shape`), e.g. to warm up a Brain at the camera resolution
+
+        :param timeout: maximum delay time to wait for a cam config or a first image
+        :return: shape of the images (height, width, depth), the default one if it is still unknown after the timeout
+        """
+        if not self.camera_shape_is_known.wait(timeout):
+            logger.warning(build_log_tag("CAMERA", "UNKNOWN SHAPE", message="No image received, the default shape is used", camera_shape=self.camera_shape))
+        return self.camera_shape
+
+    def send_car_control_request(self, angle, throttle, brake, telemetry = None):
         """
         Send car control (angle/steering, throttle, brake)
 
         :param steering: string value of float between -1 to 1. Maps to full left or right, 16 deg from center.
         :param throttle: string value of float between -1 to 1. Full forward or reverse torque to wheels.
         :param brake: string value of float between 0 to 1.
+        :param telemetry: Telemetry from which the control has been predicted (to measure the latency)
 
+        Only the latest control is sent : a control not sent yet is overwritten by the new one.
         """
-        request = dict()
-        request["msg_type"] = "control"
-        request["steering"] = str(angle)
-        request["throttle"] = str(throttle)
-        request["brake"] = str(brake)
-        self.send_message(json.dumps(request))
+        request = CAR_CONTROL_REQUEST_TEMPLATE % (angle, throttle, brake)
+        self.send_control_message(request.encode("utf-8"), telemetry)
+
+    def on_control_sent(self, telemetry, sent_at):
+        """
+        When a control has been sent to the server
+
+        :param telemetry: Telemetry from which the control has been predicted
+        :param sent_at: time (`time.perf_counter`) when the control was sent
+        """
+        self.event_handler.latency.record(telemetry, sent_at)
     
     def send_reset_car_request(self):
         """
@@ -339,11 +410,9 @@ class DonkeyCarClient(BasicClient):
 
         This command will send the request immediatly and reset the buffers of the client.
         """
-        request = dict()
-        request["msg_type"] = "reset_car"
         self.event_handler.reset_state()
         # It is not `send_message` because we don't want to wait for the next buffer read to give the request
-        self.send_now(json.dumps(request))
+        self.send_now(RESET_CAR_REQUEST)
         self.reset_buffer()
     
     def send_node_position_request(self, index):
@@ -360,20 +429,16 @@ class DonkeyCarClient(BasicClient):
         """
         Leave the scene and return to the main menu screen.
         """
-        request = dict()
-        request["msg_type"] = "exit_scene"
         # It is not `send_message` because we don't want to wait for the next buffer read to give the request
-        self.send_now(json.dumps(request))
+        self.send_now(EXIT_SCENE_REQUEST)
         self.on_exit_scene()
 
     def send_quit_app_request(self):
         """
         Close the sim executable. (Menu only)
         """
-        request = dict()
-        request["msg_type"] = "quit_app"
         # It is not `send_message` because we don't want to wait for the next buffer read to give the request
-        self.send_now(json.dumps(request))
+        self.send_now(QUIT_APP_REQUEST)
         self.reset_buffer()
         self.on_quit_app()
         self.stop()
@@ -381,5 +446,10 @@ class DonkeyCarClient(BasicClient):
     def stop(self):
         """
         Stop the loop in the client
+        The loop closes the sockets when it exits.
         """
         self.connected = False
+        self.wake_up()
+        if getattr(self, "loop_thread", None) is None:
+            # No loop is running (e.g. the connection failed), so nothing else closes the sockets
+            self.close_sockets()
@@ -0,0 +1,37 @@
+import json
+from dcevaluator.utils.utils import has_float_comma_notation, fix_float_notation
+
+try:
+    # Optional faster JSON library
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+class RequestDecoder:
+    def __init__(self, check_float_notation = True, use_fast_json = True):
+        """
+        Decoder of the requests sent by the simulator
+
+        The requests are given as bytes (UTF-8 encoded JSON) and decoded into dicts.
+        To use another decoder with `DonkeyCarClient`, give any object with a `decode(request_bytes)` method.
+
+        :param check_float_notation: check and fix the floats written with a comma as decimal separator (Unity with a French or German locale)
+        :param use_fast_json: use `orjson` to parse the JSON when it is installed, otherwise the standard `json` library is used
+        """
+        self.check_float_notation = check_float_notation
+        self.use_fast_json = use_fast_json and orjson is not None
+        self.loads = orjson.loads if self.use_fast_json else json.loads
+
+    def decode(self, request_bytes):
+        """
+        Decode a request
+
+        The float notation is only fixed when a comma notation is detected,
+        because most of the simulators send floats with a dot.
+
+        :param request_bytes: the request as bytes (or str)
+        :return: a dict representing the request
+        """
+        if self.check_float_notation and has_float_comma_notation(request_bytes):
+            request_bytes = fix_float_notation(request_bytes)
+        return self.loads(request_bytes)
@@ -0,0 +1,129 @@
+import re
+
+# Strings (skipped, they can contain braces, and an unterminated one runs to the end) and braces of a JSON document
+JSON_STRUCTURE_PATTERN = re.compile(rb'"(?:[^"\\]|\\.)*"?|[{}]')
+
+def is_complete_json_object(data):
+    """
+    Check if the braces of a JSON object are balanced, without decoding it
+
+    :param data: bytes beginning with "{" and ending with "}"
+    :return: True if the last brace closes the first one
+    """
+    depth = 0
+    for match in JSON_STRUCTURE_PATTERN.finditer(data):
+        token = match.group()
+        if token == b"{":
+            depth += 1
+        elif token == b"}":
+            depth -= 1
+            if depth == 0:
+                return match.end() == len(data)
+    return False
+
+class MessageFramer:
+    def __init__(self, delimiter = b"\n"):
+        """
+        Incremental message framer
+
+        Accumulate the raw bytes received from the server into a reusable `bytearray`
+        and cut the complete messages on the delimiter.
+        Only the newly received bytes are scanned to find the delimiters.
+        The time of reception of each chunk is kept, to know when the first bytes of each message were received.
+
+        :param delimiter: bytes separating two messages
+        """
+        self.delimiter = delimiter
+        self.buffer = bytearray()
+        # Index from which the buffer has not been scanned yet
+        self.scan_index = 0
+        # (index in the buffer, time of reception) of the beginning of each chunk
+        self.chunk_times = []
+
+    def feed(self, data, received_at = None):
+        """
+        Append received bytes into the buffer
+
+        :param data: bytes, bytearray or memoryview received from the socket
+        :param received_at: time of reception of the bytes (e.g. `time.perf_counter()`)
+        """
+        if received_at is not None:
+            self.chunk_times.append((len(self.buffer), received_at))
+        self.buffer += data
+
+    def messages(self):
+        """
+        Extract the complete messages from the buffer (see `timed_messages`)
+
+        :return: list of the complete messages as bytes
+        """
+        return [message for message, _ in self.timed_messages()]
+
+    def timed_messages(self):
+        """
+        Extract the complete messages from the buffer, with the time of reception of their first bytes
+
+        The incomplete message at the end of the buffer is kept until the rest of it is received.
+        A message not followed by the delimiter yet is also extracted if it is a complete JSON object
+        (e.g. the last message sent by the server before a pause).
+        Empty messages and the bytes before the first brace are ignored.
+
+        :return: list of (message as bytes, time of reception of the chunk containing its first byte or None)
+        """
+        messages = []
+        message_begin = 0
+        chunk_times = self.chunk_times
+        chunk_index = 0
+
+        def received_at(index):
+            nonlocal chunk_index
+            # The messages are extracted in order, so the chunks are walked only once
+            while chunk_index + 1 < len(chunk_times) and chunk_times[chunk_index + 1][0] <= index:
+                chunk_index += 1
+            return chunk_times[chunk_index][1] if len(chunk_times) > 0 else None
+
+        delimiter_index = self.buffer.find(self.delimiter, self.scan_index)
+
+        with memoryview(self.buffer) as view:
+            while delimiter_index >= 0:
+                # Ignore the garbage before the beginning of a request
+                brace_index = self.buffer.find(b"{", message_begin, delimiter_index)
+                if brace_index >= 0:
+                    messages.append((bytes(view[brace_index:delimiter_index]).rstrip(), received_at(brace_index)))
+
+                message_begin = delimiter_index + len(self.delimiter)
+                delimiter_index = self.buffer.find(self.delimiter, message_begin)
+
+            # The rest of the buffer may be a complete message whose delimiter has not been received yet.
+            # Only checked when it ends with a brace, so a partial message is not copied at each chunk.
+            message_end = len(self.buffer)
+            while message_end > message_begin and self.buffer[message_end - 1] in b" \t\r":
+                message_end -= 1
+            if message_end > message_begin and self.buffer[message_end - 1] == ord("}"):
+                brace_index = self.buffer.find(b"{", message_begin, message_end)
+                if brace_index >= 0:
+                    message = bytes(view[brace_index:message_end])
+                    if is_complete_json_object(message):
+                        messages.append((message, received_at(brace_index)))
+                        message_begin = len(self.buffer)
+
+        # Remove the processed messages from the buffer (deleting the head of a bytearray does not move the rest of it)
+        if message_begin > 0:
+            del self.buffer[:message_begin]
+            # Keep the chunk containing the beginning of the rest of the buffer and the next ones
+            if len(self.buffer) == 0:
+                self.chunk_times = []
+            elif len(chunk_times) > 0:
+                received_at(message_begin)
+                self.chunk_times = [(max(0, index - message_begin), time) for index, time in chunk_times[chunk_index:]]
+        # The delimiter can be split between two chunks
+        self.scan_index = max(0, len(self.buffer) - len(self.delimiter) + 1)
+        return messages
+
+    def reset(self):
+        """
+        Drop the bytes not processed yet
+        """
+        self.buffer.clear()
+        self.scan_index = 0
+        self.chunk_times = []
@@ -0,0 +1,157 @@
+import base64
+import numpy as np
+import cv2
+
+class Telemetry:
+    # Name of the attribute for each scalar field of the telemetry request
+    SCALAR_FIELDS = {
+        "msg_type": "msg_type",
+        "cte": "cte",
+        "activeNode": "active_node",
+        "totalNodes": "total_nodes",
+        "speed": "speed",
+        "pos_x": "pos_x",
+        "pos_y": "pos_y",
+        "pos_z": "pos_z",
+        "steering_angle": "steering_angle",
+        "throttle": "throttle",
+        "hit": "hit",
+        "time": "time",
+    }
+
+    SCALAR_KEYS = frozenset(SCALAR_FIELDS)
+    # Neutral value of each scalar field, with the type sent by the simulator (see `blank`)
+    BLANK_FIELDS = {
+        "msg_type": "telemetry",
+        "cte": 0.0,
+        "activeNode": 0,
+        "totalNodes": 0,
+        "speed": 0.0,
+        "pos_x": 0.0,
+        "pos_y": 0.0,
+        "pos_z": 0.0,
+        "steering_angle": 0.0,
+        "throttle": 0.0,
+        "hit": "none",
+        "time": 0.0,
+    }
+
+    __slots__ = tuple(SCALAR_FIELDS.values()) + ("image_base64", "extra", "missing_fields", "_image", "received_at", "popped_at", "predicted_at")
+
+    def __init__(self, request):
+        """
+        Telemetry sent by the simulator
+
+        The scalar fields are parsed when the request is received,
+        but the camera image is only decoded when the `image` attribute is read for the first time.
+        So, a dropped telemetry never pays for base64 and PNG/JPG decoding.
+
+        The telemetry can still be read like the dict of the request, e.g. `telemetry["activeNode"]`.
+        In this case, `telemetry["image"]` is the image encoded in base64 as sent by the simulator.
+
+        The timestamps `received_at` (first bytes of the request received by the socket), `popped_at` and `predicted_at`
+        (`time.perf_counter`) are filled along the pipeline to measure the latency until the matching control is sent.
+
+        :param request: a dict representing the request (telemetry)
+        """
+        for key, attribute in self.SCALAR_FIELDS.items():
+            setattr(self, attribute, request.get(key))
+        # The scalar fields absent from the request (their attribute is None but they are not in the telemetry)
+        self.missing_fields = self.SCALAR_KEYS.difference(request)
+        self.image_base64 = request.get("image")
+        # Other fields which depend on the simulator version (vel_x, gyro_x, lidar, ...)
+        self.extra = { key: value for key, value in request.items() if key != "image" and key not in self.SCALAR_FIELDS }
+        self._image = None
+
+        self.received_at = None
+        self.popped_at = None
+        self.predicted_at = None
+
+    @property
+    def image(self):
+        """
+        Camera image decoded as a RGB NumPy array (height, width, 3)
+        Decoded at the first access and cached
+
+        :return: the image as a NumPy array or None if the telemetry does not contain any image
+        :raises ValueError: if the image cannot be decoded
+        """
+        if self._image is None and self.image_base64 is not None:
+            buffer = np.frombuffer(base64.b64decode(self.image_base64), dtype=np.uint8)
+            image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError("Cannot decode the image of the telemetry (" + str(len(buffer)) + " bytes)")
+            self._image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return self._image
+
+    def __getitem__(self, key):
+        if key == "image":
+            if self.image_base64 is None:
+                raise KeyError(key)
+            return self.image_base64
+        if key in self.SCALAR_FIELDS:
+            if key in self.missing_fields:
+                raise KeyError(key)
+            return getattr(self, self.SCALAR_FIELDS[key])
+        return self.extra[key]
+
+    def __contains__(self, key):
+        if key == "image":
+            return self.image_base64 is not None
+        if key in self.SCALAR_FIELDS:
+            return key not in self.missing_fields
+        return key in self.extra
+
+    def get(self, key, default = None):
+        """
+        Get a field of the request like `dict.get`
+
+        :param key: the key of the field in the request
+        :param default: value returned when the field does not exist
+        :return: the value of the field
+        """
+        if key in self:
+            return self[key]
+        return default
+
+    @classmethod
+    def from_decoded_image(cls, request, image):
+        """
+        Build a telemetry whose image is already decoded (e.g. read from a shared memory)
+
+        :param request: a dict representing the request without the image
+        :param image: the image as a RGB NumPy array
+        :return: Telemetry instance
+        """
+        telemetry = cls(request)
+        telemetry._image = image
+        return telemetry
+
+    @classmethod
+    def blank(cls, image_shape = (120, 160, 3)):
+        """
+        Build a telemetry with a black image encoded like the simulator does (PNG in base64), e.g. to warm up a Brain
+
+        :param image_shape: shape of the image (height, width, depth)
+        :return: Telemetry instance
+        """
+        _, png = cv2.imencode(".png", np.zeros(image_shape, dtype=np.uint8))
+        request = dict(cls.BLANK_FIELDS)
+        request["image"] = base64.b64encode(png.tobytes()).decode("ascii")
+        return cls(request)
+
+    def to_dict(self, with_image = True):
+        """
+        Build the dict of the request
+
+        :param with_image: add the image encoded in base64
+        :return: a dict representing the request (telemetry)
+        """
+        request = { key: getattr(self, attribute) for key, attribute in self.SCALAR_FIELDS.items() if key not in self.missing_fields }
+        if with_image and self.image_base64 is not None:
+            request["image"] = self.image_base64
+        request.update(self.extra)
+        return request
+
+    def __repr__(self):
+        return "Telemetry(active_node=" + str(self.active_node) + ", cte=" + str(self.cte) + ", speed=" + str(self.speed) + ")"
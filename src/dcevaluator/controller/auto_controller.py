@@ -1,7 +1,9 @@
 from loguru import logger
-from threading import Thread
+from threading import Thread, Lock
 import time
-from dcevaluator.utils.utils import build_log_tag, launch_func_in_thread
+from dcevaluator.utils.utils import build_log_tag
+from dcevaluator.event.dispatcher import EventDispatcher
+from dcevaluator.controller.pipeline import PreprocessingPipeline
 
 from PIL import Image
 import base64
@@ -11,7 +13,7 @@ import numpy as np
 import cv2
 
 class AutoController:
-    def __init__(self, client, brain, event_handler, buffer_requests_size = 4):
+    def __init__(self, client, brain, event_handler, buffer_requests_size = 4, dispatcher = None, max_frame_age = None, pipelined_preprocessing = False):
         """
         Manual Controller with Hardware
 
@@ -19,45 +21,184 @@ class AutoController:
         :param brain: Brain instance to do the predictions (Artificial Intelligence)
         :param event_handler: Event Handler instance
         :param buffer_requests_size: Size of buffer of requests
+        :param dispatcher: Event Dispatcher instance processing the events of the Event Handler. By default, a new one.
+        :param max_frame_age: maximum age (in seconds) of a telemetry to be predicted. The older ones are skipped. None to predict all of them.
+        :param pipelined_preprocessing: prepare the inputs of the next telemetry in a worker thread while the current one is predicted (see `PreprocessingPipeline`).
+                                        The Brain must implement `predict_inputs`, otherwise `predict` is used.
         """
         self.client = client
         self.event_handler = event_handler
         self.brain = brain
+        # Held during a prediction, so the Brain is never swapped (and released) while it predicts
+        self.brain_lock = Lock()
         self.buffer_requests_size = buffer_requests_size
+        self.max_frame_age = max_frame_age
+        self.dispatcher = dispatcher if dispatcher is not None else EventDispatcher()
+
+        self.pipeline = None
+        if pipelined_preprocessing:
+            if self.brain_can_predict_inputs():
+                self.pipeline = PreprocessingPipeline(self.brain, on_drop=self.event_handler.frames.count_dropped)
+            else:
+                logger.warning(build_log_tag("PIPELINE", "DISABLED", message="The Brain does not implement predict_inputs"))
 
         self.running = True
         self.deque = collections.deque(maxlen = self.buffer_requests_size)
-        self.event_handler.on_telemetry = launch_func_in_thread(self.on_telemetry)
+        self.event_handler.on_telemetry = self.dispatcher.wrap(self.on_telemetry)
 
-        self.controller_thread = Thread(target=self.loop)
+        if self.pipeline is not None:
+            self.pipeline.start(self.next_frame)
+            self.controller_thread = Thread(target=self.pipelined_loop)
+        else:
+            self.controller_thread = Thread(target=self.loop)
         self.controller_thread.start()
 
+    def brain_can_predict_inputs(self):
+        """
+        Check if the Brain can be used with the pipelined preprocessing
+
+        :return: True if the Brain overrides `predict_inputs` of `DCModelWrapper`
+        """
+        # Compared by name to not import the model wrapper (and TensorFlow) in the controller
+        predict_inputs = getattr(type(self.brain), "predict_inputs", None)
+        return predict_inputs is not None and predict_inputs.__qualname__ != "DCModelWrapper.predict_inputs" \
+            and hasattr(self.brain, "input_transformer") and hasattr(self.brain, "input_preprocessing")
+
+    def set_brain(self, brain):
+        """
+        Change the Brain doing the predictions (e.g. between two epochs of a tournament)
+
+        Wait for the end of the running prediction, so the previous Brain can be released as soon as this method returns.
+
+        :param brain: Brain instance
+        """
+        with self.brain_lock:
+            if self.pipeline is not None:
+                previous_brain = self.brain
+                self.brain = brain
+                if not self.brain_can_predict_inputs():
+                    self.brain = previous_brain
+                    raise ValueError("The pipelined preprocessing is enabled but the Brain does not implement predict_inputs")
+                self.pipeline.set_brain(brain)
+            else:
+                self.brain = brain
+
+    def next_frame(self):
+        """
+        Wait for the next telemetry to predict
+        The latest telemetry is taken and the older ones are dropped, so a frame is never predicted after a newer one.
+        The telemetries older than `max_frame_age` are skipped.
+
+        :return: Telemetry instance or None if the controller is stopped
+        """
+        state_condition = self.event_handler.state_condition
+        while self.running:
+            with state_condition:
+                state_condition.wait_for(self.can_predict)
+                if not self.running:
+                    return None
+                request = self.deque.pop()
+                if len(self.deque) > 0:
+                    self.event_handler.frames.count_dropped(len(self.deque))
+                    self.deque.clear()
+            request.popped_at = time.perf_counter()
+
+            if self.max_frame_age is not None and self.frame_age(request) > self.max_frame_age:
+                self.event_handler.frames.count_stale()
+                continue
+            return request
+        return None
+
+    def frame_age(self, request):
+        """
+        Age of the telemetry since its reception by the socket until it was popped from the buffer
+
+        :param request: Telemetry instance
+        :return: age in seconds
+        """
+        return request.popped_at - request.received_at if request.received_at is not None else 0.0
+
     def loop(self):
         """
         Process request from the hardware
+
+        The loop sleeps until a new telemetry is received or the state of the car changes.
         """
         self.event_handler.car_controller_is_ready = True
-        while self.running:            
-            if self.event_handler.car_is_ready and self.event_handler.car_is_driving and len(self.deque) > 0:
-                request = self.deque.pop()
+        while self.running:
+            request = self.next_frame()
+            if request is None:
+                break
+            self.event_handler.frames.count_predicted(self.frame_age(request))
+
+            with self.brain_lock:
                 angle, throttle, brake = self.brain.predict(request)
-                # To show in realtime the input given to the Brain
-                ##cv2.imshow('view', cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-                ##cv2.waitKey(1)
-
-                # The AI takes so long to predict that we have to check if the state of the game has not changed before sending an instruction.
-                # In fact, sometimes when the car was reset, an instruction to control the car was sent slightly after the reset. 
-                # However, just before predicting the action, the game state allowed it. 
-                if self.event_handler.car_is_ready and self.event_handler.car_is_driving:
-                    self.client.send_car_control_request(angle, throttle, brake)
+            request.predicted_at = time.perf_counter()
+            # To show in realtime the input given to the Brain
+            ##cv2.imshow('view', cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            ##cv2.waitKey(1)
+            self.send_control(request, angle, throttle, brake)
+
+    def pipelined_loop(self):
+        """
+        Process request from the hardware with the pipelined preprocessing
+
+        The inputs of the telemetries are prepared by the pipeline, so the loop only runs the inference.
+        If several telemetries are prepared during an inference, only the latest one is predicted.
+        """
+        self.event_handler.car_controller_is_ready = True
+        while self.running:
+            request, inputs = self.pipeline.take()
+            if request is None:
+                break
+            try:
+                self.event_handler.frames.count_predicted(self.frame_age(request))
+                with self.brain_lock:
+                    angle, throttle, brake = self.brain.predict_inputs(inputs)
+            finally:
+                self.pipeline.release()
+            request.predicted_at = time.perf_counter()
+            self.send_control(request, angle, throttle, brake)
+
+    def send_control(self, request, angle, throttle, brake):
+        """
+        Send the predicted controls if the car is still driving
+
+        :param request: the predicted Telemetry instance
+        :param angle: steering angle
+        :param throttle: throttle
+        :param brake: brake
+        """
+        # The AI takes so long to predict that we have to check if the state of the game has not changed before sending an instruction.
+        # In fact, sometimes when the car was reset, an instruction to control the car was sent slightly after the reset. 
+        # However, just before predicting the action, the game state allowed it. 
+        if self.event_handler.car_is_ready and self.event_handler.car_is_driving:
+            self.client.send_car_control_request(angle, throttle, brake, telemetry=request)
+
+    def can_predict(self):
+        """
+        Check if the loop has to wake up
+
+        :return: True if the controller is stopped or if there is a telemetry to predict while the car is driving
+        """
+        return not self.running \
+            or (self.event_handler.car_is_ready and self.event_handler.car_is_driving and len(self.deque) > 0)
     
     def on_telemetry(self, request):
         """
         When a telemetry request is received
+        The image of the telemetry is decoded only if the Brain reads it (see `Telemetry.image`)
 
-        :param request: a dict representing the request (telemetry)
+        :param request: Telemetry instance
         """
-        self.deque.append(request)
+        with self.event_handler.state_condition:
+            # The frames are only counted and predicted when the car is driving
+            if not (self.event_handler.car_is_ready and self.event_handler.car_is_driving):
+                self.deque.clear()
+                return
+            self.event_handler.frames.count_received(dropped=len(self.deque) == self.deque.maxlen)
+            self.deque.append(request)
+            self.event_handler.state_condition.notify_all()
     
     def stop(self):
         """
@@ -66,4 +207,12 @@ class AutoController:
         self.client.send_exit_scene_request()
         self.event_handler.car_is_driving = False
         self.running = False
-        self.client.stop()
\ No newline at end of file
+        self.event_handler.notify_state_change()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        self.client.stop()
+        self.dispatcher.stop()
+        # Release the resources of the Brain if it has some (e.g. inference process)
+        close_brain = getattr(self.brain, "close", None)
+        if close_brain is not None:
+            close_brain()
\ No newline at end of file
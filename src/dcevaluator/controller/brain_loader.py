@@ -0,0 +1,28 @@
+from loguru import logger
+import time
+from dcevaluator.controller.process_brain import ProcessBrain
+from dcevaluator.utils.utils import build_log_tag
+
+def load_brain(model_path, inference_in_process = False, nbr_warm_up = 0, image_shape = (120, 160, 3)):
+    """
+    Load and warm up the Brain
+
+    :param model_path: Path of the model to evaluate
+    :param inference_in_process: True to load and run the Brain in a separate process
+    :param nbr_warm_up: number of dummy inferences run after loading the model
+    :param image_shape: shape of the images (height, width, depth) sent by the simulator,
+                        or a function returning it, called once the model is loaded (e.g. `DonkeyCarClient.wait_camera_shape`)
+    :return: the Brain instance
+    """
+    start_time = time.perf_counter()
+    if inference_in_process:
+        brain = ProcessBrain.load(model_path)
+    else:
+        # Imported here to initialize TensorFlow only when it is needed (e.g. in the background, while the simulator loads the scene)
+        from dcevaluator.controller.model_wrapper import DCModelWrapper
+        brain = DCModelWrapper.load(model_path)
+    if nbr_warm_up > 0:
+        # The model is loaded while the simulator loads the scene, so the shape of the camera may only be known now
+        brain.warm_up(image_shape() if callable(image_shape) else image_shape, nbr_warm_up)
+    logger.info(build_log_tag("BRAIN", "READY", model_path=model_path, duration=time.perf_counter() - start_time))
+    return brain
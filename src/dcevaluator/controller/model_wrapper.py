@@ -1,5 +1,7 @@
 import os
+import time
 from loguru import logger
+from dcevaluator.communication.telemetry import Telemetry
 from dcevaluator.utils.inspector import load_source
 from dcevaluator.utils.utils import build_log_tag
 
@@ -13,6 +15,66 @@ class DCModelWrapper:
     def predict(self, request):
         raise Exception("Unimplemented function !")
 
+    def predict_inputs(self, inputs_tensor):
+        """
+        Predict from inputs already transformed and preprocessed by `input_transformer` and `input_preprocessing`
+        Used by the pipelined preprocessing of the AutoController (see `PreprocessingPipeline`)
+
+        :param inputs_tensor: the preprocessed inputs of a telemetry
+        :return: (angle, throttle, brake)
+        """
+        raise Exception("Unimplemented function !")
+
+    def compile_predict(self, image_shape):
+        """
+        Build the compiled predict function with a fixed signature (e.g. a `tf.function` with an `input_signature`)
+        Called by `warm_up` before the dummy inferences. Nothing by default.
+
+        :param image_shape: shape of the images (height, width, depth) sent by the simulator
+        """
+        pass
+
+    def warm_up(self, image_shape = (120, 160, 3), nbr_inferences = 5):
+        """
+        Run dummy inferences at the camera resolution, so the first prediction of the evaluation
+        does not pay for the tracing of the graph and the allocations
+
+        :param image_shape: shape of the images (height, width, depth) sent by the simulator (see `DonkeyCarClient.wait_camera_shape`)
+        :param nbr_inferences: number of dummy inferences
+        :return: dict with the latencies in milliseconds of the first (cold) inference and the mean of the next (warm) ones,
+                 for `predict` ("cold_ms", "warm_ms") and, if it is implemented, for `predict_inputs` ("inputs_cold_ms", "inputs_warm_ms")
+        """
+        image_shape = tuple(image_shape)
+        self.compile_predict(image_shape)
+        blank_telemetry = Telemetry.blank(image_shape)
+        predict_inputs_is_implemented = type(self).predict_inputs is not DCModelWrapper.predict_inputs
+
+        latencies = []
+        inputs_latencies = []
+        for _ in range(nbr_inferences):
+            # A new telemetry at each inference to also warm up the decoding of the image
+            request = Telemetry(blank_telemetry.to_dict())
+            start_time = time.perf_counter()
+            self.predict(request)
+            latencies.append((time.perf_counter() - start_time) * 1000.0)
+            if predict_inputs_is_implemented:
+                # Timed apart: the pipelined preprocessing (see `PreprocessingPipeline`) prepares the inputs in another thread
+                inputs = self.input_preprocessing(self.input_transformer(request))
+                start_time = time.perf_counter()
+                self.predict_inputs(inputs)
+                inputs_latencies.append((time.perf_counter() - start_time) * 1000.0)
+
+        summary = {
+            "nbr_inferences": len(latencies),
+            "cold_ms": latencies[0] if len(latencies) > 0 else None,
+            "warm_ms": sum(latencies[1:]) / len(latencies[1:]) if len(latencies) > 1 else None,
+        }
+        if predict_inputs_is_implemented:
+            summary["inputs_cold_ms"] = inputs_latencies[0] if len(inputs_latencies) > 0 else None
+            summary["inputs_warm_ms"] = sum(inputs_latencies[1:]) / len(inputs_latencies[1:]) if len(inputs_latencies) > 1 else None
+        logger.info(build_log_tag("WARM UP", "DONE", image_shape=image_shape, **summary))
+        return summary
+
     def output_transformer(self, output):
         raise Exception("Unimplemented function !")
 
@@ -26,11 +88,22 @@ class DCModelWrapper:
         raise Exception("Unimplemented function !")
 
     @staticmethod
-    def load(path, wrapper_filename="wrapper.code"):
+    def load(path, wrapper_filename="wrapper.code", nbr_warm_up=0, image_shape=(120, 160, 3)):
+        """
+        Load the wrapper code and the model of a Brain
+
+        :param path: Path of the model
+        :param wrapper_filename: name of the file containing the source code of the Brain class
+        :param nbr_warm_up: number of dummy inferences to run before returning the Brain (see `warm_up`). 0 to disable the warm up.
+        :param image_shape: shape of the images (height, width, depth) used by the warm up
+        :return: the Brain instance
+        """
         logger.info(build_log_tag("LOAD WRAPPER AND MODEL", path=path))
         wrapper_path = os.path.join(path, wrapper_filename)
         LoadedBrain = load_source(wrapper_path, class_name_to_load="Brain")
         loaded_brain_instance = LoadedBrain()
         loaded_brain_instance.load_model(LoadedBrain.get_model_path(path))
         loaded_brain_instance.load_wrapper_code_path = path
+        if nbr_warm_up > 0:
+            loaded_brain_instance.warm_up(image_shape, nbr_warm_up)
         return loaded_brain_instance
\ No newline at end of file
@@ -0,0 +1,151 @@
+from loguru import logger
+from threading import Thread, Condition
+import numpy as np
+from dcevaluator.utils.utils import build_log_tag
+
+class PreprocessingPipeline:
+    def __init__(self, brain, ring_size = 3, on_drop = None):
+        """
+        Preprocessing Pipeline
+
+        A worker thread prepares the inputs of the next telemetry with the `input_transformer` and `input_preprocessing` hooks of the Brain
+        while the current one is being predicted with `predict_inputs`.
+        The inputs are written into a ring of preallocated NumPy arrays (allocated with the shape of the first inputs).
+
+        :param brain: Brain instance implementing `input_transformer`, `input_preprocessing` and `predict_inputs`
+        :param ring_size: number of inputs in the ring (at least 3 : one being predicted, one ready and one being prepared)
+        :param on_drop: function called with the number of requests whose inputs are discarded without being predicted (e.g. `FrameCounter.count_dropped`)
+        """
+        if ring_size < 3:
+            raise ValueError("The ring of the preprocessing pipeline needs at least 3 slots")
+        self.brain = brain
+        self.ring_size = ring_size
+        self.on_drop = on_drop
+        self.ring = None
+
+        self.condition = Condition()
+        self.running = False
+        # Latest prepared inputs (slot, request) not taken yet
+        self.ready = None
+        # Slot of the inputs being predicted
+        self.slot_in_use = None
+        self.next_slot = 0
+
+    def start(self, next_request):
+        """
+        Start the worker thread
+
+        :param next_request: function blocking until the next request to prepare is available. It returns None when the pipeline has to stop.
+        """
+        self.running = True
+        self.worker_thread = Thread(target=self.loop, args=(next_request,), daemon=True)
+        self.worker_thread.start()
+
+    def loop(self, next_request):
+        """
+        Prepare the requests until the pipeline is stopped
+
+        :param next_request: function blocking until the next request to prepare is available
+        """
+        while self.running:
+            request = next_request()
+            if request is None:
+                break
+            try:
+                self.prepare(request)
+            except Exception:
+                logger.exception(build_log_tag("PIPELINE", "ERROR", message="Cannot prepare the inputs"))
+                self.drop(1)
+
+    def prepare(self, request):
+        """
+        Transform and preprocess a request into the next free slot of the ring
+
+        :param request: Telemetry instance
+        """
+        brain = self.brain
+        inputs = np.asarray(brain.input_preprocessing(brain.input_transformer(request)))
+
+        with self.condition:
+            # The Brain has changed during the preparation (see `set_brain`)
+            if brain is not self.brain:
+                self.drop(1)
+                return
+            if self.ring is None:
+                self.ring = np.empty((self.ring_size,) + inputs.shape, dtype=inputs.dtype)
+            ring = self.ring
+            ready_slot = self.ready[0] if self.ready is not None else None
+            slot = self.next_slot
+            while slot == self.slot_in_use or slot == ready_slot:
+                slot = (slot + 1) % self.ring_size
+            self.next_slot = (slot + 1) % self.ring_size
+
+        # The slot is neither predicted nor published, so it can be written without lock
+        ring[slot] = inputs
+
+        with self.condition:
+            # Inputs of the previous Brain (see `set_brain`)
+            if ring is not self.ring:
+                self.drop(1)
+                return
+            # The new inputs replace the previous ones which have not been taken (latest wins)
+            if self.ready is not None:
+                self.drop(1)
+            self.ready = (slot, request)
+            self.condition.notify_all()
+
+    def drop(self, nbr_requests):
+        """
+        Report requests discarded without being predicted
+
+        :param nbr_requests: number of discarded requests
+        """
+        if self.on_drop is not None:
+            self.on_drop(nbr_requests)
+
+    def set_brain(self, brain):
+        """
+        Change the Brain preparing the inputs
+        The ring is allocated again with the shape of the inputs of the new Brain.
+
+        :param brain: Brain instance implementing `input_transformer`, `input_preprocessing` and `predict_inputs`
+        """
+        with self.condition:
+            if self.ready is not None:
+                self.drop(1)
+            self.brain = brain
+            self.ring = None
+            self.ready = None
+
+    def take(self):
+        """
+        Wait for the latest prepared inputs
+        `release` must be called once the inputs are predicted
+
+        :return: (request, inputs) or (None, None) if the pipeline is stopped
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.ready is not None or not self.running)
+            if self.ready is None:
+                return None, None
+            slot, request = self.ready
+            self.ready = None
+            self.slot_in_use = slot
+            # Read under the lock : `set_brain` may replace the ring at any time
+            inputs = self.ring[slot]
+        return request, inputs
+
+    def release(self):
+        """
+        Release the slot of the inputs which have been predicted
+        """
+        with self.condition:
+            self.slot_in_use = None
+
+    def stop(self):
+        """
+        Stop the pipeline
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
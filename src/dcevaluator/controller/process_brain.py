@@ -0,0 +1,226 @@
+from loguru import logger
+import multiprocessing
+from multiprocessing import shared_memory
+from threading import Lock
+import numpy as np
+from dcevaluator.utils.utils import build_log_tag
+
+def run_inference_worker(model_path, shared_memory_name, image_shape, connection, nbr_warm_up = 0):
+    """
+    Main function of the inference process
+
+    Load the Brain, then predict each frame written into the shared memory
+    and send back (angle, throttle, brake) through the connection.
+
+    :param model_path: Path of the model to load with `DCModelWrapper.load`
+    :param shared_memory_name: name of the shared memory containing the frame
+    :param image_shape: shape of the frame (height, width, depth)
+    :param connection: connection with the main process
+    :param nbr_warm_up: number of dummy inferences to run before being ready (see `DCModelWrapper.warm_up`)
+    """
+    try:
+        # Imported here to only load TensorFlow in the inference process
+        from dcevaluator.controller.model_wrapper import DCModelWrapper
+        from dcevaluator.communication.telemetry import Telemetry
+        brain = DCModelWrapper.load(model_path, nbr_warm_up=nbr_warm_up, image_shape=image_shape)
+    except Exception as e:
+        connection.send(("error", repr(e)))
+        return
+
+    frame_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    frame = np.ndarray(image_shape, dtype=np.uint8, buffer=frame_memory.buf)
+    telemetry = None
+    connection.send(("ready", None))
+
+    try:
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            command, payload = message
+            if command == "warm_up":
+                image_shape, nbr_inferences = payload
+                try:
+                    connection.send(("ok", brain.warm_up(image_shape, nbr_inferences)))
+                except Exception as e:
+                    connection.send(("error", repr(e)))
+                continue
+            if command == "frame":
+                # The main process allocated a new shared memory for images of another shape
+                shared_memory_name, image_shape = payload
+                telemetry = None
+                frame = None
+                frame_memory.close()
+                frame_memory = shared_memory.SharedMemory(name=shared_memory_name)
+                frame = np.ndarray(image_shape, dtype=np.uint8, buffer=frame_memory.buf)
+                connection.send(("ok", None))
+                continue
+            # No copy : the image of the telemetry is a view on the shared memory
+            telemetry = Telemetry.from_decoded_image(payload, frame)
+            try:
+                angle, throttle, brake = brain.predict(telemetry)
+                connection.send(("ok", (angle, throttle, brake)))
+            except Exception as e:
+                connection.send(("error", repr(e)))
+    finally:
+        # The views on the shared memory must be released before closing it
+        telemetry = None
+        frame = None
+        frame_memory.close()
+
+class ProcessBrain:
+    def __init__(self, model_path, image_shape = (120, 160, 3), nbr_warm_up = 0, load_timeout = 600):
+        """
+        Brain running in a separate process
+
+        The Brain is loaded and predicts in its own process, so its CPU usage (and its GIL) does not slow down the reception of the telemetry.
+        The decoded image is written into a shared memory, without copy on the side of the inference process,
+        and only the scalar fields of the telemetry and the predicted controls go through a pipe.
+        The controller predicts one frame at a time, so a single frame is shared.
+
+        NOTE : the Brain receives a Telemetry whose image is already decoded,
+        so it must read `request.image` (NumPy array) instead of the base64 `request["image"]`.
+
+        :param model_path: Path of the model to load with `DCModelWrapper.load`
+        :param image_shape: shape of the images (height, width, depth) sent by the simulator
+        :param nbr_warm_up: number of dummy inferences run by the inference process before being ready (see `DCModelWrapper.warm_up`)
+        :param load_timeout: maximum time in seconds to load the model in the inference process
+        """
+        self.model_path = model_path
+        self.image_shape = tuple(image_shape)
+        self.lock = Lock()
+        self.frame_memory = None
+        self.frame = None
+        self.allocate_frame(self.image_shape)
+
+        # "spawn" to get a clean process (no copy of the threads and the sockets of the main process)
+        context = multiprocessing.get_context("spawn")
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=run_inference_worker,
+                                       args=(model_path, self.frame_memory.name, self.image_shape, worker_connection, nbr_warm_up),
+                                       daemon=True)
+        self.process.start()
+        # Only the inference process holds its end of the pipe, so the pipe is closed (EOFError) if it dies
+        worker_connection.close()
+        logger.info(build_log_tag("INFERENCE PROCESS", "STARTED", pid=self.process.pid, model_path=model_path))
+
+        try:
+            status, error = self.receive(load_timeout)
+        except RuntimeError:
+            self.close()
+            raise
+        if status == "error":
+            self.close()
+            raise RuntimeError("Inference process cannot load the model : " + str(error))
+        logger.info(build_log_tag("INFERENCE PROCESS", "READY", pid=self.process.pid))
+
+    def receive(self, timeout = None, poll_interval = 1.0):
+        """
+        Wait for the reply of the inference process
+
+        :param timeout: maximum time to wait in seconds, None to wait as long as the inference process is alive
+        :param poll_interval: time in seconds between two checks that the inference process is alive
+        :return: (status, result) sent by the inference process
+        :raise RuntimeError: if the inference process died or did not reply in time
+        """
+        waited = 0.0
+        while not self.connection.poll(poll_interval):
+            waited += poll_interval
+            if not self.process.is_alive():
+                raise RuntimeError("Inference process died (exit code : " + str(self.process.exitcode) + ")")
+            if timeout is not None and waited >= timeout:
+                raise RuntimeError("Inference process did not reply after " + str(timeout) + " seconds")
+        try:
+            return self.connection.recv()
+        except EOFError:
+            self.process.join(timeout=1)
+            raise RuntimeError("Inference process died (exit code : " + str(self.process.exitcode) + ")")
+
+    def allocate_frame(self, image_shape):
+        """
+        Allocate the shared memory of the frame, and release the previous one
+
+        :param image_shape: shape of the images (height, width, depth)
+        """
+        frame_memory = shared_memory.SharedMemory(create=True, size=int(np.prod(image_shape)))
+        if self.frame_memory is not None:
+            self.frame = None
+            self.frame_memory.close()
+            self.frame_memory.unlink()
+        self.image_shape = tuple(image_shape)
+        self.frame_memory = frame_memory
+        self.frame = np.ndarray(self.image_shape, dtype=np.uint8, buffer=self.frame_memory.buf)
+
+    def warm_up(self, image_shape = (120, 160, 3), nbr_inferences = 5):
+        """
+        Run dummy inferences in the inference process (see `DCModelWrapper.warm_up`)
+        The shared memory is allocated again if the shape of the images has changed.
+
+        :param image_shape: shape of the images (height, width, depth) sent by the simulator
+        :param nbr_inferences: number of dummy inferences
+        :return: dict with the latencies of the inferences in milliseconds
+        """
+        with self.lock:
+            if tuple(image_shape) != self.image_shape:
+                self.allocate_frame(image_shape)
+                self.connection.send(("frame", (self.frame_memory.name, self.image_shape)))
+                self.receive()
+            self.connection.send(("warm_up", (self.image_shape, nbr_inferences)))
+            status, result = self.receive()
+        if status == "error":
+            raise RuntimeError("Inference process cannot warm up : " + str(result))
+        return result
+
+    @staticmethod
+    def load(path, **kwargs):
+        """
+        Load a model in a separate process
+
+        :param path: Path of the model to load with `DCModelWrapper.load`
+        :param kwargs: the other parameters of `ProcessBrain`
+        :return: ProcessBrain instance
+        """
+        return ProcessBrain(path, **kwargs)
+
+    def predict(self, request):
+        """
+        Predict the controls of the car in the inference process
+
+        :param request: Telemetry instance
+        :return: (angle, throttle, brake)
+        """
+        image = request.image
+        with self.lock:
+            if image.shape != self.image_shape:
+                # e.g. the camera config was changed after the start of the process
+                logger.warning(build_log_tag("INFERENCE PROCESS", "RESIZE", previous_shape=self.image_shape, image_shape=image.shape))
+                self.allocate_frame(image.shape)
+                self.connection.send(("frame", (self.frame_memory.name, self.image_shape)))
+                self.receive()
+            self.frame[...] = image
+            self.connection.send(("predict", request.to_dict(with_image=False)))
+            status, result = self.receive()
+
+        if status == "error":
+            raise RuntimeError("Inference process cannot predict : " + str(result))
+        return result
+
+    def close(self):
+        """
+        Stop the inference process and release the shared memory
+        """
+        if self.frame_memory is None:
+            return
+        if self.process.is_alive():
+            try:
+                self.connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=10)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.connection.close()
+        self.frame = None
+        self.frame_memory.close()
+        self.frame_memory.unlink()
+        self.frame_memory = None
@@ -0,0 +1,138 @@
+from scipy import stats
+from statistics import NormalDist
+import math
+
+# End reasons of an epoch counted as a failure of the model
+FAILURE_END_REASONS = ("car_leaving_road", "timeout")
+
+def confidence_interval(values, confidence):
+    """
+    Confidence interval of the mean of some values (Student t distribution, the variance being estimated from a few values)
+
+    :param values: list of values
+    :param confidence: confidence level (e.g. 0.9)
+    :return: (mean, half width of the interval) or None if there are less than 2 values
+    """
+    if len(values) < 2:
+        return None
+    mean = sum(values) / len(values)
+    std = math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1))
+    t = stats.t.ppf((1 + confidence) / 2, len(values) - 1)
+    return mean, t * std / math.sqrt(len(values))
+
+def wilson_interval(nbr_successes, nbr_trials, confidence):
+    """
+    Wilson score interval of a proportion
+
+    :param nbr_successes: number of successes
+    :param nbr_trials: number of trials
+    :param confidence: confidence level (e.g. 0.9)
+    :return: (lower bound, upper bound)
+    """
+    if nbr_trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    proportion = nbr_successes / nbr_trials
+    denominator = 1 + z ** 2 / nbr_trials
+    center = (proportion + z ** 2 / (2 * nbr_trials)) / denominator
+    half_width = z * math.sqrt(proportion * (1 - proportion) / nbr_trials + z ** 2 / (4 * nbr_trials ** 2)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+class EarlyStopping:
+    def __init__(self, min_epochs = 3,
+                       confidence = 0.9,
+                       max_turns_ci_width = 1.0,
+                       max_lap_time_ci_width = 0.05,
+                       min_failure_probability = 0.5,
+                       min_zero_variance_epochs = 4
+                       ):
+        """
+        Early Stopping
+
+        Decide after each epoch if the evaluation can stop before `nbr_epochs`, because the results are already known :
+        - the model fails (leaves the road or times out) with a probability of at least `min_failure_probability`,
+        - or the confidence intervals of the number of turns and of the lap time are narrow enough.
+
+        :param min_epochs: minimum number of epochs before stopping
+        :param confidence: confidence level of the intervals
+        :param max_turns_ci_width: maximum width of the confidence interval of the number of turns
+        :param max_lap_time_ci_width: maximum width of the confidence interval of the mean lap time, relative to the mean lap time
+        :param min_failure_probability: stop when the lower bound of the failure probability reaches this value
+        :param min_zero_variance_epochs: minimum number of identical values before a zero-width interval counts as known
+                                         (e.g. 3 timeouts at turn 0 may only be a bad start)
+        """
+        self.min_epochs = min_epochs
+        self.confidence = confidence
+        self.max_turns_ci_width = max_turns_ci_width
+        self.max_lap_time_ci_width = max_lap_time_ci_width
+        self.min_failure_probability = min_failure_probability
+        self.min_zero_variance_epochs = min_zero_variance_epochs
+
+    def statistics(self, results):
+        """
+        Statistics of the epochs used to decide
+
+        :param results: list of the results of the epochs (see `Evaluator.epoch_result`)
+        :return: dict
+        """
+        nbr_failures = sum(1 for result in results if result["end_reason"] in FAILURE_END_REASONS)
+        failure_lower_bound, failure_upper_bound = wilson_interval(nbr_failures, len(results), self.confidence)
+        statistics = {
+            "nbr_epochs": len(results),
+            "nbr_failures": nbr_failures,
+            "failure_lower_bound": failure_lower_bound,
+            "failure_upper_bound": failure_upper_bound,
+            "turns_ci_width": None,
+            "nbr_lap_times": 0,
+            "lap_time_ci_width": None,
+        }
+
+        turns_interval = confidence_interval([result["turn"] for result in results], self.confidence)
+        if turns_interval is not None:
+            statistics["turns_ci_width"] = 2 * turns_interval[1]
+
+        lap_times = [result["mean_lap_time"] for result in results if result["mean_lap_time"] is not None]
+        statistics["nbr_lap_times"] = len(lap_times)
+        lap_time_interval = confidence_interval(lap_times, self.confidence)
+        if lap_time_interval is not None and lap_time_interval[0] > 0:
+            statistics["lap_time_ci_width"] = 2 * lap_time_interval[1] / lap_time_interval[0]
+        return statistics
+
+    def is_known(self, ci_width, max_ci_width, nbr_values):
+        """
+        Check if a confidence interval is narrow enough
+
+        :param ci_width: width of the confidence interval, None if there are not enough values
+        :param max_ci_width: maximum width
+        :param nbr_values: number of values of the interval
+        :return: True if the interval is narrow enough
+        """
+        if ci_width is None:
+            return False
+        if ci_width == 0 and nbr_values < self.min_zero_variance_epochs:
+            # A few identical values do not estimate the variance
+            return False
+        return ci_width <= max_ci_width
+
+    def check(self, results):
+        """
+        Check if the evaluation can stop
+
+        :param results: list of the results of the epochs (see `Evaluator.epoch_result`)
+        :return: (reason or None if the evaluation must continue, statistics)
+        """
+        statistics = self.statistics(results)
+        if len(results) < self.min_epochs:
+            return None, statistics
+
+        if statistics["failure_lower_bound"] >= self.min_failure_probability:
+            return "failure_probability", statistics
+
+        turns_are_known = self.is_known(statistics["turns_ci_width"], self.max_turns_ci_width, statistics["nbr_epochs"])
+        # Without lap, the number of turns is enough
+        lap_times_are_known = statistics["nbr_lap_times"] == 0 \
+            or self.is_known(statistics["lap_time_ci_width"], self.max_lap_time_ci_width, statistics["nbr_lap_times"])
+        if turns_are_known and lap_times_are_known:
+            return "confidence_interval", statistics
+
+        return None, statistics
@@ -1,8 +1,8 @@
 from loguru import logger
 import time
-from threading import Thread
-from dcevaluator.utils.utils import launch_func_in_thread
+from threading import Thread, Event
 from dcevaluator.utils.utils import build_log_tag
+from dcevaluator.event.dispatcher import EventDispatcher
 
 class Evaluator:
     def __init__(self, event_handler, 
@@ -11,7 +11,14 @@ class Evaluator:
                        nbr_epochs = 10,
                        max_time_to_wait = 10,
                        delay_between_check_interval = 1/60,
-                       delay_before_launch_car = 5
+                       delay_before_launch_car = 5,
+                       dispatcher = None,
+                       nbr_stable_frames_before_launch_car = 10,
+                       min_delay_before_launch_car = 0.5,
+                       early_stopping = None,
+                       results_store = None,
+                       model_id = None,
+                       session_id = None
                        ):
         """
         Evaluator
@@ -22,7 +29,14 @@ class Evaluator:
         :param nbr_epochs: number of epochs, i.e. the number of times the experiment is reproduced. This prevents us from evaluating once and having surprising results on a stroke of luck.
         :param max_time_to_wait: waiting time for a controller ready to drive the car.
         :param delay_between_check_interval: delay between each verification interval when waiting for a controller to be ready.
-        :param delay_before_launch_car: delay time after a scene reset before launching the car. This allows us to be sure that all components are loaded before starting the evaluation.
+        :param delay_before_launch_car: maximum delay time after a scene reset before launching the car. This allows us to be sure that all components are loaded before starting the evaluation.
+        :param dispatcher: Event Dispatcher instance processing the events of the Event Handler. By default, the one of the controller if it has one.
+        :param nbr_stable_frames_before_launch_car: the car is launched as soon as it is stable (speed and position near constant) during this number of telemetry frames. 0 to always wait `delay_before_launch_car`.
+        :param min_delay_before_launch_car: minimum delay time after a scene reset before launching the car
+        :param early_stopping: EarlyStopping instance to stop before `nbr_epochs` when the results are already known. None to always run `nbr_epochs`.
+        :param results_store: ResultsStore instance where the result of each epoch is appended. None to only log the results.
+        :param model_id: identifier of the evaluated model written in the results (e.g. its path)
+        :param session_id: identifier of the session written in the results, to tell apart the epochs of several sessions evaluating the same model (e.g. the shards of an evaluation farm)
         """
         self.event_handler = event_handler
         self.controller = controller
@@ -31,27 +45,48 @@ class Evaluator:
         self.max_time_to_wait = max_time_to_wait
         self.delay_between_check_interval = delay_between_check_interval
         self.delay_before_launch_car = delay_before_launch_car
+        self.nbr_stable_frames_before_launch_car = nbr_stable_frames_before_launch_car
+        self.min_delay_before_launch_car = min_delay_before_launch_car
+        self.early_stopping = early_stopping
+        self.results_store = results_store
+        self.model_id = model_id
+        self.session_id = session_id
+        if dispatcher is None:
+            dispatcher = getattr(controller, "dispatcher", None) or EventDispatcher()
+        self.dispatcher = dispatcher
 
         self.current_epoch = 1
+        # Result of each epoch (see `epoch_result`)
+        self.results = []
+        # Set when all the epochs are done
+        self.finished = Event()
 
-        self.event_handler.on_car_loaded = launch_func_in_thread(self.wait_car_controller)
-        self.event_handler.on_car_leaving_road = launch_func_in_thread(self.when_car_is_leaving)
-        self.event_handler.on_timeout = launch_func_in_thread(self.when_timeout)
-        self.event_handler.each_turn = launch_func_in_thread(self.check_limit_turn)
+        self.event_handler.on_car_leaving_road = self.dispatcher.wrap(self.when_car_is_leaving)
+        self.event_handler.on_timeout = self.dispatcher.wrap(self.when_timeout)
+        self.event_handler.each_turn = self.dispatcher.wrap(self.check_limit_turn)
 
         self.time_start_waiting = time.time()
 
+        wait_car_controller = self.dispatcher.wrap(self.wait_car_controller)
+        with self.event_handler.state_condition:
+            self.event_handler.on_car_loaded = wait_car_controller
+            car_is_already_loaded = self.event_handler.car_is_ready
+        # The car may be loaded while the Brain was loading (see `launch.py`)
+        if car_is_already_loaded:
+            logger.info(build_log_tag("CAR ALREADY LOADED", message="Start the evaluation", **self.event_handler.log_tags))
+            wait_car_controller()
+
     def wait_car_controller(self, *args, **kwargs):
         """
         Wait until the car controller is ready
         """
-        logger.info(build_log_tag("WAITING", message="Wait until the car controller is ready"))
+        logger.info(build_log_tag("WAITING", message="Wait until the car controller is ready", **self.event_handler.log_tags))
         self.time_start_waiting = time.time()
         while not self.event_handler.car_controller_is_ready:
             time.sleep(self.delay_between_check_interval)
             if time.time() - self.time_start_waiting > self.max_time_to_wait:
                 logger.critical("Timeout : No car controller ready to drive !")
-                logger.critical(build_log_tag("TIMEOUT", message="No car controller ready to drive !", max_time=self.max_time_to_wait))
+                logger.critical(build_log_tag("TIMEOUT", message="No car controller ready to drive !", max_time=self.max_time_to_wait, **self.event_handler.log_tags))
                 raise RuntimeError("Timeout : No car controller ready to drive !")
         self.run()
 
@@ -60,67 +95,163 @@ class Evaluator:
         Wait some secondes and launch car
         """
         self.event_handler.car_is_driving = False
-        logger.success(build_log_tag("EVALUATION", "BEGIN", epoch=self.current_epoch))
-        logger.info(build_log_tag("WAITING", message="Waiting for the complete loading of all components", delay_before_launch_car=self.delay_before_launch_car))
-        time.sleep(self.delay_before_launch_car)
+        logger.success(build_log_tag("EVALUATION", "BEGIN", epoch=self.current_epoch, **self.event_handler.log_tags))
+        logger.info(build_log_tag("WAITING", message="Waiting for the complete loading of all components", delay_before_launch_car=self.delay_before_launch_car, **self.event_handler.log_tags))
+        self.wait_car_is_stable()
         # This reset is important at this location.
         # If it is done too early (i.e. at the time of sending the reset request) and if there is a lot of latency, then this reset may be corrupted by the old state of the car.
         # Therefore, it is important to wait a little while for the simulator to load and then reset when the car state is stable in the simulator.
         self.event_handler.reset_state()
+        self.event_handler.latency.reset()
+        self.event_handler.frames.reset()
         self.event_handler.car_is_ready = True
         self.event_handler.car_is_driving = True
-        logger.debug(build_log_tag("RESET STATE", car_is_ready=self.event_handler.car_is_ready, car_is_driving=self.event_handler.car_is_driving))
-        logger.info(build_log_tag("LET'S GO", message="Launch the car !"))
+        logger.debug(build_log_tag("RESET STATE", car_is_ready=self.event_handler.car_is_ready, car_is_driving=self.event_handler.car_is_driving, **self.event_handler.log_tags))
+        logger.info(build_log_tag("LET'S GO", message="Launch the car !", **self.event_handler.log_tags))
     
+    def wait_car_is_stable(self):
+        """
+        Wait until the car is stable in the simulator, at most `delay_before_launch_car` seconds
+        """
+        if self.nbr_stable_frames_before_launch_car <= 0:
+            time.sleep(self.delay_before_launch_car)
+            return
+        start_time = time.monotonic()
+        is_stable = self.event_handler.readiness.wait_until_stable(self.delay_before_launch_car, 
+                                                                   self.nbr_stable_frames_before_launch_car, 
+                                                                   min_delay=self.min_delay_before_launch_car)
+        logger.info(build_log_tag("READY", car_is_stable=is_stable, delay=time.monotonic() - start_time, **self.event_handler.log_tags))
+
     def when_car_is_leaving(self, *args, **kwargs):
         """
         When a car is leaving the road
         """
-        self.end_epoch()
+        self.end_epoch("car_leaving_road")
 
     def when_timeout(self, *args, **kwargs):
         """
         When there is a timeout
         """
-        self.end_epoch()
+        self.end_epoch("timeout")
 
-    def end_epoch(self):
+    def end_epoch(self, end_reason = None):
         """
         Process the end of a epoch
+
+        :param end_reason: why the epoch ended ("car_leaving_road", "timeout" or "turns_limit")
         """
+        result = self.epoch_result(end_reason)
+        self.results.append(result)
+        if self.results_store is not None:
+            try:
+                self.results_store.append_epoch(result)
+            except OSError:
+                logger.exception(build_log_tag("RESULTS", "ERROR", path=self.results_store.path, **self.event_handler.log_tags))
         self.end_evaluation_and_summary()
         self.current_epoch += 1
-        if self.current_epoch > self.nbr_epochs:
+        if self.current_epoch > self.nbr_epochs or self.can_stop_early():
             self.stop()
         else:
-            self.controller.client.send_reset_car_request()
-            self.event_handler.car_is_driving = False
-            self.run()
+            self.next_epoch()
+
+    def can_stop_early(self):
+        """
+        Check with the early stopping if the results of the epochs are already known
+
+        :return: True if the evaluation can stop
+        """
+        if self.early_stopping is None:
+            return False
+        reason, statistics = self.early_stopping.check(self.evaluated_results())
+        if reason is None:
+            return False
+        logger.warning(build_log_tag("EARLY STOPPING", reason=reason, **statistics, **self.event_handler.log_tags))
+        return True
+
+    def evaluated_results(self):
+        """
+        :return: the results of the epochs of the evaluated model
+        """
+        return self.results
+
+    def next_epoch(self):
+        """
+        Reset the car and launch the next epoch
+        """
+        self.controller.client.send_reset_car_request()
+        self.event_handler.car_is_driving = False
+        self.run()
     
     def check_limit_turn(self, *args, **kwargs):
         """
         Check if the current turn has reached the limit
         """
         if self.event_handler.turn >= self.nbr_turns_limit:
-            logger.warning(build_log_tag("LIMIT", message="Number of limit turns reached", nbr_turns_limit=self.nbr_turns_limit))
-            self.end_epoch()
+            logger.warning(build_log_tag("LIMIT", message="Number of limit turns reached", nbr_turns_limit=self.nbr_turns_limit, **self.event_handler.log_tags))
+            self.end_epoch("turns_limit")
+
+    def epoch_result(self, end_reason = None):
+        """
+        Result of the current epoch
+
+        :param end_reason: why the epoch ended
+        :return: dict
+        """
+        splits = self.event_handler.splits.summary()
+        return {
+            "model_id": self.model_id,
+            "session_id": self.session_id,
+            "epoch": self.current_epoch,
+            "end_reason": end_reason,
+            "turn": self.event_handler.turn,
+            "last_node": self.event_handler.last_node,
+            "first_time_on_first_turn": self.event_handler.first_time_on_first_turn,
+            "last_time_on_last_turn": self.event_handler.last_time_on_last_turn,
+            "last_time_on_last_node": self.event_handler.last_time_on_last_node,
+            "mean_lap_time": splits["mean_lap_time"],
+            "best_lap_time": splits["best_lap_time"],
+            "lap_times": splits["lap_times"],
+            "splits": splits,
+            "max_abs_cte": self.event_handler.max_abs_cte,
+            "frames": self.event_handler.frames.summary(),
+            "latency": self.event_handler.latency.summary(),
+        }
 
     def end_evaluation_and_summary(self):
         """
         Log the end of evaluation and print a summary
         """
-        logger.success(build_log_tag("EVALUATION", "END", epoch=self.current_epoch))
+        logger.success(build_log_tag("EVALUATION", "END", epoch=self.current_epoch, **self.event_handler.log_tags))
         logger.info(build_log_tag("SUMMARY", epoch=self.current_epoch, 
                                                 turn=self.event_handler.turn,
                                                 last_node=self.event_handler.last_node,
                                                 first_time_on_first_turn=self.event_handler.first_time_on_first_turn,
                                                 last_time_on_last_turn=self.event_handler.last_time_on_last_turn,
                                                 last_time_on_last_node=self.event_handler.last_time_on_last_node,
-                                                ))
+                                                **self.event_handler.log_tags))
+        splits = self.event_handler.splits.summary()
+        # The lists are logged without brackets, which would be parsed as args of the line
+        logger.info(build_log_tag("SPLITS", epoch=self.current_epoch, 
+                                            nbr_laps=splits["nbr_laps"], 
+                                            lap_times=";".join(str(lap_time) for lap_time in splits["lap_times"]), 
+                                            best_lap=splits["best_lap"], 
+                                            best_lap_time=splits["best_lap_time"], 
+                                            mean_lap_time=splits["mean_lap_time"], **self.event_handler.log_tags))
+        for lap, segment_deltas in enumerate(splits["segment_deltas"], start=1):
+            logger.debug(build_log_tag("SEGMENT DELTAS", epoch=self.current_epoch, lap=lap, segment_deltas=";".join(str(delta) for delta in segment_deltas), **self.event_handler.log_tags))
+        logger.info(build_log_tag("FRAMES", epoch=self.current_epoch, **self.event_handler.frames.summary(), **self.event_handler.log_tags))
+        for stage, latency_stats in self.event_handler.latency.summary().items():
+            # The histogram is logged without brackets, which would be parsed as args of the line
+            if "histogram" in latency_stats:
+                latency_stats["histogram"] = ";".join(str(count) for count in latency_stats["histogram"])
+            logger.info(build_log_tag("LATENCY", epoch=self.current_epoch, stage=stage, **latency_stats, **self.event_handler.log_tags))
+        self.dispatcher.log_stats(epoch=self.current_epoch, **self.event_handler.log_tags)
     
     def stop(self):
         """
         Stop the evaluator
         """
         self.controller.stop()
-        logger.info(build_log_tag("Donkey Car Evaluator", "END"))        
\ No newline at end of file
+        self.dispatcher.stop()
+        logger.info(build_log_tag("Donkey Car Evaluator", "END", **self.event_handler.log_tags))
+        self.finished.set()        
\ No newline at end of file
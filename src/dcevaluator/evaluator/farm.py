@@ -0,0 +1,240 @@
+from loguru import logger
+from threading import Thread, Lock
+from concurrent.futures import ThreadPoolExecutor
+import collections
+import queue
+import time
+from dcevaluator.communication.dc_client import DonkeyCarClient
+from dcevaluator.event.event_handler import EventHandler
+from dcevaluator.controller.auto_controller import AutoController
+from dcevaluator.controller.brain_loader import load_brain
+from dcevaluator.evaluator.evaluator import Evaluator
+from dcevaluator.utils.utils import build_log_tag
+
+def parse_endpoint(endpoint):
+    """
+    Parse the endpoint of a simulator
+
+    :param endpoint: "host:port" string
+    :return: (host, port)
+    """
+    host, port = endpoint.rsplit(":", 1)
+    return host, int(port)
+
+def shard_epochs(nbr_epochs, nbr_shards):
+    """
+    Split a number of epochs into shards as even as possible
+
+    :param nbr_epochs: number of epochs to split
+    :param nbr_shards: maximum number of shards
+    :return: list of the number of epochs of each shard (without empty shard)
+    """
+    quotient, remainder = divmod(nbr_epochs, nbr_shards)
+    shards = [quotient + 1 if i < remainder else quotient for i in range(nbr_shards)]
+    return [nbr_shard_epochs for nbr_shard_epochs in shards if nbr_shard_epochs > 0]
+
+class EvaluationSession:
+    def __init__(self, endpoint,
+                       model_path,
+                       nbr_epochs,
+                       evaluation_scene = "roboracingleague_1",
+                       max_delay_reset_scene = 10,
+                       inference_in_process = False,
+                       nbr_warm_up = 5,
+                       max_session_time = None,
+                       session_id = None,
+                       client_kwargs = None,
+                       controller_kwargs = None,
+                       evaluator_kwargs = None
+                       ):
+        """
+        Evaluation Session
+
+        Evaluate a model during some epochs on one simulator, with its own client, event handler, controller and evaluator.
+
+        :param endpoint: "host:port" of the simulator
+        :param model_path: Path of the model to evaluate
+        :param nbr_epochs: number of epochs to run on this simulator
+        :param evaluation_scene: scene to load before the evaluation
+        :param max_delay_reset_scene: maximum delay time to wait for the simulator to exit the scene
+        :param inference_in_process: True to run the Brain in a separate process, so the Brains of the sessions do not share the GIL (the Brain must read the decoded image with `request.image`)
+        :param nbr_warm_up: number of dummy inferences run after loading the model
+        :param max_session_time: maximum duration of the session in seconds (None for no limit). The evaluation is stopped when it is reached.
+        :param session_id: identifier of the session written in the results of its epochs. None to use the endpoint.
+        :param client_kwargs: other parameters of `DonkeyCarClient`
+        :param controller_kwargs: other parameters of `AutoController`
+        :param evaluator_kwargs: other parameters of `Evaluator`
+        """
+        self.endpoint = endpoint
+        self.model_path = model_path
+        self.nbr_epochs = nbr_epochs
+        self.evaluation_scene = evaluation_scene
+        self.max_delay_reset_scene = max_delay_reset_scene
+        self.inference_in_process = inference_in_process
+        self.nbr_warm_up = nbr_warm_up
+        self.max_session_time = max_session_time
+        self.session_id = session_id if session_id is not None else endpoint
+        self.client_kwargs = client_kwargs if client_kwargs is not None else dict()
+        self.controller_kwargs = controller_kwargs if controller_kwargs is not None else dict()
+        self.evaluator_kwargs = evaluator_kwargs if evaluator_kwargs is not None else dict()
+
+    def run(self):
+        """
+        Run the session until all its epochs are done
+
+        :return: list of the results of the epochs (see `Evaluator.epoch_result`) with the endpoint and the model path
+        """
+        logger.info(build_log_tag("FARM SESSION", "BEGIN", endpoint=self.endpoint, model_path=self.model_path, nbr_epochs=self.nbr_epochs))
+        host, port = parse_endpoint(self.endpoint)
+        event_handler = EventHandler()
+        # The sessions run in parallel and write in the same log, so the lines of this session are tagged with its simulator
+        event_handler.log_tags["endpoint"] = self.endpoint
+        client = DonkeyCarClient(event_handler, host, port, **self.client_kwargs)
+
+        # The Brain is loaded and warmed up in the background while the simulator resets and loads the scene
+        with ThreadPoolExecutor(max_workers=1) as brain_loader:
+            brain_future = brain_loader.submit(load_brain, self.model_path, self.inference_in_process, self.nbr_warm_up, client.wait_camera_shape)
+            try:
+                # Counted before connecting, so the "scene_selection_ready" sent by a simulator already in the menu is not missed
+                nbr_scene_selection_ready = event_handler.readiness.message_count("scene_selection_ready")
+                client.connect()
+                client.send_exit_scene_request()
+                event_handler.readiness.wait_for_message("scene_selection_ready", timeout=self.max_delay_reset_scene, seen_before=nbr_scene_selection_ready)
+                client.send_load_scene_request(self.evaluation_scene)
+                brain = brain_future.result()
+            except Exception:
+                client.stop()
+                raise
+
+        controller = AutoController(client, brain, event_handler, **self.controller_kwargs)
+        evaluator = Evaluator(event_handler, controller, nbr_epochs=self.nbr_epochs, model_id=self.model_path, session_id=self.session_id, **self.evaluator_kwargs)
+        if not evaluator.finished.wait(timeout=self.max_session_time):
+            logger.warning(build_log_tag("FARM SESSION", "TIMEOUT", endpoint=self.endpoint, model_path=self.model_path, max_session_time=self.max_session_time))
+            evaluator.stop()
+
+        logger.info(build_log_tag("FARM SESSION", "END", endpoint=self.endpoint, model_path=self.model_path, nbr_results=len(evaluator.results)))
+        return [dict(result, endpoint=self.endpoint, model_path=self.model_path) for result in evaluator.results]
+
+class EvaluationFarm:
+    def __init__(self, endpoints, model_paths, nbr_epochs = 10, **session_kwargs):
+        """
+        Evaluation Farm
+
+        Run the epochs of one or several models in parallel on several simulators.
+        The epochs of each model are split into one shard per simulator, and each simulator runs the shards
+        one after another (one `EvaluationSession` per shard), so the wall-clock time drops with the number of simulators.
+
+        Ex:
+            farm = EvaluationFarm(["127.0.0.1:9091", "127.0.0.1:9092"], ["models/a", "models/b"], nbr_epochs=10)
+            report = farm.run()
+
+        :param endpoints: list of "host:port" of the simulators
+        :param model_paths: list of the paths of the models to evaluate
+        :param nbr_epochs: number of epochs for each model
+        :param session_kwargs: other parameters of `EvaluationSession`
+        """
+        self.endpoints = list(endpoints)
+        self.model_paths = list(model_paths)
+        self.nbr_epochs = nbr_epochs
+        self.session_kwargs = session_kwargs
+
+        self.lock = Lock()
+        self.results = []
+        self.failures = []
+
+    def jobs(self):
+        """
+        Shards of epochs to run
+
+        :return: list of (model_path, shard, nbr_epochs)
+        """
+        return [(model_path, shard, nbr_shard_epochs) for model_path in self.model_paths
+                                                      for shard, nbr_shard_epochs in enumerate(shard_epochs(self.nbr_epochs, len(self.endpoints)))]
+
+    def run(self):
+        """
+        Run all the jobs on the simulators and wait until they are done
+
+        :return: merged report (see `report`)
+        """
+        jobs = queue.Queue()
+        for job in self.jobs():
+            jobs.put(job)
+
+        start_time = time.perf_counter()
+        logger.info(build_log_tag("FARM", "BEGIN", endpoints=";".join(self.endpoints), nbr_models=len(self.model_paths), nbr_jobs=jobs.qsize()))
+        workers = [Thread(target=self.worker, args=(endpoint, jobs), name="FarmWorker-" + endpoint) for endpoint in self.endpoints]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        logger.info(build_log_tag("FARM", "END", duration=time.perf_counter() - start_time, nbr_failures=len(self.failures)))
+
+        report = self.report()
+        self.log_report(report)
+        return report
+
+    def worker(self, endpoint, jobs):
+        """
+        Run the jobs on a simulator until there is no more job
+
+        :param endpoint: "host:port" of the simulator
+        :param jobs: queue of (model_path, shard, nbr_epochs)
+        """
+        while True:
+            try:
+                model_path, shard, nbr_epochs = jobs.get_nowait()
+            except queue.Empty:
+                return
+            # The epochs of each shard are numbered from 1, so the shard is part of the identifier of the session in the results
+            session = EvaluationSession(endpoint, model_path, nbr_epochs, session_id=endpoint + "/" + str(shard), **self.session_kwargs)
+            try:
+                results = session.run()
+            except Exception as e:
+                logger.exception(build_log_tag("FARM SESSION", "ERROR", endpoint=endpoint, model_path=model_path))
+                with self.lock:
+                    self.failures.append({ "endpoint": endpoint, "model_path": model_path, "shard": shard, "nbr_epochs": nbr_epochs, "error": repr(e) })
+                continue
+            with self.lock:
+                self.results.extend(dict(result, shard=shard) for result in results)
+
+    def report(self):
+        """
+        Merge the results of all the sessions
+
+        The epochs of each model are renumbered from 1 (`epoch`), the epoch in its session is kept in `session_epoch`.
+
+        :return: dict { model_path: list of the results of the epochs }
+        """
+        report = { model_path: [] for model_path in self.model_paths }
+        with self.lock:
+            results = list(self.results)
+        for result in results:
+            report[result["model_path"]].append(result)
+        for model_path, model_results in report.items():
+            model_results.sort(key=lambda result: (result["shard"], result["epoch"]))
+            for epoch, result in enumerate(model_results, start=1):
+                result["session_epoch"] = result["epoch"]
+                result["epoch"] = epoch
+        return report
+
+    def log_report(self, report):
+        """
+        Log the results of each epoch and a summary of each model
+
+        :param report: merged report (see `report`)
+        """
+        for model_path, model_results in report.items():
+            for result in model_results:
+                # The frames, latency and splits statistics are already logged at the end of each epoch
+                fields = { key: value for key, value in result.items() if key not in ("frames", "latency", "splits") }
+                # Without brackets, which would be parsed as an arg of the line
+                fields["lap_times"] = ";".join(str(lap_time) for lap_time in result["lap_times"])
+                logger.info(build_log_tag("FARM RESULT", **fields))
+            end_reasons = collections.Counter(result["end_reason"] for result in model_results)
+            turns = [result["turn"] for result in model_results]
+            logger.info(build_log_tag("FARM SUMMARY", model_path=model_path,
+                                                      nbr_epochs=len(model_results),
+                                                      mean_turn=sum(turns) / len(turns) if len(turns) > 0 else None,
+                                                      max_turn=max(turns) if len(turns) > 0 else None,
+                                                      **{ "nbr_" + str(end_reason): count for end_reason, count in end_reasons.items() }))
@@ -0,0 +1,133 @@
+import csv
+import io
+import os
+import time
+import pandas as pd
+
+try:
+    # File locks are only available on Unix
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+class ResultsStore:
+    # Columns of the file of the epochs
+    EPOCH_COLUMNS = ("timestamp", "evaluation_name", "model_id", "session_id", "epoch", "end_reason", "turn", "last_node", "max_abs_cte",
+                     "mean_lap_time", "best_lap_time", "lap_times",
+                     "frames_received", "frames_dropped", "frames_predicted", "frames_stale", "frames_unconsumed",
+                     "latency_count", "latency_mean", "latency_p50", "latency_p95", "latency_p99", "latency_max")
+    # Columns of the file of the laps
+    LAP_COLUMNS = ("timestamp", "evaluation_name", "model_id", "session_id", "epoch", "lap", "lap_time")
+    # Separator of the lap times in the file of the epochs
+    LAP_TIMES_SEPARATOR = ";"
+
+    def __init__(self, path, evaluation_name = None):
+        """
+        Results Store
+
+        Append one row per epoch and one row per lap into CSV files while the evaluation runs,
+        so the results can be analysed with `load_epochs` and `load_laps` without parsing the logs.
+        The rows are appended with a lock on the file, so several processes (e.g. an evaluation farm) can share the same files.
+        The epochs of each session are numbered from 1, so the rows of an epoch are identified by the model, the session and the epoch.
+
+        :param path: path of the CSV file of the epochs. The laps are written in the same directory with the suffix "_laps".
+        :param evaluation_name: name of the evaluation written in each row
+        """
+        self.path = path
+        root, extension = os.path.splitext(path)
+        self.laps_path = root + "_laps" + (extension if extension != "" else ".csv")
+        self.evaluation_name = evaluation_name
+
+    def append_epoch(self, result):
+        """
+        Append the result of an epoch and its laps
+
+        :param result: result of the epoch (see `Evaluator.epoch_result`)
+        """
+        timestamp = time.time()
+        lap_times = result.get("lap_times") or []
+        latency = result.get("latency", dict()).get("receive_to_send", dict())
+        frames = result.get("frames", dict())
+
+        epoch_row = {
+            "timestamp": timestamp,
+            "evaluation_name": self.evaluation_name,
+            "model_id": result.get("model_id"),
+            "session_id": result.get("session_id"),
+            "epoch": result.get("epoch"),
+            "end_reason": result.get("end_reason"),
+            "turn": result.get("turn"),
+            "last_node": result.get("last_node"),
+            "max_abs_cte": result.get("max_abs_cte"),
+            "mean_lap_time": result.get("mean_lap_time"),
+            "best_lap_time": result.get("best_lap_time"),
+            "lap_times": self.LAP_TIMES_SEPARATOR.join(str(lap_time) for lap_time in lap_times),
+            "frames_received": frames.get("received"),
+            "frames_dropped": frames.get("dropped"),
+            "frames_predicted": frames.get("predicted"),
+            "frames_stale": frames.get("stale"),
+            "frames_unconsumed": frames.get("unconsumed"),
+            "latency_count": latency.get("count"),
+            "latency_mean": latency.get("mean"),
+            "latency_p50": latency.get("p50"),
+            "latency_p95": latency.get("p95"),
+            "latency_p99": latency.get("p99"),
+            "latency_max": latency.get("max"),
+        }
+        lap_rows = [{
+            "timestamp": timestamp,
+            "evaluation_name": self.evaluation_name,
+            "model_id": result.get("model_id"),
+            "session_id": result.get("session_id"),
+            "epoch": result.get("epoch"),
+            "lap": lap,
+            "lap_time": lap_time,
+        } for lap, lap_time in enumerate(lap_times, start=1)]
+
+        self.append_rows(self.path, self.EPOCH_COLUMNS, [epoch_row])
+        if len(lap_rows) > 0:
+            self.append_rows(self.laps_path, self.LAP_COLUMNS, lap_rows)
+
+    @staticmethod
+    def append_rows(path, columns, rows):
+        """
+        Append rows to a CSV file, with its header if the file is empty
+
+        The file is locked during the write and the rows are written with a single `write` in append mode,
+        so the rows of several processes are never interleaved.
+
+        :param path: path of the CSV file
+        :param columns: names of the columns
+        :param rows: list of dicts
+        """
+        with open(path, "a", newline="") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+                # The size is read after taking the lock, so only one process writes the header
+                if os.fstat(f.fileno()).st_size == 0:
+                    writer.writeheader()
+                writer.writerows(rows)
+                f.write(buffer.getvalue())
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def load_epochs(self):
+        """
+        Load the results of all the epochs
+
+        :return: pandas DataFrame with one row per epoch
+        """
+        return pd.read_csv(self.path, dtype={ "model_id": str, "session_id": str, "evaluation_name": str, "end_reason": str, "lap_times": str })
+
+    def load_laps(self):
+        """
+        Load the times of all the laps
+
+        :return: pandas DataFrame with one row per lap
+        """
+        return pd.read_csv(self.laps_path, dtype={ "model_id": str, "session_id": str, "evaluation_name": str })
@@ -0,0 +1,241 @@
+from loguru import logger
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+import collections
+import gc
+import os
+import pandas as pd
+from dcevaluator.controller.brain_loader import load_brain
+from dcevaluator.evaluator.evaluator import Evaluator
+from dcevaluator.utils.utils import build_log_tag
+
+def model_size(model_path):
+    """
+    Size of a model on the disk, used as an estimation of its size in memory
+
+    :param model_path: Path of the model (file or directory)
+    :return: size in bytes
+    """
+    if os.path.isfile(model_path):
+        return os.path.getsize(model_path)
+    size = 0
+    for directory, _, filenames in os.walk(model_path):
+        for filename in filenames:
+            size += os.path.getsize(os.path.join(directory, filename))
+    return size
+
+class BrainCache:
+    def __init__(self, memory_budget, **loader_kwargs):
+        """
+        Brain Cache
+
+        Load the Brains in the background and keep them in memory while their total size (estimated with the size of the models on the disk)
+        is under a budget. The least recently used Brains are evicted first.
+
+        :param memory_budget: maximum total size of the loaded models in bytes
+        :param loader_kwargs: other parameters of `load_brain` (inference_in_process, nbr_warm_up, image_shape or a function returning it)
+        """
+        self.memory_budget = memory_budget
+        self.loader_kwargs = loader_kwargs
+        # model_path -> (future of the Brain, size)
+        self.entries = collections.OrderedDict()
+        self.lock = Lock()
+        self.loader = ThreadPoolExecutor(max_workers=1)
+
+    def loaded_size(self):
+        """
+        :return: total size of the loaded (or loading) models in bytes
+        """
+        return sum(size for _, size in self.entries.values())
+
+    def preload(self, model_path, keep = ()):
+        """
+        Start loading a Brain in the background if it fits in the budget
+
+        :param model_path: Path of the model
+        :param keep: paths of the models which must not be evicted (e.g. the Brain driving the car)
+        :return: True if the Brain is loaded or loading
+        """
+        with self.lock:
+            if model_path in self.entries:
+                self.entries.move_to_end(model_path)
+                return True
+            size = model_size(model_path)
+            self.evict_until_fit(size, keep)
+            if self.loaded_size() + size > self.memory_budget and len(self.entries) > 0:
+                logger.info(build_log_tag("BRAIN CACHE", "NO PRELOAD", model_path=model_path, size=size, loaded_size=self.loaded_size(), memory_budget=self.memory_budget))
+                return False
+            self.load(model_path, size)
+            return True
+
+    def get(self, model_path, keep = ()):
+        """
+        Get a Brain, loading it if it is not preloaded (even if it exceeds the budget)
+
+        :param model_path: Path of the model
+        :param keep: paths of the models which must not be evicted
+        :return: the Brain instance
+        """
+        with self.lock:
+            if model_path in self.entries:
+                self.entries.move_to_end(model_path)
+            else:
+                size = model_size(model_path)
+                self.evict_until_fit(size, tuple(keep) + (model_path,))
+                self.load(model_path, size)
+            future, _ = self.entries[model_path]
+        return future.result()
+
+    def load(self, model_path, size):
+        """
+        Submit the loading of a Brain (the lock must be held)
+
+        :param model_path: Path of the model
+        :param size: estimated size of the model in bytes
+        """
+        logger.info(build_log_tag("BRAIN CACHE", "LOAD", model_path=model_path, size=size))
+        self.entries[model_path] = (self.loader.submit(load_brain, model_path, **self.loader_kwargs), size)
+
+    def evict_until_fit(self, size, keep = ()):
+        """
+        Evict the least recently used Brains until a model of `size` bytes fits in the budget (the lock must be held)
+
+        :param size: size of the model to add in bytes
+        :param keep: paths of the models which must not be evicted
+        """
+        for model_path in list(self.entries.keys()):
+            if self.loaded_size() + size <= self.memory_budget:
+                return
+            if model_path not in keep:
+                self.evict(model_path)
+
+    def evict(self, model_path):
+        """
+        Remove a Brain from the cache and release its resources (the lock must be held)
+
+        :param model_path: Path of the model
+        """
+        future, size = self.entries.pop(model_path)
+        logger.info(build_log_tag("BRAIN CACHE", "EVICT", model_path=model_path, size=size))
+        try:
+            brain = future.result()
+        except Exception:
+            return
+        close_brain = getattr(brain, "close", None)
+        if close_brain is not None:
+            close_brain()
+        del brain
+        gc.collect()
+
+    def close(self):
+        """
+        Evict all the Brains and stop the loader
+        """
+        with self.lock:
+            for model_path in list(self.entries.keys()):
+                self.evict(model_path)
+        self.loader.shutdown()
+
+class TournamentEvaluator(Evaluator):
+    def __init__(self, event_handler, controller, model_paths, brain_cache, **kwargs):
+        """
+        Tournament Evaluator
+
+        Evaluate several models one after another on the same loaded scene : when all the epochs of a model are done,
+        the Brain of the controller is swapped with the next one (preloaded in the background) and the car is reset.
+
+        :param event_handler: Event Handler instance.
+        :param controller: Controller instance. Its Brain must be the one of the first model.
+        :param model_paths: list of the paths of the models to evaluate
+        :param brain_cache: BrainCache instance loading the Brains
+        :param kwargs: other parameters of `Evaluator` (`nbr_epochs` is the number of epochs of each model)
+        """
+        self.model_paths = list(model_paths)
+        self.brain_cache = brain_cache
+        self.model_index = 0
+        super().__init__(event_handler, controller, **kwargs)
+        self.preload_next_model()
+
+    @property
+    def model_path(self):
+        return self.model_paths[self.model_index]
+
+    def preload_next_model(self):
+        """
+        Load the next model in the background while the current one is evaluated
+        """
+        if self.model_index + 1 < len(self.model_paths):
+            self.brain_cache.preload(self.model_paths[self.model_index + 1], keep=(self.model_path,))
+
+    def epoch_result(self, end_reason = None):
+        """
+        Result of the current epoch with the path of the evaluated model
+
+        :param end_reason: why the epoch ended
+        :return: dict
+        """
+        return dict(super().epoch_result(end_reason), model_path=self.model_path, model_id=self.model_path)
+
+    def evaluated_results(self):
+        """
+        :return: the results of the epochs of the current model
+        """
+        return [result for result in self.results if result["model_path"] == self.model_path]
+
+    def stop(self):
+        """
+        Swap to the next model, or stop the evaluator if all the models are evaluated
+        """
+        if self.model_index + 1 >= len(self.model_paths):
+            self.log_ranking()
+            super().stop()
+            return
+
+        self.event_handler.car_is_driving = False
+        previous_model_path = self.model_path
+        self.model_index += 1
+        logger.success(build_log_tag("TOURNAMENT", "NEXT MODEL", model_path=self.model_path, model_index=self.model_index))
+        # The previous Brain may still be predicting in the controller thread, so it cannot be evicted before the swap
+        brain = self.brain_cache.get(self.model_path, keep=(previous_model_path, self.model_path))
+        self.controller.set_brain(brain)
+        # Now the previous Brain is not used anymore and can be evicted to preload the next one
+        self.preload_next_model()
+        self.current_epoch = 1
+        self.next_epoch()
+
+    def ranking(self):
+        """
+        Comparison of the models, ranked by mean number of turns then by mean lap time
+
+        :return: pandas DataFrame with one row per model
+        """
+        rows = []
+        for model_path in self.model_paths:
+            model_results = [result for result in self.results if result["model_path"] == model_path]
+            turns = [result["turn"] for result in model_results]
+            lap_times = [result["mean_lap_time"] for result in model_results if result["mean_lap_time"] is not None]
+            end_reasons = collections.Counter(result["end_reason"] for result in model_results)
+            rows.append({
+                "model_path": model_path,
+                "nbr_epochs": len(model_results),
+                "mean_turn": sum(turns) / len(turns) if len(turns) > 0 else 0.0,
+                "max_turn": max(turns) if len(turns) > 0 else 0,
+                "mean_lap_time": sum(lap_times) / len(lap_times) if len(lap_times) > 0 else float("inf"),
+                "car_leaving_road": end_reasons["car_leaving_road"],
+                "timeout": end_reasons["timeout"],
+                "turns_limit": end_reasons["turns_limit"],
+            })
+        ranking = pd.DataFrame(rows, columns=["model_path", "nbr_epochs", "mean_turn", "max_turn", "mean_lap_time", "car_leaving_road", "timeout", "turns_limit"])
+        ranking = ranking.sort_values(["mean_turn", "mean_lap_time"], ascending=[False, True]).reset_index(drop=True)
+        ranking.index = ranking.index + 1
+        ranking.index.name = "rank"
+        return ranking
+
+    def log_ranking(self):
+        """
+        Log the ranking of the models
+        """
+        ranking = self.ranking()
+        for rank, row in ranking.iterrows():
+            logger.info(build_log_tag("TOURNAMENT RANK", rank=rank, **row.to_dict()))
+        logger.success("Tournament ranking :\n" + ranking.to_string())
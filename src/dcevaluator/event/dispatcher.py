@@ -0,0 +1,164 @@
+from loguru import logger
+from threading import Thread, Lock
+import queue
+import time
+from dcevaluator.utils.utils import build_log_tag
+
+class EventWorker:
+    def __init__(self, func, name, max_queue_size = 0):
+        """
+        Long-lived worker calling a handler for each event, in the order of the events
+
+        :param func: the handler to call
+        :param name: name of the handler (used in the logs)
+        :param max_queue_size: maximum number of events waiting in the queue (0 for no limit). When the queue is full, the new events are dropped.
+        """
+        self.func = func
+        self.name = name
+        self.queue = queue.Queue(maxsize = max_queue_size)
+        self.running = True
+
+        self.stats_lock = Lock()
+        self.reset_stats()
+
+        self.worker_thread = Thread(target=self.loop, name="EventWorker-" + name, daemon=True)
+        self.worker_thread.start()
+
+    def submit(self, *args, **kwargs):
+        """
+        Queue an event to be processed by the handler
+
+        :param args: the arguments given to the handler
+        :param kwargs: the keyword arguments given to the handler
+        """
+        if not self.running:
+            return
+        try:
+            self.queue.put_nowait((time.perf_counter(), args, kwargs))
+        except queue.Full:
+            with self.stats_lock:
+                self.nbr_dropped += 1
+            return
+        with self.stats_lock:
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    def loop(self):
+        """
+        Process the events until the worker is stopped
+        """
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            submit_time, args, kwargs = event
+
+            latency = time.perf_counter() - submit_time
+            with self.stats_lock:
+                self.nbr_dispatched += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+            try:
+                self.func(*args, **kwargs)
+            except Exception:
+                logger.exception(build_log_tag("DISPATCHER", "ERROR", handler=self.name))
+
+    def stats(self):
+        """
+        Metrics of the worker since the last reset
+
+        :return: a dict with the queue depth and the dispatch latency (time between the submission of an event and the call of the handler, in seconds)
+        """
+        with self.stats_lock:
+            return {
+                "handler": self.name,
+                "dispatched": self.nbr_dispatched,
+                "dropped": self.nbr_dropped,
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "mean_latency": self.total_latency / self.nbr_dispatched if self.nbr_dispatched > 0 else 0.0,
+                "max_latency": self.max_latency,
+            }
+
+    def reset_stats(self):
+        """
+        Reset the metrics of the worker
+        """
+        with self.stats_lock:
+            self.nbr_dispatched = 0
+            self.nbr_dropped = 0
+            self.max_queue_depth = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+
+    def stop(self):
+        """
+        Stop the worker once the events already queued are processed
+        """
+        if self.running:
+            self.running = False
+            self.queue.put(None)
+
+class EventDispatcher:
+    def __init__(self, max_queue_size = 0):
+        """
+        Event Dispatcher
+
+        Replace `launch_func_in_thread` which creates a new thread for each event :
+        each handler gets an ordered queue and a single long-lived worker thread.
+
+        Ex:
+            dispatcher = EventDispatcher()
+            event_handler.on_telemetry = dispatcher.wrap(controller.on_telemetry)
+
+        :param max_queue_size: maximum number of events waiting for each handler (0 for no limit). When a queue is full, the new events are dropped.
+        """
+        self.max_queue_size = max_queue_size
+        self.workers = []
+        self.lock = Lock()
+
+    def wrap(self, func, name = None):
+        """
+        Wrap a handler to process its events in a worker thread
+
+        :param func: the handler
+        :param name: name of the handler (by default, the qualified name of the function)
+        :return: A function queuing the events for `func`
+        """
+        worker = EventWorker(func, name if name is not None else func.__qualname__, self.max_queue_size)
+        with self.lock:
+            self.workers.append(worker)
+        return worker.submit
+
+    def stats(self):
+        """
+        Metrics of all the handlers
+
+        :return: list of dicts (see `EventWorker.stats`)
+        """
+        with self.lock:
+            return [worker.stats() for worker in self.workers]
+
+    def log_stats(self, reset = True, **tags):
+        """
+        Log the metrics of all the handlers
+
+        :param reset: reset the metrics after logging them
+        :param tags: other values to add to the log tags (e.g. the epoch)
+        """
+        with self.lock:
+            workers = list(self.workers)
+        for worker in workers:
+            logger.debug(build_log_tag("DISPATCHER", **tags, **worker.stats()))
+            if reset:
+                worker.reset_stats()
+
+    def stop(self):
+        """
+        Stop all the workers
+        The events already queued are still processed
+        """
+        with self.lock:
+            workers = list(self.workers)
+        for worker in workers:
+            worker.stop()
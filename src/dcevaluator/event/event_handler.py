@@ -1,12 +1,24 @@
 from loguru import logger
+from threading import Condition
 import time
+from dcevaluator.utils.metrics import LatencyRecorder, FrameCounter
+from dcevaluator.event.readiness import ReadinessDetector
+from dcevaluator.event.split_timer import SplitTimer
 
 class EventHandler:
     def __init__(self):
-        self.car_is_ready = False
-        self.car_is_driving = False
+        # Notified each time the state of the car changes (see `notify_state_change`)
+        self.state_condition = Condition()
+        self._car_is_ready = False
+        self._car_is_driving = False
         self.car_is_leaving = False
         self.car_controller_is_ready = False
+        # Latency from the reception of a telemetry to the sending of the matching control
+        self.latency = LatencyRecorder()
+        # Frames received, dropped, predicted and skipped because they were too old
+        self.frames = FrameCounter()
+        # Messages received and stability of the car, to know when the simulator is ready
+        self.readiness = ReadinessDetector()
 
         self.last_node = -1
         self.last_time_on_last_node = -1
@@ -14,6 +26,12 @@ class EventHandler:
         self.first_time_on_first_turn = 0
         self.first_time_when_car_is_driving = -1
         self.last_time_on_last_turn = 0
+        # Time of arrival at each node of each lap of the current epoch
+        self.splits = SplitTimer()
+        # Maximum distance from the center of the road during the current epoch
+        self.max_abs_cte = 0.0
+        # Tags added to the lines logged during the evaluation (e.g. the endpoint of the simulator when several evaluations share the same log)
+        self.log_tags = dict()
         
         self.on_scene_selection_ready = self.unimplemented_behavior("on_scene_selection_ready")
         self.on_scene_loaded = self.unimplemented_behavior("on_scene_loaded")
@@ -26,6 +44,33 @@ class EventHandler:
         self.on_car_leaving_road = self.unimplemented_behavior("on_car_leaving_road")
         self.on_timeout = self.unimplemented_behavior("on_timeout")
 
+    @property
+    def car_is_ready(self):
+        return self._car_is_ready
+
+    @car_is_ready.setter
+    def car_is_ready(self, value):
+        with self.state_condition:
+            self._car_is_ready = value
+            self.state_condition.notify_all()
+
+    @property
+    def car_is_driving(self):
+        return self._car_is_driving
+
+    @car_is_driving.setter
+    def car_is_driving(self, value):
+        with self.state_condition:
+            self._car_is_driving = value
+            self.state_condition.notify_all()
+
+    def notify_state_change(self):
+        """
+        Wake up the threads waiting on `state_condition`
+        """
+        with self.state_condition:
+            self.state_condition.notify_all()
+
     def unimplemented_behavior(self, *gargs, **gkwargs):
         """
         Substitution function when a behavior has not been defined
@@ -50,6 +95,8 @@ class EventHandler:
         self.first_time_on_first_turn = 0
         self.first_time_when_car_is_driving = -1
         self.last_time_on_last_turn = 0
+        self.splits.reset()
+        self.max_abs_cte = 0.0
     
     def init_turn_stat(self):
         """
@@ -58,4 +105,5 @@ class EventHandler:
         t = time.time()
         self.first_time_on_first_turn = t
         self.last_time_on_last_turn = t
-        self.turn = 0
\ No newline at end of file
+        self.turn = 0
+        self.splits.start(time.perf_counter())
\ No newline at end of file
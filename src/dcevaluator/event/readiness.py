@@ -0,0 +1,95 @@
+from threading import Condition
+import collections
+import time
+
+class ReadinessDetector:
+    def __init__(self, speed_tolerance = 0.05, position_tolerance = 0.01):
+        """
+        Readiness Detector
+
+        Watch the messages sent by the simulator to know when it is actually ready,
+        instead of sleeping a fixed delay : a message type is received (e.g. "scene_selection_ready" after an exit scene)
+        or the car is stable (speed and position near constant during some telemetry frames).
+
+        :param speed_tolerance: maximum absolute speed of a stable car
+        :param position_tolerance: maximum move of the position (on each axis) between two frames of a stable car
+        """
+        self.speed_tolerance = speed_tolerance
+        self.position_tolerance = position_tolerance
+        self.condition = Condition()
+        self.message_counts = collections.Counter()
+        self.last_position = None
+        self.nbr_stable_frames = 0
+
+    def observe_message(self, msg_type):
+        """
+        Count a message received from the simulator
+
+        :param msg_type: type of the message
+        """
+        with self.condition:
+            self.message_counts[msg_type] += 1
+            self.condition.notify_all()
+
+    def observe_telemetry(self, telemetry):
+        """
+        Update the number of consecutive frames where the car is stable
+
+        :param telemetry: Telemetry instance
+        """
+        position = (telemetry.pos_x, telemetry.pos_y, telemetry.pos_z)
+        with self.condition:
+            is_stable = telemetry.speed is not None and abs(telemetry.speed) <= self.speed_tolerance \
+                and None not in position and self.last_position is not None \
+                and all(abs(value - last_value) <= self.position_tolerance for value, last_value in zip(position, self.last_position))
+            self.nbr_stable_frames = self.nbr_stable_frames + 1 if is_stable else 0
+            self.last_position = position if None not in position else None
+            self.condition.notify_all()
+
+    def message_count(self, msg_type):
+        """
+        Number of messages of a type received since the beginning
+
+        :param msg_type: type of the message
+        :return: number of messages
+        """
+        with self.condition:
+            return self.message_counts[msg_type]
+
+    def wait_for_message(self, msg_type, timeout, seen_before = 0):
+        """
+        Wait until a message of a type is received
+
+        Ex:
+            seen_before = readiness.message_count("scene_selection_ready")
+            client.send_exit_scene_request()
+            readiness.wait_for_message("scene_selection_ready", timeout=10, seen_before=seen_before)
+
+        :param msg_type: type of the message
+        :param timeout: maximum time to wait in seconds
+        :param seen_before: number of messages of this type already received before the request
+        :return: True if the message was received, False if the timeout was reached
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.message_counts[msg_type] > seen_before, timeout=timeout)
+
+    def wait_until_stable(self, timeout, nbr_frames, min_delay = 0.0):
+        """
+        Wait until the car is stable during `nbr_frames` consecutive telemetry frames
+
+        The frames received before the call are not taken into account.
+
+        :param timeout: maximum time to wait in seconds
+        :param nbr_frames: number of consecutive stable frames
+        :param min_delay: minimum time to wait in seconds (e.g. to let the simulator process a reset)
+        :return: True if the car is stable, False if the timeout was reached
+        """
+        start_time = time.monotonic()
+        with self.condition:
+            self.nbr_stable_frames = 0
+            self.last_position = None
+        if min_delay > 0:
+            time.sleep(min(min_delay, timeout))
+        remaining_time = max(0.0, timeout - (time.monotonic() - start_time))
+        with self.condition:
+            return self.condition.wait_for(lambda: self.nbr_stable_frames >= nbr_frames, timeout=remaining_time)
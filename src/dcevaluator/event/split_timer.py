@@ -0,0 +1,114 @@
+import numpy as np
+
+class SplitTimer:
+    def __init__(self, max_laps = 64, max_nodes = 512):
+        """
+        Split Timer
+
+        Record the time when the car reaches each node of each lap (`time.perf_counter`) into preallocated NumPy arrays,
+        so recording a node or a lap never allocates memory.
+        The lap times and the time of each segment (between two consecutive nodes) are computed at the end of the epoch.
+
+        :param max_laps: maximum number of laps recorded in an epoch. The next laps are ignored.
+        :param max_nodes: maximum number of nodes of the track. The nodes with a greater index are ignored.
+        """
+        self.max_laps = max_laps
+        self.max_nodes = max_nodes
+        # Time of arrival at each node, for each lap. The last column is the time of the finish line (end of the lap).
+        self.node_times = np.full((max_laps, max_nodes + 1), np.nan)
+        # Time of the beginning of each lap (the end of a lap is the beginning of the next one)
+        self.lap_start_times = np.full(max_laps + 1, np.nan)
+        self.lap = 0
+
+    def reset(self):
+        """
+        Forget all the times (e.g. at the beginning of an epoch)
+        """
+        self.node_times.fill(np.nan)
+        self.lap_start_times.fill(np.nan)
+        self.lap = 0
+
+    def start(self, time):
+        """
+        Start the first lap
+
+        :param time: time of the start
+        """
+        self.reset()
+        self.lap_start_times[0] = time
+        self.node_times[0, 0] = time
+
+    def record_node(self, node, time):
+        """
+        Record the arrival at a node
+
+        :param node: index of the node (`activeNode`)
+        :param time: time of the arrival
+        """
+        if self.lap < self.max_laps and 0 <= node < self.max_nodes:
+            self.node_times[self.lap, node] = time
+
+    def record_lap(self, time):
+        """
+        Record the end of the current lap
+
+        :param time: time of the end of the lap
+        """
+        if self.lap < self.max_laps:
+            # The finish line closes the last segment of the lap
+            self.node_times[self.lap, self.max_nodes] = time
+            self.lap += 1
+            self.lap_start_times[self.lap] = time
+        # The start line is the first node of the next lap
+        if self.lap < self.max_laps:
+            self.node_times[self.lap, 0] = time
+
+    def lap_times(self):
+        """
+        :return: NumPy array of the time of each completed lap
+        """
+        lap_times = np.diff(self.lap_start_times[:self.lap + 1])
+        return lap_times[~np.isnan(lap_times)]
+
+    def segment_times(self):
+        """
+        Time between each pair of consecutive nodes for each completed lap, the last segment ending at the finish line
+        (NaN when a node was not recorded)
+
+        :return: NumPy array (number of completed laps, number of recorded nodes)
+        """
+        node_times = self.node_times[:self.lap]
+        recorded_nodes = np.flatnonzero(~np.all(np.isnan(node_times[:, :self.max_nodes]), axis=0))
+        if len(recorded_nodes) == 0:
+            return np.empty((self.lap, 0))
+        columns = np.append(np.arange(recorded_nodes[-1] + 1), self.max_nodes)
+        return np.diff(node_times[:, columns], axis=1)
+
+    def summary(self):
+        """
+        Lap times, best and mean lap, and the delta of each segment of each lap compared to the best lap
+
+        :return: dict
+        """
+        lap_times = self.lap_times()
+        summary = {
+            "nbr_laps": len(lap_times),
+            "lap_times": lap_times.tolist(),
+            "best_lap": None,
+            "best_lap_time": None,
+            "mean_lap_time": None,
+            "segment_deltas": [],
+        }
+        if len(lap_times) == 0:
+            return summary
+
+        # The laps whose start was not recorded have no time, so the indexes are the ones of the complete laps
+        complete_laps = np.flatnonzero(~np.isnan(np.diff(self.lap_start_times[:self.lap + 1])))
+        best_lap = complete_laps[int(np.argmin(lap_times))]
+        segment_times = self.segment_times()
+        summary["best_lap"] = int(best_lap) + 1
+        summary["best_lap_time"] = float(lap_times.min())
+        summary["mean_lap_time"] = float(lap_times.mean())
+        # Positive when the segment is slower than in the best lap
+        summary["segment_deltas"] = np.round(segment_times[complete_laps] - segment_times[best_lap], 4).tolist()
+        return summary
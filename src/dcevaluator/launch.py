@@ -2,13 +2,16 @@ import begin
 import sys
 from loguru import logger
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from dcevaluator.communication.dc_client import DonkeyCarClient
 from dcevaluator.hardware.joystick import JoystickController
 from dcevaluator.event.event_handler import EventHandler
 from dcevaluator.controller.auto_controller import AutoController
 from dcevaluator.evaluator.evaluator import Evaluator
-from dcevaluator.controller.model_wrapper import DCModelWrapper
+from dcevaluator.evaluator.early_stopping import EarlyStopping
+from dcevaluator.controller.brain_loader import load_brain
+from dcevaluator.evaluator.results import ResultsStore
 from dcevaluator.utils.utils import build_log_tag
 
 logger.remove()
@@ -21,14 +24,26 @@ def run(model_path,
         port = "9091",
         evaluation_scene = "roboracingleague_1",
         log_path = "last_eval.log",
+        results_path = "last_eval_results.csv",
 
         nbr_turns_limit = "10",
         nbr_epochs = "10",
         max_time_to_wait = "10",
         delay_between_check_interval = "0.016",
         delay_before_launch_car = "5",
+        nbr_stable_frames_before_launch_car = "10",
+        min_delay_before_launch_car = "0.5",
+        max_delay_reset_scene = "10",
+        early_stopping = "False",
+        min_epochs = "3",
+        confidence = "0.9",
+        max_turns_ci_width = "1.0",
+        max_lap_time_ci_width = "0.05",
+        min_failure_probability = "0.5",
 
         poll_socket_sleep_sec = "0.016",
+        loop_mode = "selector",
+        selector_timeout_sec = "0.5",
         buffer_message_size_read = "16384",
         deltatime_to_compute_fps = "5.0",
         margin_before_car_leaving_road = "6.0",
@@ -38,6 +53,10 @@ def run(model_path,
         deltatime_max_after_driving_to_reach_first_node = 10,
 
         buffer_requests_size = "4",
+        max_frame_age = "0",
+        inference_in_process = "False",
+        pipelined_preprocessing = "False",
+        nbr_warm_up = "5",
         ):
     """
     Donkey Car Evaluator
@@ -51,6 +70,7 @@ def run(model_path,
     :param port: port to connect to a server with int
     :param evaluation_scene: scene to load before the evaluation
     :log_path: the path of the generated log file
+    :param results_path: the path of the CSV file where the result of each epoch is appended (the laps are appended in the file with the suffix "_laps"). Empty to disable it.
 
 
     EVALUATOR
@@ -59,12 +79,23 @@ def run(model_path,
     :param nbr_epochs: number of epochs, i.e. the number of times the experiment is reproduced. This prevents us from evaluating once and having surprising results on a stroke of luck.
     :param max_time_to_wait: waiting time for a controller ready to drive the car.
     :param delay_between_check_interval: delay between each verification interval when waiting for a controller to be ready.
-    :param delay_before_launch_car: delay time after a scene reset before launching the car. This allows us to be sure that all components are loaded before starting the evaluation.
+    :param delay_before_launch_car: maximum delay time after a scene reset before launching the car. This allows us to be sure that all components are loaded before starting the evaluation.
+    :param nbr_stable_frames_before_launch_car: the car is launched as soon as it is stable (speed and position near constant) during this number of telemetry frames. 0 to always wait `delay_before_launch_car`.
+    :param min_delay_before_launch_car: minimum delay time after a scene reset before launching the car
+    :param max_delay_reset_scene: maximum delay time to wait for the simulator to exit the scene (until the scene selection is ready)
+    :param early_stopping: "True" to stop before `nbr_epochs` when the results are already known (failure probability or narrow confidence intervals)
+    :param min_epochs: minimum number of epochs before an early stopping
+    :param confidence: confidence level of the intervals used by the early stopping
+    :param max_turns_ci_width: the evaluation can stop early when the width of the confidence interval of the number of turns is under this value
+    :param max_lap_time_ci_width: ... and when the width of the confidence interval of the mean lap time, relative to the mean lap time, is under this value
+    :param min_failure_probability: the evaluation stops early when the lower bound of the probability to leave the road or to time out reaches this value
     
 
     CLIENT
     ------
-    :param poll_socket_sleep_sec: time to sleep before polling socket
+    :param poll_socket_sleep_sec: time to sleep before polling socket (only used by the "poll" loop mode)
+    :param loop_mode: "selector" to block until the socket is readable or a message is queued, "poll" to sleep then poll the socket (legacy behavior)
+    :param selector_timeout_sec: maximum time to block in the "selector" loop mode before checking if the client is still connected
     :param buffer_message_size_read: number of bits to read into the socket
     :param delatime_to_compute_fps: deltatime between computation of the FPS
     :param margin_before_car_leaving_road: distance from the center of the road at the active node to the car. Maximum value from which it can be considered that the car has left the road
@@ -76,6 +107,10 @@ def run(model_path,
     CONTROLLER
     ----------
     :param buffer_requests_size: Size of buffer of requests
+    :param max_frame_age: maximum age (in seconds) of a telemetry to be predicted. The older ones are skipped. 0 to predict all of them.
+    :param inference_in_process: "True" to load and run the Brain in a separate process (the Brain must read the decoded image with `request.image`)
+    :param pipelined_preprocessing: "True" to prepare the inputs of the next telemetry with `input_transformer` and `input_preprocessing` while the current one is predicted (the Brain must implement `predict_inputs`)
+    :param nbr_warm_up: number of dummy inferences at the camera resolution run after loading the model, before the evaluation starts. 0 to disable the warm up.
 
     """
 
@@ -90,11 +125,23 @@ def run(model_path,
     logger.info(build_log_tag(nbr_turns_limit=nbr_turns_limit))
     logger.info(build_log_tag(nbr_epochs=nbr_epochs))
     logger.info(build_log_tag(log_path=log_path))
+    logger.info(build_log_tag(results_path=results_path))
 
     logger.debug(build_log_tag(max_time_to_wait=max_time_to_wait))
     logger.debug(build_log_tag(delay_between_check_interval=delay_between_check_interval))
     logger.debug(build_log_tag(delay_before_launch_car=delay_before_launch_car))
+    logger.debug(build_log_tag(nbr_stable_frames_before_launch_car=nbr_stable_frames_before_launch_car))
+    logger.debug(build_log_tag(min_delay_before_launch_car=min_delay_before_launch_car))
+    logger.debug(build_log_tag(max_delay_reset_scene=max_delay_reset_scene))
+    logger.debug(build_log_tag(early_stopping=early_stopping))
+    logger.debug(build_log_tag(min_epochs=min_epochs))
+    logger.debug(build_log_tag(confidence=confidence))
+    logger.debug(build_log_tag(max_turns_ci_width=max_turns_ci_width))
+    logger.debug(build_log_tag(max_lap_time_ci_width=max_lap_time_ci_width))
+    logger.debug(build_log_tag(min_failure_probability=min_failure_probability))
     logger.debug(build_log_tag(poll_socket_sleep_sec=poll_socket_sleep_sec))
+    logger.debug(build_log_tag(loop_mode=loop_mode))
+    logger.debug(build_log_tag(selector_timeout_sec=selector_timeout_sec))
     logger.debug(build_log_tag(buffer_message_size_read=buffer_message_size_read))
     logger.debug(build_log_tag(deltatime_to_compute_fps=deltatime_to_compute_fps))
     logger.debug(build_log_tag(margin_before_car_leaving_road=margin_before_car_leaving_road))
@@ -103,11 +150,17 @@ def run(model_path,
     logger.debug(build_log_tag(deltatime_max_between_nodes=deltatime_max_between_nodes))
     logger.debug(build_log_tag(deltatime_max_after_driving_to_reach_first_node=deltatime_max_after_driving_to_reach_first_node))
     logger.debug(build_log_tag(buffer_requests_size=buffer_requests_size))
+    logger.debug(build_log_tag(max_frame_age=max_frame_age))
+    logger.debug(build_log_tag(inference_in_process=inference_in_process))
+    logger.debug(build_log_tag(pipelined_preprocessing=pipelined_preprocessing))
+    logger.debug(build_log_tag(nbr_warm_up=nbr_warm_up))
 
     event_handler = EventHandler()
 
     client = DonkeyCarClient(event_handler, host, int(port), 
                             poll_socket_sleep_sec=float(poll_socket_sleep_sec), 
+                            loop_mode=loop_mode,
+                            selector_timeout_sec=float(selector_timeout_sec),
                             buffer_message_size_read=int(buffer_message_size_read), 
                             deltatime_to_compute_fps=float(deltatime_to_compute_fps), 
                             margin_before_car_leaving_road=float(margin_before_car_leaving_road),
@@ -116,12 +169,23 @@ def run(model_path,
                             deltatime_max_between_nodes=float(deltatime_max_between_nodes),
                             deltatime_max_after_driving_to_reach_first_node=float(deltatime_max_after_driving_to_reach_first_node)
                             )
+    # The Brain is loaded and warmed up in the background while the simulator resets and loads the scene
+    brain_loader = ThreadPoolExecutor(max_workers=1)
+    brain_future = brain_loader.submit(load_brain, model_path, 
+                                                   str(inference_in_process).lower() in ("true", "1", "yes"), 
+                                                   int(nbr_warm_up), 
+                                                   client.wait_camera_shape)
+
+    # Counted before connecting, so the "scene_selection_ready" sent by a simulator already in the menu when the client connects is not missed
+    nbr_scene_selection_ready = event_handler.readiness.message_count("scene_selection_ready")
     client.connect()
-    logger.info(build_log_tag("RESET SCENE", "WAITING...", delay=10))
+    logger.info(build_log_tag("RESET SCENE", "WAITING...", max_delay=float(max_delay_reset_scene)))
     client.send_exit_scene_request()
-    # let some time for the simulator
-    time.sleep(10)
-    logger.info(build_log_tag("RESET SCENE", "DONE"))
+    # let some time for the simulator, until it is back to the scene selection
+    scene_selection_is_ready = event_handler.readiness.wait_for_message("scene_selection_ready", 
+                                                                        timeout=float(max_delay_reset_scene), 
+                                                                        seen_before=nbr_scene_selection_ready)
+    logger.info(build_log_tag("RESET SCENE", "DONE", scene_selection_is_ready=scene_selection_is_ready))
     client.send_load_scene_request(evaluation_scene)
 
     # Mode Manual
@@ -129,15 +193,32 @@ def run(model_path,
     ##controller = ManualController(client, hardware, event_handler)
 
     # Mode Auto
-    brain = DCModelWrapper.load(model_path)
-
-    controller = AutoController(client, brain, event_handler, buffer_requests_size=int(buffer_requests_size))
+    logger.info(build_log_tag("BRAIN", "WAITING..."))
+    brain = brain_future.result()
+    brain_loader.shutdown()
+
+    controller = AutoController(client, brain, event_handler, buffer_requests_size=int(buffer_requests_size),
+                                                              max_frame_age=float(max_frame_age) if float(max_frame_age) > 0 else None,
+                                                              pipelined_preprocessing=str(pipelined_preprocessing).lower() in ("true", "1", "yes"))
+
+    epochs_early_stopping = None
+    if str(early_stopping).lower() in ("true", "1", "yes"):
+        epochs_early_stopping = EarlyStopping(min_epochs=int(min_epochs), 
+                                              confidence=float(confidence), 
+                                              max_turns_ci_width=float(max_turns_ci_width), 
+                                              max_lap_time_ci_width=float(max_lap_time_ci_width), 
+                                              min_failure_probability=float(min_failure_probability))
 
     evaluator = Evaluator(event_handler, controller, nbr_turns_limit=int(nbr_turns_limit), 
                                                      nbr_epochs=int(nbr_epochs), 
                                                      max_time_to_wait=float(max_time_to_wait),
                                                      delay_between_check_interval=float(delay_between_check_interval), 
-                                                     delay_before_launch_car=float(delay_before_launch_car)
+                                                     delay_before_launch_car=float(delay_before_launch_car),
+                                                     nbr_stable_frames_before_launch_car=int(nbr_stable_frames_before_launch_car),
+                                                     min_delay_before_launch_car=float(min_delay_before_launch_car),
+                                                     early_stopping=epochs_early_stopping,
+                                                     results_store=ResultsStore(results_path, evaluation_name) if results_path != "" else None,
+                                                     model_id=model_path
                                                      )
 
 
@@ -0,0 +1,83 @@
+import begin
+import sys
+from loguru import logger
+
+from dcevaluator.evaluator.farm import EvaluationFarm
+from dcevaluator.evaluator.results import ResultsStore
+from dcevaluator.utils.utils import build_log_tag
+
+logger.remove()
+logger.add(sys.stdout, level="INFO")
+
+@begin.start
+def run(model_paths,
+        endpoints = "127.0.0.1:9091",
+        evaluation_name = "No Name",
+        evaluation_scene = "roboracingleague_1",
+        log_path = "last_farm.log",
+        results_path = "last_farm_results.csv",
+
+        nbr_turns_limit = "10",
+        nbr_epochs = "10",
+        delay_before_launch_car = "5",
+        nbr_stable_frames_before_launch_car = "10",
+        max_delay_reset_scene = "10",
+        max_session_time = "0",
+
+        buffer_requests_size = "4",
+        inference_in_process = "False",
+        nbr_warm_up = "5",
+        ):
+    """
+    Donkey Car Evaluation Farm
+
+    This program will evaluate the performance of one or several models by running their epochs in parallel
+    on several simulators, then display the merged results of all the epochs.
+
+    :param model_paths: Paths of the models to evaluate, separated by commas
+    :param endpoints: "host:port" of the simulators, separated by commas
+    :param evaluation_name: Name of the evaluation
+    :param evaluation_scene: scene to load before the evaluation
+    :log_path: the path of the generated log file
+    :param results_path: the path of the CSV file where the result of each epoch is appended (the laps are appended in the file with the suffix "_laps"). Empty to disable it.
+
+    :param nbr_turns_limit: limit number of turns from which the evaluation is stopped (to avoid that the car drives to infinity).
+    :param nbr_epochs: number of epochs of each model, split between the simulators.
+    :param delay_before_launch_car: maximum delay time after a scene reset before launching the car.
+    :param nbr_stable_frames_before_launch_car: the car is launched as soon as it is stable during this number of telemetry frames. 0 to always wait `delay_before_launch_car`.
+    :param max_delay_reset_scene: maximum delay time to wait for the simulator to exit the scene (until the scene selection is ready)
+    :param max_session_time: maximum duration (in seconds) of the epochs of a model on a simulator. 0 for no limit.
+
+    :param buffer_requests_size: Size of buffer of requests
+    :param inference_in_process: "True" to load and run each Brain in a separate process (the Brain must read the decoded image with `request.image`)
+    :param nbr_warm_up: number of dummy inferences at the camera resolution run after loading a model. 0 to disable the warm up.
+    """
+
+    logger.add(log_path, level="DEBUG")
+
+    model_paths = [model_path.strip() for model_path in model_paths.split(",") if model_path.strip() != ""]
+    endpoints = [endpoint.strip() for endpoint in endpoints.split(",") if endpoint.strip() != ""]
+
+    logger.info(build_log_tag("Donkey Car Evaluation Farm", "BEGIN"))
+    logger.info(build_log_tag(model_paths=model_paths))
+    logger.info(build_log_tag(endpoints=endpoints))
+    logger.info(build_log_tag(evaluation_name=evaluation_name))
+    logger.info(build_log_tag(evaluation_scene=evaluation_scene))
+    logger.info(build_log_tag(nbr_turns_limit=nbr_turns_limit))
+    logger.info(build_log_tag(nbr_epochs=nbr_epochs))
+    logger.info(build_log_tag(log_path=log_path))
+    logger.info(build_log_tag(results_path=results_path))
+
+    farm = EvaluationFarm(endpoints, model_paths, nbr_epochs=int(nbr_epochs),
+                          evaluation_scene=evaluation_scene,
+                          max_delay_reset_scene=float(max_delay_reset_scene),
+                          inference_in_process=str(inference_in_process).lower() in ("true", "1", "yes"),
+                          nbr_warm_up=int(nbr_warm_up),
+                          max_session_time=float(max_session_time) if float(max_session_time) > 0 else None,
+                          controller_kwargs={ "buffer_requests_size": int(buffer_requests_size) },
+                          evaluator_kwargs={ "nbr_turns_limit": int(nbr_turns_limit),
+                                             "delay_before_launch_car": float(delay_before_launch_car),
+                                             "nbr_stable_frames_before_launch_car": int(nbr_stable_frames_before_launch_car),
+                                             "results_store": ResultsStore(results_path, evaluation_name) if results_path != "" else None })
+    farm.run()
+    logger.info(build_log_tag("Donkey Car Evaluation Farm", "END"))
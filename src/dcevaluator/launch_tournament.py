@@ -0,0 +1,113 @@
+import begin
+import sys
+from loguru import logger
+
+from dcevaluator.communication.dc_client import DonkeyCarClient
+from dcevaluator.event.event_handler import EventHandler
+from dcevaluator.controller.auto_controller import AutoController
+from dcevaluator.evaluator.tournament import TournamentEvaluator, BrainCache
+from dcevaluator.evaluator.results import ResultsStore
+from dcevaluator.utils.utils import build_log_tag
+
+logger.remove()
+logger.add(sys.stdout, level="INFO")
+
+@begin.start
+def run(model_paths,
+        evaluation_name = "No Name",
+        host = "127.0.0.1",
+        port = "9091",
+        evaluation_scene = "roboracingleague_1",
+        log_path = "last_tournament.log",
+        results_path = "last_tournament_results.csv",
+
+        nbr_turns_limit = "10",
+        nbr_epochs = "10",
+        max_time_to_wait = "10",
+        delay_before_launch_car = "5",
+        nbr_stable_frames_before_launch_car = "10",
+        max_delay_reset_scene = "10",
+
+        buffer_requests_size = "4",
+        inference_in_process = "False",
+        nbr_warm_up = "5",
+        memory_budget_mb = "4096",
+        ):
+    """
+    Donkey Car Tournament
+
+    This program will evaluate several models one after another with the same connection and the same loaded scene,
+    then display a ranked comparison of the models.
+    The next model is loaded in the background while the current one drives.
+
+    :param model_paths: Paths of the models to evaluate, separated by commas
+    :param evaluation_name: Name of the evaluation
+    :param host: host to connect to a server like ip address with string
+    :param port: port to connect to a server with int
+    :param evaluation_scene: scene to load before the evaluation
+    :log_path: the path of the generated log file
+    :param results_path: the path of the CSV file where the result of each epoch is appended (the laps are appended in the file with the suffix "_laps"). Empty to disable it.
+
+    :param nbr_turns_limit: limit number of turns from which the evaluation is stopped (to avoid that the car drives to infinity).
+    :param nbr_epochs: number of epochs of each model.
+    :param max_time_to_wait: waiting time for a controller ready to drive the car.
+    :param delay_before_launch_car: maximum delay time after a car reset before launching the car.
+    :param nbr_stable_frames_before_launch_car: the car is launched as soon as it is stable during this number of telemetry frames. 0 to always wait `delay_before_launch_car`.
+    :param max_delay_reset_scene: maximum delay time to wait for the simulator to exit the scene (until the scene selection is ready)
+
+    :param buffer_requests_size: Size of buffer of requests
+    :param inference_in_process: "True" to load and run the Brains in separate processes (the Brain must read the decoded image with `request.image`)
+    :param nbr_warm_up: number of dummy inferences at the camera resolution run after loading a model. 0 to disable the warm up.
+    :param memory_budget_mb: maximum total size (in MB, estimated with the size of the models on the disk) of the models kept in memory
+    """
+
+    logger.add(log_path, level="DEBUG")
+
+    model_paths = [model_path.strip() for model_path in model_paths.split(",") if model_path.strip() != ""]
+
+    logger.info(build_log_tag("Donkey Car Tournament", "BEGIN"))
+    logger.info(build_log_tag(model_paths=model_paths))
+    logger.info(build_log_tag(evaluation_name=evaluation_name))
+    logger.info(build_log_tag(host=host))
+    logger.info(build_log_tag(port=port))
+    logger.info(build_log_tag(evaluation_scene=evaluation_scene))
+    logger.info(build_log_tag(nbr_turns_limit=nbr_turns_limit))
+    logger.info(build_log_tag(nbr_epochs=nbr_epochs))
+    logger.info(build_log_tag(log_path=log_path))
+    logger.info(build_log_tag(results_path=results_path))
+    logger.debug(build_log_tag(memory_budget_mb=memory_budget_mb))
+
+    event_handler = EventHandler()
+    client = DonkeyCarClient(event_handler, host, int(port))
+
+    # The first Brains are loaded in the background while the simulator resets and loads the scene
+    brain_cache = BrainCache(float(memory_budget_mb) * 1024 * 1024,
+                             inference_in_process=str(inference_in_process).lower() in ("true", "1", "yes"),
+                             nbr_warm_up=int(nbr_warm_up),
+                             image_shape=client.wait_camera_shape)
+    brain_cache.preload(model_paths[0])
+
+    # Counted before connecting, so the "scene_selection_ready" sent by a simulator already in the menu when the client connects is not missed
+    nbr_scene_selection_ready = event_handler.readiness.message_count("scene_selection_ready")
+    client.connect()
+    logger.info(build_log_tag("RESET SCENE", "WAITING...", max_delay=float(max_delay_reset_scene)))
+    client.send_exit_scene_request()
+    scene_selection_is_ready = event_handler.readiness.wait_for_message("scene_selection_ready",
+                                                                        timeout=float(max_delay_reset_scene),
+                                                                        seen_before=nbr_scene_selection_ready)
+    logger.info(build_log_tag("RESET SCENE", "DONE", scene_selection_is_ready=scene_selection_is_ready))
+    client.send_load_scene_request(evaluation_scene)
+
+    brain = brain_cache.get(model_paths[0])
+    controller = AutoController(client, brain, event_handler, buffer_requests_size=int(buffer_requests_size))
+
+    evaluator = TournamentEvaluator(event_handler, controller, model_paths, brain_cache,
+                                    nbr_turns_limit=int(nbr_turns_limit),
+                                    nbr_epochs=int(nbr_epochs),
+                                    max_time_to_wait=float(max_time_to_wait),
+                                    delay_before_launch_car=float(delay_before_launch_car),
+                                    nbr_stable_frames_before_launch_car=int(nbr_stable_frames_before_launch_car),
+                                    results_store=ResultsStore(results_path, evaluation_name) if results_path != "" else None)
+    evaluator.finished.wait()
+    brain_cache.close()
+    logger.info(build_log_tag("Donkey Car Tournament", "END"))
@@ -0,0 +1,164 @@
+from threading import Lock
+import numpy as np
+
+class LatencyRecorder:
+    # Stages between the reception of a telemetry and the sending of the matching control
+    STAGES = ("receive_to_pop", "pop_to_predict", "predict_to_send", "receive_to_send")
+    # Upper bounds (in milliseconds) of the buckets of the histograms. The last bucket has no upper bound.
+    HISTOGRAM_BINS_MS = (0, 5, 10, 20, 35, 50, 75, 100, 150, 250, np.inf)
+
+    def __init__(self):
+        """
+        Latency Recorder
+
+        Aggregate the timestamps carried by each telemetry (monotonic clock `time.perf_counter`) :
+        reception by the socket, pop by the controller, prediction by the Brain and sending of the control.
+        """
+        self.lock = Lock()
+        self.reset()
+
+    def record(self, telemetry, sent_at):
+        """
+        Record the latencies of a telemetry whose control has just been sent
+
+        :param telemetry: Telemetry instance with `received_at`, `popped_at` and `predicted_at` timestamps
+        :param sent_at: time when the control was sent
+        """
+        if telemetry.received_at is None or telemetry.popped_at is None or telemetry.predicted_at is None:
+            return
+        with self.lock:
+            self.latencies["receive_to_pop"].append(telemetry.popped_at - telemetry.received_at)
+            self.latencies["pop_to_predict"].append(telemetry.predicted_at - telemetry.popped_at)
+            self.latencies["predict_to_send"].append(sent_at - telemetry.predicted_at)
+            self.latencies["receive_to_send"].append(sent_at - telemetry.received_at)
+
+    def reset(self):
+        """
+        Forget all the recorded latencies (e.g. at the beginning of an epoch)
+        """
+        with self.lock:
+            self.latencies = { stage: [] for stage in self.STAGES }
+
+    def histogram(self, stage):
+        """
+        Histogram of the latencies of a stage
+
+        :param stage: one of `STAGES`
+        :return: (counts, bins) with the bins in milliseconds
+        """
+        with self.lock:
+            latencies_ms = np.array(self.latencies[stage]) * 1000.0
+        counts, bins = np.histogram(latencies_ms, bins=self.HISTOGRAM_BINS_MS)
+        return counts, bins
+
+    def summary(self):
+        """
+        Statistics of the latencies of each stage in milliseconds
+
+        :return: dict { stage: { count, mean, p50, p95, p99, max, histogram } }
+        """
+        summary = dict()
+        for stage in self.STAGES:
+            with self.lock:
+                latencies_ms = np.array(self.latencies[stage]) * 1000.0
+            if len(latencies_ms) == 0:
+                summary[stage] = { "count": 0 }
+                continue
+            p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+            counts, _ = np.histogram(latencies_ms, bins=self.HISTOGRAM_BINS_MS)
+            summary[stage] = {
+                "count": len(latencies_ms),
+                "mean": float(latencies_ms.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(latencies_ms.max()),
+                "histogram": counts.tolist(),
+            }
+        return summary
+
+class FrameCounter:
+    def __init__(self):
+        """
+        Frame Counter
+
+        Count the telemetry frames received, dropped by the controller (evicted from its buffer or replaced by a newer frame),
+        predicted and skipped because they were too old, and record the age of the frames at prediction time.
+        Each received frame ends up in one of the other counters, so the frames not counted yet are the unconsumed ones
+        (waiting in the buffer or being prepared when the summary is taken).
+        """
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Reset all the counters (e.g. at the beginning of an epoch)
+        """
+        with self.lock:
+            self.nbr_received = 0
+            self.nbr_dropped = 0
+            self.nbr_predicted = 0
+            self.nbr_stale = 0
+            self.ages = []
+
+    def count_received(self, dropped):
+        """
+        Count a frame received by the controller
+
+        :param dropped: True if the frame has evicted an older frame from the buffer
+        """
+        with self.lock:
+            self.nbr_received += 1
+            if dropped:
+                self.nbr_dropped += 1
+
+    def count_dropped(self, nbr_frames = 1):
+        """
+        Count frames discarded without being predicted (e.g. replaced by a newer frame)
+
+        :param nbr_frames: number of discarded frames
+        """
+        with self.lock:
+            self.nbr_dropped += nbr_frames
+
+    def count_predicted(self, age):
+        """
+        Count a frame given to the Brain
+
+        :param age: age of the frame (in seconds) when it was popped from the buffer
+        """
+        with self.lock:
+            self.nbr_predicted += 1
+            self.ages.append(age)
+
+    def count_stale(self):
+        """
+        Count a frame skipped because it was too old
+        """
+        with self.lock:
+            self.nbr_stale += 1
+
+    def summary(self):
+        """
+        Counters and statistics of the age of the predicted frames in milliseconds
+
+        "received" is the sum of "predicted", "dropped", "stale" and "unconsumed".
+
+        :return: dict
+        """
+        with self.lock:
+            summary = {
+                "received": self.nbr_received,
+                "dropped": self.nbr_dropped,
+                "predicted": self.nbr_predicted,
+                "stale": self.nbr_stale,
+                "unconsumed": self.nbr_received - self.nbr_dropped - self.nbr_predicted - self.nbr_stale,
+            }
+            ages_ms = np.array(self.ages) * 1000.0
+        if len(ages_ms) > 0:
+            p50, p95 = np.percentile(ages_ms, [50, 95])
+            summary["age_mean"] = float(ages_ms.mean())
+            summary["age_p50"] = float(p50)
+            summary["age_p95"] = float(p95)
+            summary["age_max"] = float(ages_ms.max())
+        return summary
@@ -49,4 +49,34 @@ def replace_float_notation(string):
             for match in matches:
                 num = match.group('num').replace(',', '.')
                 string = string.replace(match.group('num'), num)
-        return string
\ No newline at end of file
+        return string
+
+# Float written with a comma as decimal separator, e.g. `"key":1,5` or `"key":-1,5E-05` followed by `,` or `}`
+FLOAT_COMMA_NOTATION_PATTERN = r'("[a-zA-Z_]+":-?[0-9]+),([0-9]+(?:E[-+]?[0-9]+)?)(?=[,}])'
+FLOAT_COMMA_NOTATION_REGEX = re.compile(FLOAT_COMMA_NOTATION_PATTERN)
+FLOAT_COMMA_NOTATION_BYTES_REGEX = re.compile(FLOAT_COMMA_NOTATION_PATTERN.encode("ascii"))
+
+def has_float_comma_notation(message):
+    """
+    Check if a JSON message contains floats written with a comma as decimal separator
+
+    :param message: (str or bytes) the JSON message
+    :return: True if at least one float uses the comma notation
+    """
+    regex = FLOAT_COMMA_NOTATION_BYTES_REGEX if isinstance(message, (bytes, bytearray)) else FLOAT_COMMA_NOTATION_REGEX
+    return regex.search(message) is not None
+
+def fix_float_notation(message):
+    """
+    Replace unity float notation for languages like
+    French or German that use comma instead of dot.
+    Same as `replace_float_notation` but in a single pass over the message,
+    and only the number matched is replaced (not all its occurrences in the message).
+    Ex: "test":1,2,"key":2 -> "test":1.2,"key":2
+
+    :param message: (str or bytes) The incorrect json message
+    :return: (str or bytes) Valid JSON message
+    """
+    if isinstance(message, (bytes, bytearray)):
+        return FLOAT_COMMA_NOTATION_BYTES_REGEX.sub(rb"\1.\2", message)
+    return FLOAT_COMMA_NOTATION_REGEX.sub(r"\1.\2", message)
@@ -8,3 +8,13 @@
 """
 
 # import pytest
+
+# Helpers shared by the tests of the log parser, imported with `from conftest import ...`
+
+def log_line(second, message, level = "INFO"):
+    return "2026-01-01 10:00:{:06.3f} | {:<8} | dcevaluator.evaluator:run:42 - {}\n".format(second, level, message)
+
+def write_log(path, lines, mode = "w"):
+    with open(path, mode) as f:
+        f.writelines(lines)
+    return str(path)
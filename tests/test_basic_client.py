@@ -0,0 +1,100 @@
+import socket
+import threading
+import pytest
+from dcevaluator.communication.basic_client import BasicClient
+from dcevaluator.communication.dc_client import DonkeyCarClient
+from dcevaluator.event.event_handler import EventHandler
+
+@pytest.fixture
+def server():
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.bind(("127.0.0.1", 0))
+    server_socket.listen(1)
+    yield server_socket
+    server_socket.close()
+
+def client_sockets(client):
+    return [client.socket, client.wakeup_reader, client.wakeup_writer]
+
+@pytest.mark.parametrize("loop_mode", ["selector", "poll"])
+def test_sockets_are_closed_when_the_loop_exits(server, loop_mode):
+    client = BasicClient(port=server.getsockname()[1], loop_mode=loop_mode, selector_timeout_sec=0.05, poll_socket_sleep_sec=0.001)
+    client.connect()
+    connection, _ = server.accept()
+    client.connected = False
+    client.wake_up()
+    client.loop_thread.join(timeout=5)
+    assert not client.loop_thread.is_alive()
+    assert all(opened_socket.fileno() == -1 for opened_socket in client_sockets(client))
+    # Waking up a stopped client is harmless
+    client.wake_up()
+    connection.close()
+
+def test_sockets_are_closed_when_the_connection_is_refused(server):
+    port = server.getsockname()[1]
+    server.close()
+    client = BasicClient(port=port)
+    with pytest.raises(RuntimeError):
+        client.connect()
+    assert all(opened_socket.fileno() == -1 for opened_socket in client_sockets(client))
+
+def test_stop_closes_the_sockets_without_loop():
+    client = DonkeyCarClient(EventHandler(), port=9091)
+    client.stop()
+    assert all(opened_socket.fileno() == -1 for opened_socket in client_sockets(client))
+
+def test_latest_control_message_wins():
+    client = BasicClient()
+    client.send_control_message('{"msg_type": "control", "steering": "0.1"}', frame=1)
+    client.send_control_message(b'{"msg_type": "control", "steering": "0.2"}', frame=2)
+    assert client.nbr_control_messages_overwritten == 1
+    assert client.pop_writable_payload() == (b'{"msg_type": "control", "steering": "0.2"}', 2)
+    assert client.pop_writable_payload() == (None, None)
+    assert not client.has_message_to_write()
+    client.close_sockets()
+
+def test_queued_messages_are_sent_in_order_before_the_control():
+    client = BasicClient()
+    client.send_control_message(b"control 1", frame=1)
+    client.send_message("config")
+    client.send_message(b"scene")
+    client.send_control_message(b"control 2", frame=2)
+    assert client.pop_writable_payload() == (b"config\nscene\ncontrol 2", 2)
+    client.send_message(b"exit")
+    assert client.pop_writable_payload() == (b"exit", None)
+    client.close_sockets()
+
+def test_reset_buffer_drops_the_messages_to_send():
+    client = BasicClient()
+    client.send_message(b"config")
+    client.send_control_message(b"control", frame=1)
+    client.reset_buffer()
+    assert client.pop_writable_payload() == (None, None)
+    client.close_sockets()
+
+def test_selector_loop_sends_the_messages(server):
+    sent_frames = []
+    control_sent = threading.Event()
+    client = BasicClient(port=server.getsockname()[1], selector_timeout_sec=0.05)
+    client.on_control_sent = lambda frame, sent_at: (sent_frames.append(frame), control_sent.set())
+    # Queued before the loop starts, so they are sent together
+    client.send_message(b"config")
+    client.send_control_message(b"control 1", frame=6)
+    client.send_control_message(b"control 2", frame=7)
+    client.connect()
+    connection, _ = server.accept()
+    connection.settimeout(5)
+    try:
+        received = b""
+        while not received.endswith(b"control 2"):
+            data = connection.recv(1024)
+            assert len(data) > 0
+            received += data
+        assert received == b"config\ncontrol 2"
+        assert control_sent.wait(5)
+        assert sent_frames == [7]
+    finally:
+        client.connected = False
+        client.wake_up()
+        client.loop_thread.join(timeout=5)
+        connection.close()
@@ -0,0 +1,68 @@
+import pytest
+from dcevaluator.evaluator import tournament
+from dcevaluator.evaluator.tournament import BrainCache
+
+class FakeBrain:
+    def __init__(self, model_path, closed):
+        self.model_path = model_path
+        self.closed = closed
+
+    def close(self):
+        self.closed.append(self.model_path)
+
+@pytest.fixture
+def closed(monkeypatch):
+    closed = []
+    # The Brains are not loaded with TensorFlow
+    monkeypatch.setattr(tournament, "load_brain", lambda model_path, **kwargs: FakeBrain(model_path, closed))
+    return closed
+
+def model(tmp_path, name, size = 40):
+    path = tmp_path / name
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+def test_least_recently_used_brain_is_evicted(tmp_path, closed):
+    a, b, c = model(tmp_path, "a"), model(tmp_path, "b"), model(tmp_path, "c")
+    brain_cache = BrainCache(memory_budget=100)
+    assert brain_cache.preload(a)
+    assert brain_cache.preload(b)
+    assert brain_cache.get(a).model_path == a
+    # "b" is the least recently used
+    assert brain_cache.preload(c)
+    assert closed == [b]
+    assert list(brain_cache.entries) == [a, c]
+    assert brain_cache.loaded_size() == 80
+    brain_cache.close()
+    assert sorted(closed) == sorted([a, b, c])
+
+def test_kept_brains_are_not_evicted(tmp_path, closed):
+    a, b, c = model(tmp_path, "a"), model(tmp_path, "b"), model(tmp_path, "c")
+    brain_cache = BrainCache(memory_budget=100)
+    brain_cache.preload(a)
+    brain_cache.preload(b)
+    # No room for "c" without evicting a Brain to keep
+    assert not brain_cache.preload(c, keep=(a, b))
+    assert closed == []
+    assert list(brain_cache.entries) == [a, b]
+
+    assert brain_cache.preload(c, keep=(a,))
+    assert closed == [b]
+    brain_cache.close()
+
+def test_get_loads_a_brain_over_the_budget(tmp_path, closed):
+    a, big = model(tmp_path, "a"), model(tmp_path, "big", size=150)
+    brain_cache = BrainCache(memory_budget=100)
+    brain_cache.preload(a)
+    assert not brain_cache.preload(big, keep=(a,))
+    assert brain_cache.get(big, keep=(a,)).model_path == big
+    assert brain_cache.loaded_size() == 190
+    assert closed == []
+    brain_cache.close()
+
+def test_model_size_of_a_directory(tmp_path):
+    directory = tmp_path / "model"
+    (directory / "variables").mkdir(parents=True)
+    (directory / "saved_model.pb").write_bytes(b"\0" * 10)
+    (directory / "variables" / "variables.data").write_bytes(b"\0" * 32)
+    assert tournament.model_size(str(directory)) == 42
@@ -0,0 +1,53 @@
+import json
+import pytest
+from dcevaluator.communication import decoder as decoder_module
+from dcevaluator.communication.decoder import RequestDecoder
+from dcevaluator.utils.utils import has_float_comma_notation, fix_float_notation, replace_float_notation
+
+TELEMETRY = b'{"msg_type":"telemetry","steering_angle":-0,25,"throttle":0,5,"speed":1,5E-05,"hit":"none","activeNode":3,"cte":-1,25}'
+EXPECTED = { "msg_type": "telemetry", "steering_angle": -0.25, "throttle": 0.5, "speed": 1.5e-05, "hit": "none", "activeNode": 3, "cte": -1.25 }
+
+def test_comma_notation_is_detected():
+    assert has_float_comma_notation(TELEMETRY)
+    assert has_float_comma_notation(TELEMETRY.decode("utf-8"))
+    assert not has_float_comma_notation(b'{"msg_type":"telemetry","throttle":0.5,"activeNode":3,"totalNodes":250}')
+
+def test_comma_notation_is_fixed():
+    assert json.loads(fix_float_notation(TELEMETRY)) == EXPECTED
+    assert json.loads(fix_float_notation(TELEMETRY.decode("utf-8"))) == EXPECTED
+
+def test_integers_and_strings_are_unchanged():
+    message = b'{"activeNode":3,"totalNodes":250,"name":"a,b","hit":"none"}'
+    assert fix_float_notation(message) == message
+
+def test_same_result_as_the_legacy_replacement():
+    message = '{"steering_angle":0,25,"throttle":0,5,"cte":1,75}'
+    assert json.loads(fix_float_notation(message)) == json.loads(replace_float_notation(message))
+
+def test_only_the_matched_number_is_replaced():
+    # The legacy replacement replaced every occurrence of "1,5" in the message
+    message = '{"cte":1,5,"name":"1,5"}'
+    assert json.loads(fix_float_notation(message)) == { "cte": 1.5, "name": "1,5" }
+
+@pytest.mark.parametrize("check_float_notation", [True, False])
+def test_standard_json_decoder(check_float_notation):
+    request_decoder = RequestDecoder(check_float_notation=check_float_notation, use_fast_json=False)
+    message = b'{"msg_type":"telemetry","throttle":0.5,"activeNode":3}'
+    assert request_decoder.decode(message) == json.loads(message)
+
+def test_comma_notation_is_decoded():
+    assert RequestDecoder(use_fast_json=False).decode(TELEMETRY) == EXPECTED
+
+@pytest.mark.skipif(decoder_module.orjson is None, reason="orjson is not installed")
+def test_orjson_and_json_give_the_same_requests():
+    fast_decoder = RequestDecoder(use_fast_json=True)
+    standard_decoder = RequestDecoder(use_fast_json=False)
+    assert fast_decoder.use_fast_json
+    messages = [
+        TELEMETRY,
+        b'{"msg_type":"telemetry","throttle":0.5,"speed":1e-05,"activeNode":3,"hit":"none","image":"iVBORw0KGgo="}',
+        b'{"msg_type":"scene_names","scene_names":["generated_road","roboracingleague_1"]}',
+        '{"msg_type":"car_loaded","name":"voiture é"}'.encode("utf-8"),
+    ]
+    for message in messages:
+        assert fast_decoder.decode(message) == standard_decoder.decode(message)
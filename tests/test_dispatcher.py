@@ -0,0 +1,89 @@
+import threading
+from dcevaluator.event.dispatcher import EventDispatcher
+
+def test_events_are_processed_in_order_in_a_worker_thread():
+    dispatcher = EventDispatcher()
+    events = []
+    threads = set()
+    done = threading.Event()
+    def handler(value, last = False):
+        events.append(value)
+        threads.add(threading.current_thread())
+        if last:
+            done.set()
+    submit = dispatcher.wrap(handler)
+    for value in range(100):
+        submit(value)
+    submit(100, last=True)
+    assert done.wait(5)
+    assert events == list(range(101))
+    assert len(threads) == 1 and threading.current_thread() not in threads
+    stats = dispatcher.stats()[0]
+    assert stats["handler"] == handler.__qualname__
+    assert stats["dispatched"] == 101
+    assert stats["dropped"] == 0
+    dispatcher.stop()
+
+def test_events_are_dropped_when_the_queue_is_full():
+    dispatcher = EventDispatcher(max_queue_size=2)
+    blocked = threading.Event()
+    release = threading.Event()
+    def handler(value):
+        blocked.set()
+        release.wait(5)
+    submit = dispatcher.wrap(handler, name="slow")
+    submit(0)
+    assert blocked.wait(5)
+    # The worker is blocked on the first event: 2 events are queued, the others are dropped
+    for value in range(1, 6):
+        submit(value)
+    stats = dispatcher.stats()[0]
+    assert stats["dropped"] == 3
+    assert stats["max_queue_depth"] == 2
+    release.set()
+    dispatcher.stop()
+
+def test_an_error_in_a_handler_does_not_stop_the_worker():
+    dispatcher = EventDispatcher()
+    events = []
+    done = threading.Event()
+    def handler(value):
+        if value == 0:
+            raise ValueError("error in the handler")
+        events.append(value)
+        done.set()
+    submit = dispatcher.wrap(handler)
+    submit(0)
+    submit(1)
+    assert done.wait(5)
+    assert events == [1]
+    dispatcher.stop()
+
+def test_stop_processes_the_queued_events():
+    dispatcher = EventDispatcher()
+    events = []
+    release = threading.Event()
+    def handler(value):
+        release.wait(5)
+        events.append(value)
+    submit = dispatcher.wrap(handler)
+    submit(0)
+    submit(1)
+    dispatcher.stop()
+    # The events submitted after the stop are ignored
+    submit(2)
+    release.set()
+    worker = dispatcher.workers[0]
+    worker.worker_thread.join(5)
+    assert not worker.worker_thread.is_alive()
+    assert events == [0, 1]
+
+def test_reset_stats():
+    dispatcher = EventDispatcher()
+    done = threading.Event()
+    submit = dispatcher.wrap(lambda: done.set(), name="handler")
+    submit()
+    assert done.wait(5)
+    dispatcher.log_stats(epoch=1)
+    assert dispatcher.stats()[0]["dispatched"] == 0
+    dispatcher.stop()
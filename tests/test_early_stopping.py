@@ -0,0 +1,81 @@
+import pytest
+from dcevaluator.evaluator.early_stopping import EarlyStopping, confidence_interval, wilson_interval
+
+def epoch(end_reason = "turns_limit", turn = 10, mean_lap_time = 20.0):
+    return { "end_reason": end_reason, "turn": turn, "mean_lap_time": mean_lap_time }
+
+def test_confidence_interval():
+    assert confidence_interval([5.0], 0.95) is None
+    mean, half_width = confidence_interval([1.0, 2.0, 3.0], 0.95)
+    assert mean == pytest.approx(2.0)
+    # Student t quantile with 2 degrees of freedom
+    assert half_width == pytest.approx(4.302653 / 3 ** 0.5, rel=1e-5)
+    # Close to the normal quantile with many values
+    _, half_width = confidence_interval([1.0, 2.0, 3.0] * 100, 0.95)
+    assert half_width == pytest.approx(1.959964 * (200 / 299) ** 0.5 / 300 ** 0.5, rel=1e-2)
+    assert confidence_interval([4.0, 4.0, 4.0], 0.9) == (4.0, 0.0)
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0, 0.95) == (0.0, 1.0)
+    lower, upper = wilson_interval(5, 10, 0.95)
+    assert lower == pytest.approx(0.2366, abs=1e-4)
+    assert upper == pytest.approx(0.7634, abs=1e-4)
+    lower, upper = wilson_interval(0, 10, 0.95)
+    assert lower == pytest.approx(0.0, abs=1e-12)
+    assert upper == pytest.approx(0.2775, abs=1e-4)
+    lower, upper = wilson_interval(10, 10, 0.95)
+    assert lower == pytest.approx(0.7225, abs=1e-4)
+    assert upper == pytest.approx(1.0)
+
+def test_wilson_interval_narrows_with_the_trials():
+    lower_10, upper_10 = wilson_interval(5, 10, 0.9)
+    lower_100, upper_100 = wilson_interval(50, 100, 0.9)
+    assert upper_100 - lower_100 < upper_10 - lower_10
+
+def test_no_stop_before_min_epochs():
+    early_stopping = EarlyStopping(min_epochs=3)
+    reason, statistics = early_stopping.check([epoch("car_leaving_road")] * 2)
+    assert reason is None
+    assert statistics["nbr_failures"] == 2
+
+def test_stop_when_the_model_fails():
+    early_stopping = EarlyStopping(min_epochs=3, confidence=0.9, min_failure_probability=0.5)
+    reason, statistics = early_stopping.check([epoch("car_leaving_road", turn=0, mean_lap_time=None)] * 5)
+    assert reason == "failure_probability"
+    assert statistics["failure_lower_bound"] >= 0.5
+
+def test_stop_when_the_results_are_stable():
+    early_stopping = EarlyStopping(min_epochs=3, max_turns_ci_width=1.0, max_lap_time_ci_width=0.05)
+    results = [epoch(turn=10, mean_lap_time=20.0), epoch(turn=10, mean_lap_time=20.1), epoch(turn=10, mean_lap_time=19.9), epoch(turn=10, mean_lap_time=20.0)]
+    reason, statistics = early_stopping.check(results)
+    assert reason == "confidence_interval"
+    assert statistics["turns_ci_width"] == 0.0
+    assert statistics["lap_time_ci_width"] <= 0.05
+
+def test_continue_when_the_results_vary():
+    early_stopping = EarlyStopping(min_epochs=3, max_turns_ci_width=1.0)
+    results = [epoch(turn=2), epoch(turn=10), epoch(turn=6)]
+    reason, statistics = early_stopping.check(results)
+    assert reason is None
+    assert statistics["turns_ci_width"] > 1.0
+
+def test_continue_when_the_interval_is_wide_with_few_epochs():
+    early_stopping = EarlyStopping(min_epochs=3, max_turns_ci_width=1.0, max_lap_time_ci_width=0.05, min_zero_variance_epochs=3)
+    reason, statistics = early_stopping.check([epoch(turn=10, mean_lap_time=lap_time) for lap_time in (20.0, 20.5, 21.0)])
+    # The normal quantile would give a width of 0.046
+    assert statistics["lap_time_ci_width"] > 0.05
+    assert reason is None
+
+def test_continue_with_a_few_identical_epochs():
+    early_stopping = EarlyStopping(min_epochs=2, min_failure_probability=0.99, min_zero_variance_epochs=4)
+    results = [epoch("timeout", turn=0, mean_lap_time=None)] * 3
+    reason, statistics = early_stopping.check(results)
+    assert reason is None
+    assert statistics["turns_ci_width"] == 0.0
+
+def test_stop_without_laps_when_the_turns_are_known():
+    early_stopping = EarlyStopping(min_epochs=3, min_failure_probability=0.99, min_zero_variance_epochs=4)
+    results = [epoch("timeout", turn=0, mean_lap_time=None)] * 4
+    reason, statistics = early_stopping.check(results)
+    assert reason == "confidence_interval"
+    assert statistics["lap_time_ci_width"] is None
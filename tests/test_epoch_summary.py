@@ -0,0 +1,50 @@
+import os
+import pytest
+from dcevaluator.analyze.log_parser import LogParser
+from dcevaluator.utils.utils import build_log_tag
+from conftest import log_line, write_log
+
+LINES = [
+    log_line(1.0, build_log_tag("EVALUATION", "BEGIN", epoch=1)),
+    log_line(1.5, build_log_tag(turn=0, active_node=3, last_node=2, distance_center=-0.5)),
+    log_line(2.0, build_log_tag("NEW TURN", turn=1, deltatime=12.5)),
+    log_line(2.5, build_log_tag("NEW TURN", turn=2, deltatime=24.5)),
+    log_line(2.7, build_log_tag(turn=2, active_node=8, last_node=7, distance_center=1.75)),
+    log_line(3.0, build_log_tag("ILLEGAL MOVE", message="Car is leaving the road", active_node=8, distance_center=2.5)),
+    log_line(3.5, build_log_tag("EVALUATION", "END", epoch=1)),
+    log_line(4.0, build_log_tag("EVALUATION", "BEGIN", epoch=2)),
+]
+
+@pytest.mark.parametrize("keep_raw", [True, False])
+def test_summaries_of_the_parsed_lines(tmp_path, keep_raw):
+    log_path = write_log(tmp_path / "evaluation.log", LINES)
+    log_parser = LogParser(log_path, keep_raw=keep_raw)
+    log_parser.update()
+    summaries = log_parser.epoch_summaries.frame()
+    assert summaries["epoch"].tolist() == [1, 2]
+    first = summaries.iloc[0]
+    assert first["end_reason"] == "car_leaving_road"
+    assert first["turn"] == 2
+    assert first["lap_times"] == [12.5, 12.0]
+    assert first["best_lap_time"] == 12.0
+    assert first["max_abs_distance_center"] == 1.75
+    assert first["nbr_illegal_moves"] == 1
+    assert summaries["end_reason"].isna().tolist() == [False, True]
+
+def test_summaries_follow_the_appended_lines_and_the_rotation(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", LINES[:3])
+    log_parser = LogParser(log_path)
+    events = []
+    log_parser.update(on_epoch=lambda summary: events.append(summary["turn"]))
+    write_log(log_path, LINES[3:6], mode="a")
+    log_parser.update(on_epoch=lambda summary: events.append(summary["turn"]))
+    assert events == [2, 2]
+    assert log_parser.epoch_summaries.summaries[0]["end_reason"] == "car_leaving_road"
+
+    # The log is replaced by a new one (rotation)
+    os.remove(log_path)
+    write_log(log_path, LINES[:1])
+    new_data = log_parser.update()
+    assert len(new_data) == 1
+    assert len(log_parser.data) == 1
+    assert [summary["turn"] for summary in log_parser.epoch_summaries.summaries] == [0]
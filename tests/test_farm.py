@@ -0,0 +1,63 @@
+from loguru import logger
+from dcevaluator.analyze.log_parser import parse_line
+from dcevaluator.evaluator.farm import EvaluationFarm, parse_endpoint, shard_epochs
+
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}"
+
+def session_result(model_path = "models/a", shard = 0, epoch = 1, lap_times = (12.5, 13.0)):
+    return {
+        "model_id": model_path,
+        "model_path": model_path,
+        "session_id": "127.0.0.1:9091/" + str(shard),
+        "shard": shard,
+        "epoch": epoch,
+        "end_reason": "turns_limit",
+        "turn": len(lap_times),
+        "lap_times": list(lap_times),
+        "frames": { "received": 10 },
+        "latency": dict(),
+        "splits": dict(),
+    }
+
+def test_farm_result_lines_are_parsed():
+    farm = EvaluationFarm(["127.0.0.1:9091"], ["models/a"], nbr_epochs=2)
+    lines = []
+    sink_id = logger.add(lines.append, format=LOG_FORMAT, level="INFO")
+    try:
+        farm.log_report({ "models/a": [session_result(epoch=1), session_result(epoch=2, lap_times=())] })
+    finally:
+        logger.remove(sink_id)
+
+    records = [parse_line(line.rstrip("\n")) for line in lines]
+    results = [(args, kwargs) for _, _, _, args, kwargs in records if args[0] == "FARM RESULT"]
+    assert [args for args, _ in results] == [["FARM RESULT"], ["FARM RESULT"]]
+    assert results[0][1]["lap_times"] == "12.5;13.0"
+    assert results[1][1]["lap_times"] == ""
+    assert "frames" not in results[0][1]
+
+def test_parse_endpoint():
+    assert parse_endpoint("127.0.0.1:9091") == ("127.0.0.1", 9091)
+
+def test_shard_epochs():
+    assert shard_epochs(10, 3) == [4, 3, 3]
+    assert shard_epochs(9, 3) == [3, 3, 3]
+    # No empty shard
+    assert shard_epochs(2, 4) == [1, 1]
+    assert shard_epochs(0, 2) == []
+
+def test_jobs():
+    farm = EvaluationFarm(["127.0.0.1:9091", "127.0.0.1:9092"], ["models/a", "models/b"], nbr_epochs=3)
+    assert farm.jobs() == [("models/a", 0, 2), ("models/a", 1, 1), ("models/b", 0, 2), ("models/b", 1, 1)]
+
+def test_report_renumbers_the_epochs_of_each_model():
+    farm = EvaluationFarm(["127.0.0.1:9091", "127.0.0.1:9092"], ["models/a", "models/b"], nbr_epochs=3)
+    # Results in the order of the end of the sessions
+    farm.results = [
+        session_result("models/a", shard=1, epoch=1),
+        session_result("models/b", shard=0, epoch=1),
+        session_result("models/a", shard=0, epoch=2),
+        session_result("models/a", shard=0, epoch=1),
+    ]
+    report = farm.report()
+    assert [(result["shard"], result["session_epoch"], result["epoch"]) for result in report["models/a"]] == [(0, 1, 1), (0, 2, 2), (1, 1, 3)]
+    assert [(result["shard"], result["session_epoch"], result["epoch"]) for result in report["models/b"]] == [(0, 1, 1)]
@@ -0,0 +1,72 @@
+from dcevaluator.communication.framing import MessageFramer, is_complete_json_object
+
+def test_complete_messages():
+    framer = MessageFramer()
+    framer.feed(b'{"msg_type": "a"}\n{"msg_type": "b"}\n')
+    assert framer.messages() == [b'{"msg_type": "a"}', b'{"msg_type": "b"}']
+    assert framer.buffer == bytearray()
+
+def test_message_split_between_chunks():
+    framer = MessageFramer()
+    framer.feed(b'{"msg_type": "tele')
+    assert framer.messages() == []
+    framer.feed(b'metry", "cte": 0.5}\n{"msg_type"')
+    assert framer.messages() == [b'{"msg_type": "telemetry", "cte": 0.5}']
+    framer.feed(b': "b"}\n')
+    assert framer.messages() == [b'{"msg_type": "b"}']
+
+def test_delimiter_split_between_chunks():
+    framer = MessageFramer(b"\r\n")
+    framer.feed(b'{"msg_type": "a"}\r')
+    assert framer.messages() == [b'{"msg_type": "a"}']
+    framer.feed(b'\n{"msg_type": "b", "values": [1, 2]\r')
+    assert framer.messages() == []
+    framer.feed(b'\n')
+    assert framer.messages() == [b'{"msg_type": "b", "values": [1, 2]']
+
+def test_garbage_before_brace_and_empty_messages():
+    framer = MessageFramer()
+    framer.feed(b'garbage{"msg_type": "a"}  \n\n   \nnoise\n')
+    assert framer.messages() == [b'{"msg_type": "a"}']
+
+def test_complete_message_without_delimiter():
+    framer = MessageFramer()
+    framer.feed(b'{"msg_type": "a"}\n{"msg_type": "b", "nested": {"c": 1}}')
+    assert framer.messages() == [b'{"msg_type": "a"}', b'{"msg_type": "b", "nested": {"c": 1}}']
+    # The delimiter received later is an empty message
+    framer.feed(b'\n')
+    assert framer.messages() == []
+
+def test_partial_message_ending_with_brace_is_kept():
+    framer = MessageFramer()
+    framer.feed(b'{"msg_type": "b", "nested": {"c": 1}')
+    assert framer.messages() == []
+    framer.feed(b', "d": "}"}\n')
+    assert framer.messages() == [b'{"msg_type": "b", "nested": {"c": 1}, "d": "}"}']
+
+def test_is_complete_json_object():
+    assert is_complete_json_object(b'{"a": {"b": 1}}')
+    assert is_complete_json_object(b'{"a": "{"}')
+    assert is_complete_json_object(b'{"a": "\\"}"}')
+    assert not is_complete_json_object(b'{"a": {"b": 1}')
+    assert not is_complete_json_object(b'{"a": "}')
+
+def test_reset():
+    framer = MessageFramer()
+    framer.feed(b'{"msg_type": "a"')
+    framer.reset()
+    framer.feed(b'{"msg_type": "b"}\n')
+    assert framer.messages() == [b'{"msg_type": "b"}']
+
+def test_messages_are_timed_with_their_first_chunk():
+    framer = MessageFramer()
+    framer.feed(b'{"msg_type": "a"}\n{"msg_type": ', 1.0)
+    assert framer.timed_messages() == [(b'{"msg_type": "a"}', 1.0)]
+    framer.feed(b'"b"}\n{"msg_type": "c"}\n{"msg', 2.0)
+    assert framer.timed_messages() == [(b'{"msg_type": "b"}', 1.0), (b'{"msg_type": "c"}', 2.0)]
+    framer.feed(b'_type": "d"', 3.0)
+    assert framer.timed_messages() == []
+    framer.feed(b'}\n', 4.0)
+    assert framer.timed_messages() == [(b'{"msg_type": "d"}', 2.0)]
+    framer.feed(b'{"msg_type": "e"}\n', 5.0)
+    assert framer.timed_messages() == [(b'{"msg_type": "e"}', 5.0)]
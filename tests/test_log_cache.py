@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from dcevaluator.analyze.log_cache import LogCache, arrays_to_frame, complete_lines_end, frame_to_arrays, load_npz
+from dcevaluator.analyze.log_parser import LogParser
+from dcevaluator.utils.utils import build_log_tag
+from conftest import log_line, write_log
+
+LINES = [log_line(i / 10, build_log_tag("EVALUATION" if i % 10 == 0 else "STEP", epoch=i // 10 + 1, turn=i)) for i in range(30)]
+
+def test_complete_lines_end(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", ["a\n", "bb\n", "incomplete"])
+    size = os.path.getsize(log_path)
+    assert complete_lines_end(log_path, size) == 5
+    assert complete_lines_end(log_path, size, block_size=2) == 5
+    assert complete_lines_end(log_path, size, start=5) == 5
+    assert complete_lines_end(log_path, 5) == 5
+
+def test_cache_by_default_without_the_raw_columns(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", LINES)
+    LogParser(log_path)
+    assert not os.path.exists(log_path + ".cache.npz")
+    LogParser(log_path, keep_raw=False, use_cache=False)
+    assert not os.path.exists(log_path + ".cache.npz")
+    LogParser(log_path, keep_raw=False)
+    assert os.path.exists(log_path + ".cache.npz")
+
+def test_arrays_of_a_frame():
+    frame = pd.DataFrame({
+        "datetime": pd.to_datetime(["2026-01-01 10:00:00", None]),
+        "tag": pd.Categorical(["A", None]),
+        "level": pd.Categorical(["INFO", "DEBUG"], categories=["DEBUG", "INFO"], ordered=True),
+        "turn": pd.array([1, None], dtype="Int64"),
+        "distance_center": [0.5, np.nan],
+    })
+    arrays = frame_to_arrays(frame)
+    assert all(array.dtype != object for array in arrays.values())
+    pd.testing.assert_frame_equal(arrays_to_frame(arrays), frame)
+    with pytest.raises(TypeError):
+        frame_to_arrays(pd.DataFrame({ "args": pd.Series([["A"]], dtype=object) }))
+
+def test_load_npz_maps_the_arrays(tmp_path):
+    path = str(tmp_path / "arrays.npz")
+    np.savez(path, values=np.arange(5), empty=np.zeros(0), names=np.array(["a", "bc"]))
+    arrays = load_npz(path)
+    assert isinstance(arrays["values"].base, np.memmap)
+    assert arrays["values"].tolist() == [0, 1, 2, 3, 4]
+    assert arrays["empty"].shape == (0,)
+    assert arrays["names"].tolist() == ["a", "bc"]
+    assert load_npz(path, mmap_mode=None)["values"].tolist() == [0, 1, 2, 3, 4]
+
+def test_arrays_of_objects_are_refused(tmp_path):
+    path = str(tmp_path / "objects.npz")
+    np.savez(path, values=np.array([{ "a": 1 }], dtype=object))
+    with pytest.raises(ValueError):
+        load_npz(path)
+
+def test_cache_hit(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", LINES)
+    data = LogParser(log_path, keep_raw=False).data
+
+    cached_data, start, end = LogCache(log_path).lookup()
+    assert start == end == os.path.getsize(log_path)
+    pd.testing.assert_frame_equal(cached_data, data)
+    pd.testing.assert_frame_equal(LogParser(log_path, keep_raw=False).data, data)
+
+def test_only_the_appended_lines_are_parsed(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", LINES[:20])
+    LogParser(log_path, keep_raw=False)
+    parsed_size = os.path.getsize(log_path)
+    write_log(log_path, LINES[20:], mode="a")
+
+    cached_data, start, end = LogCache(log_path).lookup()
+    assert len(cached_data) == 20
+    assert (start, end) == (parsed_size, os.path.getsize(log_path))
+
+    data = LogParser(log_path, keep_raw=False).data
+    assert data["turn"].tolist() == list(range(30))
+    pd.testing.assert_frame_equal(data, LogParser(log_path, keep_raw=False, use_cache=False).data, check_categorical=False)
+
+def test_truncated_log_invalidates_the_cache(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", LINES)
+    LogParser(log_path, keep_raw=False)
+    write_log(log_path, LINES[:5])
+    cached_data, start, _ = LogCache(log_path).lookup()
+    assert cached_data is None and start == 0
+    assert len(LogParser(log_path, keep_raw=False).data) == 5
+
+def test_rewritten_log_invalidates_the_cache(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", LINES)
+    LogParser(log_path, keep_raw=False)
+    # Same size, other content and modification time
+    rewritten_lines = [line.replace("STEP", "PASS") for line in LINES]
+    write_log(log_path, rewritten_lines)
+    stat = os.stat(log_path)
+    os.utime(log_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    cached_data, _, _ = LogCache(log_path).lookup()
+    assert cached_data is None
+    assert "PASS" in LogParser(log_path, keep_raw=False).data["tag"].tolist()
+
+def test_modified_content_invalidates_the_cache(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", LINES[:20])
+    LogParser(log_path, keep_raw=False)
+    # Lines appended but the beginning of the log was also changed
+    write_log(log_path, [LINES[0].replace("EVALUATION", "EVALUATIOX")] + LINES[1:])
+    cached_data, start, _ = LogCache(log_path).lookup()
+    assert cached_data is None and start == 0
+
+def test_cache_of_another_version_is_ignored(tmp_path, monkeypatch):
+    log_path = write_log(tmp_path / "evaluation.log", LINES)
+    LogParser(log_path, keep_raw=False)
+    monkeypatch.setattr(LogCache, "VERSION", LogCache.VERSION + 1)
+    cached_data, _, _ = LogCache(log_path).lookup()
+    assert cached_data is None
+    assert len(LogParser(log_path, keep_raw=False).data) == len(LINES)
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", LINES)
+    with open(log_path + ".cache.npz", "wb") as f:
+        f.write(b"not a npz file")
+    assert len(LogParser(log_path, keep_raw=False).data) == len(LINES)
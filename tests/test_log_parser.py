@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dcevaluator.analyze import log_parser as log_parser_module
+from dcevaluator.analyze.log_parser import LogParser, build_frame, iter_records, load_parallel, parse_line, split_byte_ranges
+from dcevaluator.utils.utils import build_log_tag
+from conftest import log_line, write_log
+
+EPOCH_LINES = [
+    log_line(0.0, build_log_tag("Donkey Car Evaluator", "BEGIN")),
+    log_line(1.0, build_log_tag("EVALUATION", "BEGIN", epoch=1), level="SUCCESS"),
+    log_line(1.5, build_log_tag(turn=0, active_node=3, last_node=2, distance_center=-0.5), level="DEBUG"),
+    log_line(2.0, build_log_tag("NEW TURN", turn=1, deltatime=12.5), level="SUCCESS"),
+    log_line(2.5, build_log_tag(turn=1, active_node=5, last_node=4, distance_center=None), level="DEBUG"),
+    log_line(3.0, build_log_tag("ILLEGAL MOVE", message="Car is leaving the road", active_node=5, distance_center=2.5), level="ERROR"),
+    log_line(3.5, build_log_tag("EVALUATION", "END", epoch=1), level="SUCCESS"),
+    log_line(4.0, build_log_tag("EVALUATION", "BEGIN", epoch=2), level="SUCCESS"),
+    log_line(4.5, build_log_tag(turn=0, active_node=1, last_node=0, distance_center=0.25), level="DEBUG"),
+]
+
+def test_parse_line():
+    datetime, level, position, args, kwargs = parse_line(log_line(2.0, build_log_tag("NEW TURN", turn=1, deltatime=12.5)))
+    assert datetime == "2026-01-01 10:00:02.000"
+    assert level == "INFO"
+    assert position == "dcevaluator.evaluator:run:42"
+    assert args == ["NEW TURN"]
+    assert kwargs == { "turn": "1", "deltatime": "12.5" }
+
+def test_lines_which_are_not_log_lines_are_skipped():
+    lines = [log_line(0.0, build_log_tag("A")), "Traceback (most recent call last):\n", "  File \"x.py\", line 1\n", log_line(1.0, build_log_tag("B"))]
+    assert [args for _, _, _, args, _ in iter_records(lines)] == [["A"], ["B"]]
+
+def test_typed_columns():
+    data = build_frame(iter_records(EPOCH_LINES))
+    assert len(data) == len(EPOCH_LINES)
+    assert pd.api.types.is_datetime64_any_dtype(data["datetime"])
+    assert data["datetime"].iloc[1] == pd.Timestamp("2026-01-01 10:00:01")
+    assert isinstance(data["level"].dtype, pd.CategoricalDtype) and data["level"].cat.ordered
+    assert (data["level"] >= "ERROR").sum() == 1
+    for column in ["position", "tag", "subtag"]:
+        assert isinstance(data[column].dtype, pd.CategoricalDtype)
+    assert data["tag"].iloc[1] == "EVALUATION"
+    assert data["subtag"].iloc[1] == "BEGIN"
+    assert pd.isna(data["tag"].iloc[2])
+
+    assert str(data["epoch"].dtype) == "Int64"
+    assert data["epoch"].tolist()[1] == 1
+    assert pd.isna(data["epoch"].iloc[2])
+    assert str(data["active_node"].dtype) == "Int64"
+    assert data["distance_center"].dtype == np.float64
+    assert data["distance_center"].iloc[2] == -0.5
+    # `build_log_tag` writes "None" for a missing value
+    assert np.isnan(data["distance_center"].iloc[4])
+    assert data["deltatime"].iloc[3] == 12.5
+
+    assert data["args"].iloc[3] == ["NEW TURN"]
+    assert data["kwargs"].iloc[3] == { "turn": "1", "deltatime": "12.5" }
+
+def test_without_raw_columns():
+    data = build_frame(iter_records(EPOCH_LINES), keep_raw=False)
+    assert "args" not in data and "kwargs" not in data
+    assert data["turn"].iloc[3] == 1
+
+def test_empty_log(tmp_path):
+    log_path = write_log(tmp_path / "empty.log", [])
+    data = LogParser(log_path).data
+    assert len(data) == 0
+    assert list(data.columns) == list(build_frame([]).columns)
+
+def test_incomplete_last_line_is_not_parsed(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", EPOCH_LINES[:2] + [EPOCH_LINES[2].rstrip("\n")])
+    log_parser = LogParser(log_path)
+    assert len(log_parser.data) == 2
+    write_log(log_path, ["\n"], mode="a")
+    assert len(log_parser.update()) == 1
+    assert len(log_parser.data) == 3
+
+def many_lines(nbr_epochs):
+    lines = []
+    for epoch in range(1, nbr_epochs + 1):
+        lines.append(log_line(0.0, build_log_tag("EVALUATION", "BEGIN", epoch=epoch)))
+        for i in range(50):
+            lines.append(log_line(i / 100, build_log_tag(turn=i // 10, active_node=i, last_node=i - 1, distance_center=i / 10 - 2.5), level="DEBUG"))
+        lines.append(log_line(0.9, build_log_tag("EVALUATION", "END", epoch=epoch)))
+    return lines
+
+def test_split_byte_ranges(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", many_lines(5))
+    with open(log_path, "rb") as f:
+        content = f.read()
+    for nbr_ranges in [1, 2, 3, 7, 1000]:
+        ranges = split_byte_ranges(log_path, nbr_ranges)
+        assert 1 <= len(ranges) <= nbr_ranges
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+        for (_, end), (start, _) in zip(ranges[:-1], ranges[1:]):
+            assert end == start
+            # Each range ends just after a new line
+            assert content[end - 1:end] == b"\n"
+
+def test_split_a_part_of_the_file(tmp_path):
+    lines = many_lines(2)
+    log_path = write_log(tmp_path / "evaluation.log", lines)
+    start = len("".join(lines[:10]).encode("utf-8"))
+    end = len("".join(lines[:80]).encode("utf-8"))
+    ranges = split_byte_ranges(log_path, 4, start, end)
+    assert ranges[0][0] == start and ranges[-1][1] == end
+    assert split_byte_ranges(log_path, 4, end, end) == []
+
+@pytest.mark.parametrize("keep_raw", [True, False])
+def test_parallel_load_is_the_same_as_the_sequential_one(tmp_path, monkeypatch, keep_raw):
+    log_path = write_log(tmp_path / "evaluation.log", many_lines(20))
+    with open(log_path) as f:
+        expected = build_frame(iter_records(f), keep_raw=keep_raw)
+    # Parse the small log in a pool of processes anyway
+    monkeypatch.setattr(log_parser_module, "MIN_PARALLEL_SIZE", 0)
+    data = load_parallel(log_path, nbr_workers=3, keep_raw=keep_raw)
+    pd.testing.assert_frame_equal(data, expected, check_categorical=False)
+    for column in ["position", "tag", "subtag"]:
+        assert isinstance(data[column].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(LogParser(log_path, keep_raw=keep_raw, nbr_workers=3).data, expected, check_categorical=False)
+
+@pytest.mark.parametrize("keep_raw", [True, False])
+def test_rows_with_tag_and_kwarg(tmp_path, keep_raw):
+    log_parser = LogParser(write_log(tmp_path / "evaluation.log", EPOCH_LINES), keep_raw=keep_raw)
+    assert log_parser.rows_with_tag("EVALUATION").tolist() == [1, 6, 7]
+    assert log_parser.rows_with_tag("EVALUATION", "BEGIN").tolist() == [1, 7]
+    assert log_parser.rows_with_tag("UNKNOWN").tolist() == []
+    # Without the raw kwargs, the index of a promoted kwarg only holds its numeric values ("None" is NA)
+    expected_rows = [2, 4, 5, 8] if keep_raw else [2, 5, 8]
+    assert log_parser.rows_with_kwarg("distance_center").tolist() == expected_rows
+    assert log_parser.lines_with_tag("NEW TURN")["deltatime"].tolist() == [12.5]
+    assert len(log_parser.find_evaluator_line()) == 1
+
+def test_rows_with_other_args(tmp_path):
+    lines = [log_line(0.0, build_log_tag("A", "B", "C")), log_line(1.0, build_log_tag("C", "D"))]
+    log_parser = LogParser(write_log(tmp_path / "evaluation.log", lines))
+    assert log_parser.rows_with_tag("C").tolist() == [0, 1]
+    assert log_parser.rows_with_tag("A", "C").tolist() == [0]
+
+def test_epochs(tmp_path):
+    log_parser = LogParser(write_log(tmp_path / "evaluation.log", EPOCH_LINES))
+    epochs = log_parser.epochs()
+    assert epochs["epoch"].tolist() == [1, 2]
+    assert epochs["begin_row"].tolist() == [1, 7]
+    assert epochs["end_row"].iloc[0] == 6
+    # The last epoch is not ended
+    assert pd.isna(epochs["end_row"].iloc[1])
+    assert epochs["duration"].iloc[0] == pytest.approx(2.5)
+    assert pd.isna(epochs["duration"].iloc[1])
+
+def test_epoch_without_end_before_the_next_one(tmp_path):
+    lines = [EPOCH_LINES[1], EPOCH_LINES[2], EPOCH_LINES[7], log_line(6.0, build_log_tag("EVALUATION", "END", epoch=2))]
+    epochs = LogParser(write_log(tmp_path / "evaluation.log", lines)).epochs()
+    assert pd.isna(epochs["end_row"].iloc[0])
+    assert epochs["end_row"].iloc[1] == 3
+
+def test_events_with_their_epoch(tmp_path):
+    log_parser = LogParser(write_log(tmp_path / "evaluation.log", EPOCH_LINES))
+    illegal_moves = log_parser.illegal_moves()
+    assert illegal_moves["epoch"].tolist() == [1]
+    assert illegal_moves["distance_center"].tolist() == [2.5]
+    assert illegal_moves["active_node"].tolist() == [5]
+    assert log_parser.epoch_of_rows(np.array([0, 2, 8])).tolist()[1:] == [1, 2]
+    assert pd.isna(log_parser.epoch_of_rows(np.array([0]))[0])
+
+def test_indexes_are_updated_with_the_appended_lines(tmp_path):
+    log_path = write_log(tmp_path / "evaluation.log", EPOCH_LINES[:5])
+    log_parser = LogParser(log_path)
+    write_log(log_path, EPOCH_LINES[5:], mode="a")
+    new_data = log_parser.update()
+    assert new_data.index.tolist() == list(range(5, len(EPOCH_LINES)))
+    assert log_parser.rows_with_tag("EVALUATION", "BEGIN").tolist() == [1, 7]
+    assert log_parser.rows_with_kwarg("distance_center").tolist() == [2, 4, 5, 8]
+    assert len(log_parser.data) == len(EPOCH_LINES)
+    assert log_parser.epochs()["epoch"].tolist() == [1, 2]
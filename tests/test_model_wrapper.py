@@ -0,0 +1,41 @@
+import pytest
+
+# The model wrapper loads the Brains with TensorFlow
+pytest.importorskip("tensorflow")
+from dcevaluator.controller.model_wrapper import DCModelWrapper
+
+class CountingBrain(DCModelWrapper):
+    def __init__(self):
+        self.calls = []
+
+    def input_transformer(self, request):
+        self.calls.append("input_transformer")
+        return request
+
+    def input_preprocessing(self, inputs_tensor, num_parallel_calls=1):
+        self.calls.append("input_preprocessing")
+        return inputs_tensor
+
+    def predict(self, request):
+        self.calls.append("predict")
+        return 0.0, 0.5, 0.0
+
+class PipelinedBrain(CountingBrain):
+    def predict_inputs(self, inputs_tensor):
+        self.calls.append("predict_inputs")
+        return 0.0, 0.5, 0.0
+
+def test_warm_up_of_predict():
+    brain = CountingBrain()
+    summary = brain.warm_up((12, 16, 3), nbr_inferences=3)
+    assert brain.calls == ["predict"] * 3
+    assert summary["nbr_inferences"] == 3
+    assert summary["cold_ms"] is not None and summary["warm_ms"] is not None
+    assert "inputs_cold_ms" not in summary
+
+def test_warm_up_of_predict_inputs_is_timed_apart():
+    brain = PipelinedBrain()
+    summary = brain.warm_up((12, 16, 3), nbr_inferences=2)
+    assert brain.calls.count("predict") == 2 and brain.calls.count("predict_inputs") == 2
+    assert summary["inputs_cold_ms"] is not None and summary["inputs_warm_ms"] is not None
+    assert summary["warm_ms"] is not None
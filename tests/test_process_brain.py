@@ -0,0 +1,36 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+from threading import Lock
+import pytest
+from dcevaluator.controller.process_brain import ProcessBrain
+
+def test_model_not_loaded():
+    with pytest.raises(RuntimeError, match="cannot load the model"):
+        ProcessBrain(os.path.join("nonexistent", "model.h5"))
+
+def test_inference_process_dying_before_replying():
+    context = multiprocessing.get_context("spawn")
+    brain = ProcessBrain.__new__(ProcessBrain)
+    brain.lock = Lock()
+    brain.connection, worker_connection = context.Pipe()
+    brain.process = context.Process(target=os._exit, args=(3,), daemon=True)
+    brain.process.start()
+    worker_connection.close()
+    with pytest.raises(RuntimeError, match="died"):
+        brain.receive(timeout=30, poll_interval=0.1)
+    brain.process.join()
+    brain.connection.close()
+
+def test_inference_process_not_replying_in_time():
+    context = multiprocessing.get_context("spawn")
+    brain = ProcessBrain.__new__(ProcessBrain)
+    brain.connection, worker_connection = context.Pipe()
+    brain.process = context.Process(target=multiprocessing.connection.wait, args=([worker_connection], 60), daemon=True)
+    brain.process.start()
+    worker_connection.close()
+    with pytest.raises(RuntimeError, match="did not reply"):
+        brain.receive(timeout=0.3, poll_interval=0.1)
+    brain.process.terminate()
+    brain.process.join()
+    brain.connection.close()
@@ -0,0 +1,82 @@
+import csv
+import multiprocessing
+from dcevaluator.evaluator.results import ResultsStore
+
+def epoch_result(model_id = "models/a", session_id = None, epoch = 1, lap_times = (20.0, 19.5)):
+    return {
+        "model_id": model_id,
+        "session_id": session_id,
+        "epoch": epoch,
+        "end_reason": "turns_limit",
+        "turn": len(lap_times),
+        "last_node": 42,
+        "max_abs_cte": 1.25,
+        "mean_lap_time": sum(lap_times) / len(lap_times) if len(lap_times) > 0 else None,
+        "best_lap_time": min(lap_times) if len(lap_times) > 0 else None,
+        "lap_times": list(lap_times),
+        "frames": { "received": 10, "dropped": 2, "predicted": 7, "stale": 1, "unconsumed": 0 },
+        "latency": { "receive_to_send": { "count": 7, "mean": 12.0, "p50": 11.0, "p95": 20.0, "p99": 25.0, "max": 30.0 } },
+    }
+
+def test_laps_path(tmp_path):
+    assert ResultsStore(str(tmp_path / "results.csv")).laps_path == str(tmp_path / "results_laps.csv")
+    assert ResultsStore(str(tmp_path / "results")).laps_path == str(tmp_path / "results_laps.csv")
+
+def test_append_and_load(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.csv"), evaluation_name="test")
+    store.append_epoch(epoch_result(epoch=1))
+    store.append_epoch(epoch_result(epoch=2, lap_times=()))
+
+    epochs = store.load_epochs()
+    assert list(epochs.columns) == list(ResultsStore.EPOCH_COLUMNS)
+    assert epochs["epoch"].tolist() == [1, 2]
+    assert epochs["evaluation_name"].tolist() == ["test", "test"]
+    assert epochs.loc[0, "lap_times"] == "20.0;19.5"
+    assert epochs.loc[0, "frames_dropped"] == 2
+    assert epochs.loc[0, "latency_p95"] == 20.0
+
+    laps = store.load_laps()
+    assert list(laps.columns) == list(ResultsStore.LAP_COLUMNS)
+    assert laps["lap"].tolist() == [1, 2]
+    assert laps["lap_time"].tolist() == [20.0, 19.5]
+
+def test_header_is_written_once(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.csv"))
+    for epoch in range(1, 4):
+        store.append_epoch(epoch_result(epoch=epoch))
+    with open(store.path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(ResultsStore.EPOCH_COLUMNS)
+    assert len(rows) == 4
+
+def test_sessions_are_told_apart(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.csv"))
+    store.append_epoch(epoch_result(session_id="127.0.0.1:9091/0", epoch=1))
+    store.append_epoch(epoch_result(session_id="127.0.0.1:9092/1", epoch=1))
+    epochs = store.load_epochs()
+    assert epochs.groupby(["model_id", "session_id", "epoch"]).size().max() == 1
+
+def append_epochs(path, session_id, nbr_epochs):
+    store = ResultsStore(path)
+    for epoch in range(1, nbr_epochs + 1):
+        store.append_epoch(epoch_result(session_id=session_id, epoch=epoch, lap_times=[20.0] * 5))
+
+def test_concurrent_appends(tmp_path):
+    path = str(tmp_path / "results.csv")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=append_epochs, args=(path, "session-" + str(i), 20)) for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    store = ResultsStore(path)
+    epochs = store.load_epochs()
+    assert len(epochs) == 80
+    assert sorted(epochs.groupby("session_id")["epoch"].apply(sorted).tolist()) == [list(range(1, 21))] * 4
+    laps = store.load_laps()
+    assert len(laps) == 80 * 5
+    # The laps of an epoch are written at once, so they are never interleaved with the laps of another process
+    for _, epoch_laps in laps.groupby(["session_id", "epoch"]):
+        assert epoch_laps.index.tolist() == list(range(epoch_laps.index[0], epoch_laps.index[0] + 5))
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from dcevaluator.event.split_timer import SplitTimer
+
+# Each lap is ([(node, time since the start of the lap), ...], lap time)
+def drive(split_timer, laps, start_time = 100.0):
+    split_timer.start(start_time)
+    lap_start_time = start_time
+    for nodes, lap_time in laps:
+        for node, time in nodes:
+            split_timer.record_node(node, lap_start_time + time)
+        lap_start_time += lap_time
+        split_timer.record_lap(lap_start_time)
+
+def test_lap_times_and_best_lap():
+    split_timer = SplitTimer(max_laps=8, max_nodes=16)
+    drive(split_timer, [([(1, 3.0), (2, 7.0)], 10.0), ([(1, 2.0), (2, 5.0)], 8.0), ([(1, 4.0), (2, 8.0)], 12.0)])
+    assert split_timer.lap_times().tolist() == pytest.approx([10.0, 8.0, 12.0])
+    summary = split_timer.summary()
+    assert summary["nbr_laps"] == 3
+    assert summary["best_lap"] == 2
+    assert summary["best_lap_time"] == pytest.approx(8.0)
+    assert summary["mean_lap_time"] == pytest.approx(10.0)
+
+def test_segments_end_at_the_finish_line():
+    split_timer = SplitTimer(max_laps=8, max_nodes=16)
+    drive(split_timer, [([(1, 3.0), (2, 7.0)], 10.0), ([(1, 2.0), (2, 5.0)], 8.0)])
+    segment_times = split_timer.segment_times()
+    np.testing.assert_allclose(segment_times, [[3.0, 4.0, 3.0], [2.0, 3.0, 3.0]])
+    assert segment_times.sum(axis=1).tolist() == pytest.approx(split_timer.lap_times().tolist())
+
+    summary = split_timer.summary()
+    np.testing.assert_allclose(summary["segment_deltas"], [[1.0, 1.0, 0.0], [0.0, 0.0, 0.0]])
+    # The deltas add up to the difference with the best lap time
+    assert [sum(deltas) for deltas in summary["segment_deltas"]] == pytest.approx([2.0, 0.0])
+
+def test_skipped_node():
+    split_timer = SplitTimer(max_laps=8, max_nodes=16)
+    drive(split_timer, [([(1, 3.0), (2, 7.0), (3, 9.0)], 10.0), ([(1, 2.0), (3, 7.0)], 8.0)])
+    segment_times = split_timer.segment_times()
+    assert segment_times[0].tolist() == pytest.approx([3.0, 4.0, 2.0, 1.0])
+    # The segments before and after the skipped node 2 are unknown
+    assert np.isnan(segment_times[1, 1]) and np.isnan(segment_times[1, 2])
+    assert segment_times[1, [0, 3]].tolist() == pytest.approx([2.0, 1.0])
+    deltas = split_timer.summary()["segment_deltas"]
+    assert np.isnan(deltas[0][1])
+    assert deltas[0][3] == pytest.approx(0.0)
+
+def test_laps_after_max_laps_are_ignored():
+    split_timer = SplitTimer(max_laps=2, max_nodes=4)
+    drive(split_timer, [([(1, 3.0)], 10.0), ([(1, 2.0)], 8.0), ([(1, 1.0)], 5.0), ([(1, 1.0)], 4.0)])
+    assert split_timer.lap == 2
+    assert split_timer.lap_times().tolist() == pytest.approx([10.0, 8.0])
+    np.testing.assert_allclose(split_timer.segment_times(), [[3.0, 7.0], [2.0, 6.0]])
+    assert split_timer.summary()["best_lap"] == 2
+
+def test_nodes_out_of_the_track_are_ignored():
+    split_timer = SplitTimer(max_laps=2, max_nodes=4)
+    drive(split_timer, [([(1, 3.0), (4, 5.0), (-1, 6.0)], 10.0)])
+    np.testing.assert_allclose(split_timer.segment_times(), [[3.0, 7.0]])
+
+def test_no_complete_lap():
+    split_timer = SplitTimer()
+    split_timer.start(0.0)
+    split_timer.record_node(1, 2.0)
+    summary = split_timer.summary()
+    assert summary["nbr_laps"] == 0
+    assert summary["best_lap"] is None
+    assert summary["segment_deltas"] == []
@@ -0,0 +1,43 @@
+import base64
+import numpy as np
+import pytest
+from dcevaluator.communication.telemetry import Telemetry
+
+def test_missing_scalar_field():
+    telemetry = Telemetry({ "msg_type": "telemetry", "activeNode": 3, "vel_x": 1.5 })
+    assert "activeNode" in telemetry
+    assert "cte" not in telemetry
+    assert telemetry.get("cte", 0.25) == 0.25
+    assert telemetry.get("activeNode", -1) == 3
+    assert telemetry.get("vel_x") == 1.5
+    with pytest.raises(KeyError):
+        telemetry["cte"]
+    assert telemetry.to_dict() == { "msg_type": "telemetry", "activeNode": 3, "vel_x": 1.5 }
+
+def test_null_scalar_field_is_present():
+    telemetry = Telemetry({ "msg_type": "telemetry", "cte": None })
+    assert "cte" in telemetry
+    assert telemetry.get("cte", 0.25) is None
+
+def test_blank_image_is_decoded():
+    telemetry = Telemetry.blank((12, 16, 3))
+    assert telemetry.image.shape == (12, 16, 3)
+    assert telemetry.image.max() == 0
+
+def test_blank_fields_have_the_types_of_the_simulator():
+    telemetry = Telemetry.blank()
+    assert telemetry.msg_type == "telemetry"
+    assert telemetry.hit == "none"
+    assert isinstance(telemetry.active_node, int)
+    assert isinstance(telemetry.cte, float)
+
+def test_undecodable_image():
+    telemetry = Telemetry({ "msg_type": "telemetry", "image": base64.b64encode(b"not an image").decode("ascii") })
+    with pytest.raises(ValueError):
+        telemetry.image
+
+def test_decoded_image():
+    image = np.ones((12, 16, 3), dtype=np.uint8)
+    telemetry = Telemetry.from_decoded_image({ "msg_type": "telemetry", "cte": 0.5 }, image)
+    assert telemetry.image is image
+    assert "image" not in telemetry